@@ -1,11 +1,16 @@
 from flask import Flask, render_template, request
-from src.helper import download_hugging_face_embeddings
-from langchain_pinecone import PineconeVectorStore
+from src.helper import load_embeddings
+from src.retrieval import connect_live_vector_store, retrieve
+from src.assets import install_assets
+from src.request_logging import install_request_logging, log_event, set_fields, set_verbose_fields, stage
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
+import logging
 import os
 
 app = Flask(__name__)
+install_request_logging(app)
+install_assets(app)
 
 load_dotenv()
 
@@ -14,24 +19,40 @@ os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 
 HF_API_TOKEN = os.environ.get('HF_API_TOKEN')
 
-# Initialize HuggingFace client
-client = InferenceClient(token=HF_API_TOKEN)
+# Initialized lazily (see initialize_components)
+client = None
+embeddings = None
+docsearch = None
 
-# Initialize components
-embeddings = download_hugging_face_embeddings()
-docsearch = PineconeVectorStore.from_existing_index(
-    index_name="medical-chatbot",
-    embedding=embeddings
-)
+def initialize_embeddings():
+    """Load the embedding model once (in the gunicorn master when preloaded)"""
+    global embeddings
+    if embeddings is None:
+        embeddings = load_embeddings()
+    return embeddings
+
+def initialize_components():
+    """
+    Network clients and the snapshot watcher thread are created in the
+    process that uses them, so gunicorn workers never inherit them across fork
+    """
+    global client, docsearch
+    initialize_embeddings()
+    if docsearch is None:
+        client = InferenceClient(token=HF_API_TOKEN)
+        docsearch = connect_live_vector_store(embeddings)
+    return docsearch
 
 def get_medical_answer(question):
     try:
+        docsearch = initialize_components()
         # Get relevant documents from Pinecone
-        docs = docsearch.similarity_search(question, k=3)
+        with stage("retrieve"):
+            docs, retrieval = retrieve(docsearch, question)
+        set_fields(retrieval=retrieval["source"], retrieval_k=retrieval["k"], top_score=retrieval["top_score"],
+                   context_tokens=retrieval["context_tokens"], tokens_saved=retrieval["tokens_saved"])
         context = "\n".join([doc.page_content for doc in docs])
         
-        print(f"🔍 Calling HuggingFace API...")
-        
         # Use chat completion format
         messages = [
             {
@@ -45,25 +66,21 @@ def get_medical_answer(question):
         ]
         
         # Call HuggingFace using chat completion
-        response = client.chat_completion(
-            messages=messages,
-            model="mistralai/Mistral-7B-Instruct-v0.2",
-            max_tokens=500,
-            temperature=0.3
-        )
+        with stage("generate"):
+            response = client.chat_completion(
+                messages=messages,
+                model="mistralai/Mistral-7B-Instruct-v0.2",
+                max_tokens=500,
+                temperature=0.3
+            )
         
         # Extract the answer
         answer = response.choices[0].message.content
         
-        print(f"✅ Response received: {answer[:100]}...")
-        
         return answer.strip()
         
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log_event("answer failed", level=logging.ERROR, exc_info=True)
         return f"I apologize, but I'm having trouble processing your question. Please try again."
 
 @app.route("/")
@@ -73,11 +90,8 @@ def index():
 @app.route("/get", methods=["POST"])
 def chat():
     user_question = request.form["msg"]
-    print(f"Question: {user_question}")
-    
     answer = get_medical_answer(user_question)
-    print(f"Answer: {answer}")
-    
+    set_verbose_fields(question=user_question, answer=answer)
     return answer
 
 if __name__ == '__main__':
@@ -1,10 +1,25 @@
-from flask import Flask, render_template, request
-from langchain_pinecone import PineconeVectorStore
+from flask import Flask, render_template, request, make_response, Response, stream_with_context
+from src.retrieval import adaptive_search, connect_live_vector_store, title_lookup
+from src.cascade import ModelCascade
+from src.prompt import build_messages
+from src.answering import Deadline, extractive_answer, PATH_LLM, PATH_EXTRACTIVE, PATH_ERROR
+from src.admission import AdmissionController, RateLimiter, client_id, is_admin, prometheus_metrics
+from src.batch import BatchInputError, answer_questions, read_questions
+from src.conversation import ConversationStore
+from src.prefetch import PrefetchCache, PREFETCH_MAX_CONCURRENT, PREFETCH_MIN_CHARS
+from src.profiling import Profiler
+from src.assets import install_assets
+from src.request_logging import install_request_logging, log_event, set_fields, set_verbose_fields, stage
 from dotenv import load_dotenv
 import requests
+import json
+import logging
 import os
+import threading
 
 app = Flask(__name__)
+install_request_logging(app)
+install_assets(app)
 
 load_dotenv()
 
@@ -13,93 +28,154 @@ os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 
+# Bounded concurrency + wait queue in front of get_medical_answer, and
+# per-client rate limits (see src/admission.py for the env settings)
+admission = AdmissionController()
+rate_limiter = RateLimiter()
+
+# Opt-in sampling profiler for /get (see src/profiling.py)
+profiler = Profiler()
+
+# Per-browser conversation state (bounded, expiring)
+conversations = ConversationStore()
+
+# Retrieval warmed by /prefetch while the user types, with its own (looser) rate limit
+prefetch_cache = PrefetchCache()
+prefetch_slots = threading.BoundedSemaphore(PREFETCH_MAX_CONCURRENT)
+prefetch_limiter = RateLimiter(rate=float(os.environ.get("PREFETCH_RATE_PER_MINUTE", 60)) / 60.0,
+                               burst=int(os.environ.get("PREFETCH_BURST", 5)))
+
+# Small fast model for easy questions, the 70B one for the rest (see src/cascade.py)
+cascade = ModelCascade()
+
 # Global variables (will be initialized on first request)
 embeddings = None
 docsearch = None
 
+def initialize_embeddings():
+    """
+    Load the embedding model once.
+
+    Under gunicorn (see gunicorn.conf.py) this runs in the master process before
+    workers are forked, so every worker shares the model weights copy-on-write.
+    """
+    global embeddings
+
+    if embeddings is None:
+        print("🔄 Initializing embeddings...")
+        from src.helper import load_embeddings
+        embeddings = load_embeddings()
+
+    return embeddings
+
 def initialize_components():
     """Initialize embeddings and Pinecone on first request (lazy loading)"""
-    global embeddings, docsearch
-    
-    if embeddings is None:
-        print("🔄 Initializing embeddings (first request)...")
-        from src.helper import download_hugging_face_embeddings
-        embeddings = download_hugging_face_embeddings()
-        
+    global docsearch
+
+    initialize_embeddings()
+
+    # The Pinecone client holds network connections, so it is always created in
+    # the process that uses it (never inherited across fork)
     if docsearch is None:
         print("🔄 Connecting to Pinecone...")
-        docsearch = PineconeVectorStore.from_existing_index(
-            index_name="medical-chatbot",
-            embedding=embeddings
-        )
+        docsearch = connect_live_vector_store(embeddings)
+        # Chunks remembered for follow-ups belong to the old snapshot
+        docsearch.on_swap(lambda version: conversations.invalidate_retrieval())
+        docsearch.on_swap(lambda version: prefetch_cache.clear(keep_version=version))
         print("✅ Components initialized!")
     
     return docsearch
 
-def get_medical_answer(question):
+APOLOGY = "I apologize, but I'm having trouble processing your question. Please try again."
+
+def prefetch_key(request):
+    """Same key for /prefetch and /get from one browser"""
+    return request.cookies.get("conversation_id") or client_id(request)
+
+def get_medical_answer(question, deadline=None, conversation=None, client=None):
     """
     Uses Groq API via direct REST calls (no SDK needed)
     Works with any httpx version
+
+    The whole request (embedding, retrieval, generation) shares one deadline.
+    If the LLM can't answer in time, an extractive answer is built from the
+    retrieved passages instead. Returns (answer, path).
+
+    A question naming an encyclopedia entry ("What is diabetes?") is answered
+    from that entry via the title index. Otherwise, with a conversation,
+    follow-up questions reuse the previous turn's chunks (no embedding or
+    search) and earlier turns are included in the prompt; failing that, chunks
+    prefetched for this client's (nearly) identical text are used when they
+    come from the live snapshot, and only then is a vector search run.
+
+    The model cascade picks the small or large model from the question and
+    the retrieval scores, and may escalate a weak small-model answer.
     """
+    deadline = deadline or Deadline()
+    docs = []
+    retrieval = None
+    follow_up = False
     try:
         # Initialize components on first request (lazy loading)
         docsearch = initialize_components()
         
-        # Get relevant documents from Pinecone
-        docs = docsearch.similarity_search(question, k=3)
+        version, store = docsearch.current()
+        # A question naming an encyclopedia entry is always a new topic
+        with stage("title_lookup"):
+            found = title_lookup(store, question)
+        if found is None and conversation is not None and conversation.is_follow_up(question):
+            set_fields(retrieval="reused")
+            docs = conversation.last_docs
+            follow_up = True
+        else:
+            prefetched = prefetch_cache.lookup(client, version, question) if client and found is None else None
+            if found is not None:
+                docs, retrieval = found
+                source = "title"
+            elif prefetched is not None:
+                docs, retrieval = prefetched
+                source = "prefetched"
+            else:
+                # Get relevant documents from Pinecone
+                with stage("retrieve"):
+                    docs, retrieval = adaptive_search(store, question)
+                source = "search"
+            set_fields(retrieval=source, retrieval_k=retrieval["k"], top_score=retrieval["top_score"],
+                       context_tokens=retrieval["context_tokens"], tokens_saved=retrieval["tokens_saved"])
+            if conversation is not None:
+                conversation.remember_retrieval(question, docs)
         context = "\n".join([doc.page_content for doc in docs])
+
+        if not deadline.allows_llm():
+            log_event("deadline: skipping LLM", level=logging.WARNING, remaining_s=round(deadline.remaining(), 2))
+            return _fallback_answer(question, docs)
+
+        history = conversation.history_messages() if conversation is not None else []
+        messages = build_messages(context, question, history)
         
-        print(f"Question: {question}")
-        print(f"⚡ Using Groq API (Direct REST)...")
-        
-        # Prepare request
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful medical assistant. Use the provided medical context to answer questions accurately. Always remind users to consult healthcare professionals for medical advice."
-                },
-                {
-                    "role": "user",
-                    "content": f"Medical Context:\n{context}\n\nQuestion: {question}"
-                }
-            ],
-            "temperature": 0.3,
-            "max_tokens": 500
-        }
-        
-        # Make direct API call
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            answer = result['choices'][0]['message']['content']
-            print(f"✅ Response received")
-            return answer.strip()
-        else:
-            print(f"❌ API Error: {response.status_code}")
-            print(f"Response: {response.text}")
-            return "I apologize, but I'm having trouble processing your question. Please try again."
+        with stage("generate"):
+            answer, model = cascade.answer(GROQ_API_KEY, messages, question, retrieval,
+                                           follow_up=follow_up, deadline=deadline)
+        set_fields(model_tier=model["tier"], model=model["model"], model_route=model["route"],
+                   escalated=model["escalated"], llm_ms=model["llm_ms"], llm_cost_usd=model["cost_usd"])
+        return answer, PATH_LLM
         
     except requests.exceptions.Timeout:
-        print(f"⏱️ Request timeout")
-        return "Request timed out. Please try again."
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return "I apologize, but I'm having trouble processing your question. Please try again."
+        log_event("Groq request timeout", level=logging.WARNING)
+        return _fallback_answer(question, docs)
+    except requests.exceptions.HTTPError as e:
+        log_event("Groq API error", level=logging.ERROR,
+                  status=e.response.status_code, body=e.response.text[:500])
+        return _fallback_answer(question, docs)
+    except Exception:
+        log_event("answer failed", level=logging.ERROR, exc_info=True)
+        return _fallback_answer(question, docs)
+
+def _fallback_answer(question, docs):
+    answer = extractive_answer(question, docs)
+    if answer is None:
+        return APOLOGY, PATH_ERROR
+    return answer, PATH_EXTRACTIVE
 
 @app.route("/")
 def index():
@@ -110,12 +186,131 @@ def health():
     """Health check endpoint for Render"""
     return {"status": "ok"}, 200
 
+@app.route("/metrics")
+def metrics():
+    """Admission-control counters in Prometheus text format"""
+    body = prometheus_metrics(admission) + prefetch_cache.prometheus_lines() + cascade.prometheus_lines()
+    return body, 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """
+    Bulk answers for QA review (admin only).
+
+    Body: JSONL lines of {"id", "question"}. Response: JSONL results streamed
+    as they complete, or a 400 naming the first malformed line. Use
+    batch_answer.py for resumable runs.
+    """
+    if not is_admin(request):
+        return "Forbidden", 403
+
+    try:
+        items = list(read_questions(request.get_data(as_text=True).splitlines()))
+    except BatchInputError as e:
+        return {"error": str(e), "line": e.line_number}, 400
+    docsearch = initialize_components()
+
+    def generate():
+        for result in answer_questions(items, embeddings, docsearch, GROQ_API_KEY,
+                                       concurrency=int(os.environ.get("BATCH_CONCURRENCY", 4)),
+                                       requests_per_minute=int(os.environ.get("BATCH_RPM", 30))):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/admin/profiling", methods=["GET", "POST"])
+def admin_profiling():
+    """
+    Toggle request profiling and dump flame-graph (collapsed stack) files.
+
+    POST JSON: {"enabled": true, "sample_rate": 0.05} and/or {"action": "dump" | "reset"}
+
+    The worker handling this request applies the change at once and reports its
+    pid; the other workers pick it up from the shared settings file within about
+    a second and write their own dumps (named with their pid) to PROFILE_DIR.
+    """
+    if not is_admin(request):
+        return "Forbidden", 403
+
+    result = {}
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        action = body.get("action") if body.get("action") in ("dump", "reset") else None
+        files = profiler.configure(enabled=body.get("enabled"), sample_rate=body.get("sample_rate"),
+                                   action=action)
+        if action == "dump":
+            result["files"] = files
+    else:
+        profiler.refresh()
+    return {**profiler.settings(), **result}, 200
+
+@app.route("/admin/models")
+def admin_models():
+    """Per-tier model calls, latency percentiles, tokens and estimated cost since start"""
+    if not is_admin(request):
+        return "Forbidden", 403
+    return cascade.summary(), 200
+
+@app.route("/prefetch", methods=["POST"])
+def prefetch():
+    """
+    Warm retrieval for a partially typed question (called by chat.html).
+
+    Best effort and cheap: skipped for short text, repeats, when the client is
+    over its prefetch rate, when the server is already at capacity, or when
+    this worker's PREFETCH_MAX_CONCURRENT prefetch slots are taken.
+    """
+    text = request.form.get("msg", "").strip()
+    client = prefetch_key(request)
+    if len(text) < PREFETCH_MIN_CHARS:
+        return "", 204, {"X-Prefetch": "skipped"}
+    if prefetch_limiter.allow(client):
+        return "", 429, {"X-Prefetch": "rate_limited"}
+    # Prefetches hold their own few slots, so a burst can't take the threads /get needs
+    if admission.active >= admission.max_concurrent or not prefetch_slots.acquire(blocking=False):
+        return "", 204, {"X-Prefetch": "busy"}
+    try:
+        version, store = initialize_components().current()
+        if prefetch_cache.has(client, version, text):
+            return "", 204, {"X-Prefetch": "cached"}
+        if title_lookup(store, text) is not None:
+            return "", 204, {"X-Prefetch": "title"}  # /get will not need a search
+        with stage("retrieve"):
+            docs, retrieval = adaptive_search(store, text)
+        prefetch_cache.put(client, version, text, docs, retrieval)
+        return "", 204, {"X-Prefetch": "stored"}
+    finally:
+        prefetch_slots.release()
+
 @app.route("/get", methods=["POST"])
+@profiler.profile(forced=lambda: request.headers.get("X-Profile") == "1" and is_admin(request))
 def chat():
-    user_question = request.form["msg"]
-    answer = get_medical_answer(user_question)
-    print(f"Answer: {answer[:200]}...")
-    return answer
+    # Time spent waiting for a slot counts against the answer deadline
+    deadline = Deadline()
+
+    wait = rate_limiter.allow(client_id(request))
+    if wait:
+        admission.reject_rate_limited()
+        return "Too many questions - please slow down.", 429, {"Retry-After": str(wait)}
+
+    if not admission.acquire():
+        return "Server is busy - please retry shortly.", 503, {"Retry-After": str(admission.retry_after())}
+
+    try:
+        user_question = request.form["msg"]
+        conversation_id, conversation = conversations.get(request.cookies.get("conversation_id"))
+        with conversation.lock:
+            answer, path = get_medical_answer(user_question, deadline, conversation, prefetch_key(request))
+            if path != PATH_ERROR:
+                conversation.add_turn(user_question, answer)
+    finally:
+        admission.release()
+
+    set_fields(answer_path=path)
+    set_verbose_fields(question=user_question, answer=answer)
+    response = make_response(answer, 200, {"X-Answer-Path": path})
+    response.set_cookie("conversation_id", conversation_id, httponly=True, samesite="Lax")
+    return response
 
 if __name__ == '__main__':
     print("=" * 60)
@@ -2,7 +2,12 @@ import streamlit as st
 from dotenv import load_dotenv
 import requests
 import os
+import threading
+import time
 from datetime import datetime
+from src.llm import stream_groq_chat
+from src.answering import Deadline, extractive_answer, PATH_LLM, PATH_EXTRACTIVE, PATH_ERROR
+from src.retrieval import retrieve
 
 # Page configuration
 st.set_page_config(
@@ -28,74 +33,141 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
+if 'pending_job' not in st.session_state:
+    st.session_state.pending_job = None
+if 'last_submitted' not in st.session_state:
+    st.session_state.last_submitted = None
 
 @st.cache_resource
 def initialize_components():
     """Initialize embeddings and Pinecone (cached)"""
     with st.spinner("📄 Loading AI components... (This may take 20-30 seconds on first run)"):
-        from src.helper import download_hugging_face_embeddings
-        from pinecone import Pinecone
+        from src.helper import load_embeddings
+        from src.retrieval import connect_live_vector_store
         
-        # Initialize Pinecone with NEW API (pinecone 7.x)
-        pc = Pinecone(api_key=PINECONE_API_KEY)
+        embeddings = load_embeddings()
         
-        embeddings = download_hugging_face_embeddings()
-        
-        # Use NEW Pinecone API with langchain_pinecone
-        from langchain_pinecone import PineconeVectorStore
-        docsearch = PineconeVectorStore.from_existing_index(
-            index_name="medical-chatbot",
-            embedding=embeddings
-        )
+        # Follows the published index snapshot and hot-swaps when it changes
+        docsearch = connect_live_vector_store(embeddings)
         
     return embeddings, docsearch
 
-def get_medical_answer(question, docsearch):
-    """Get answer using Groq API"""
-    try:
-        # Get relevant documents
-        docs = docsearch.similarity_search(question, k=3)
-        context = "\n".join([doc.page_content for doc in docs])
-        
-        # Prepare request
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful medical assistant. Use the provided medical context to answer questions accurately. Always remind users to consult healthcare professionals for medical advice. Keep responses concise and well-structured."
-                },
-                {
-                    "role": "user",
-                    "content": f"Medical Context:\n{context}\n\nQuestion: {question}"
-                }
-            ],
-            "temperature": 0.3,
-            "max_tokens": 500
-        }
-        
-        # Make API call
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            answer = result['choices'][0]['message']['content']
-            return answer.strip(), context
+SYSTEM_PROMPT = "You are a helpful medical assistant. Use the provided medical context to answer questions accurately. Always remind users to consult healthcare professionals for medical advice. Keep responses concise and well-structured."
+
+def format_source(doc):
+    """e.g. 'gale_encyclopedia.pdf, page 42' (page numbers are 0-based in metadata)"""
+    source = os.path.basename(doc.metadata.get("source") or "unknown")
+    page = doc.metadata.get("page")
+    return f"{source}, page {page + 1}" if page is not None else source
+
+class AnswerJob:
+    """
+    Runs retrieval + a streamed Groq call on a background thread.
+
+    Everything shares one end-to-end Deadline; if the model can't answer in
+    time the job falls back to an extractive answer from the top passages.
+
+    The job lives in session state, so a rerun (e.g. a sidebar click) only
+    stops the *rendering* of the current script run - the request itself keeps
+    going and the next run picks up the tokens received so far.
+    """
+
+    def __init__(self, question, docsearch):
+        self.question = question
+        self.docsearch = docsearch
+        self.timestamp = datetime.now().strftime("%I:%M %p")
+        self.tokens = []
+        self.context = ""
+        self.sources = []
+        self.retrieval = {}
+        self.deadline = Deadline()
+        self.path = PATH_LLM
+        self.done = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def text(self):
+        return "".join(self.tokens)
+
+    def _run(self):
+        docs = []
+        try:
+            # Get relevant documents
+            docs, self.retrieval = retrieve(self.docsearch, self.question)
+            self.context = "\n".join([doc.page_content for doc in docs])
+            self.sources = [format_source(doc) for doc in docs]
+
+            if not self.deadline.allows_llm():
+                self._fallback(docs)
+                return
+
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Medical Context:\n{self.context}\n\nQuestion: {self.question}"}
+            ]
+
+            for token in stream_groq_chat(GROQ_API_KEY, messages, timeout=self.deadline.remaining(), deadline=self.deadline):
+                self.tokens.append(token)
+
+            if not self.tokens:
+                self._fallback(docs)
+            elif self.deadline.expired():
+                self.tokens.append(" … *(answer cut short - time limit reached)*")
+        except requests.exceptions.RequestException:
+            if not self.tokens:
+                self._fallback(docs)
+        except Exception as e:
+            self.tokens.append(f"Error: {str(e)}")
+            self.path = PATH_ERROR
+        finally:
+            self.done = True
+
+    def _fallback(self, docs):
+        """No LLM answer in time - answer from the retrieved passages instead"""
+        answer = extractive_answer(self.question, docs)
+        if answer is None:
+            self.tokens = ["I apologize, but I'm having trouble processing your question. Please try again."]
+            self.path = PATH_ERROR
         else:
-            return "I apologize, but I'm having trouble processing your question. Please try again.", ""
-        
-    except Exception as e:
-        return f"Error: {str(e)}", ""
+            self.tokens = [answer]
+            self.path = PATH_EXTRACTIVE
+
+def render_pending_answer(job):
+    """Stream the in-flight answer into the chat area until the job finishes"""
+    st.markdown(f"""
+        <div class="user-message">
+            <strong>👤 You ({job.timestamp}):</strong><br>
+            {job.question}
+        </div>
+    """, unsafe_allow_html=True)
+
+    placeholder = st.empty()
+    while True:
+        done = job.done
+        text = job.text or "🤔 Thinking..."
+        cursor = "" if done else " ▌"
+        placeholder.markdown(f"""
+            <div class="bot-message">
+                <strong>🤖 Medical Assistant:</strong><br>
+                {text}{cursor}
+            </div>
+        """, unsafe_allow_html=True)
+        if done:
+            break
+        time.sleep(0.05)
+
+    st.session_state.chat_history.append({
+        "question": job.question,
+        "answer": job.text.strip(),
+        "timestamp": job.timestamp,
+        "context": job.context,
+        "sources": job.sources,
+        "retrieval": job.retrieval,
+        "path": job.path
+    })
+    st.session_state.pending_job = None
+    st.rerun()
 
 # Custom CSS for bigger, better interface
 st.markdown("""
@@ -284,18 +356,18 @@ with col2:
     ask_button = st.button("🔍 Get Answer", use_container_width=True, type="primary")
 
 # Process question
-if (ask_button or user_question) and user_question:
+# Only start a new request for a newly submitted question - reruns triggered by
+# other widgets keep the old text_input value and must not ask it again.
+is_new_question = ask_button or user_question != st.session_state.last_submitted
+if user_question and is_new_question and st.session_state.pending_job is None:
     if st.session_state.initialized:
-        with st.spinner("🤔 Thinking... (This may take a few seconds)"):
-            answer, context = get_medical_answer(user_question, st.session_state.docsearch)
-            
-            # Add to chat history
-            st.session_state.chat_history.append({
-                "question": user_question,
-                "answer": answer,
-                "timestamp": datetime.now().strftime("%I:%M %p"),
-                "context": context
-            })
+        st.session_state.last_submitted = user_question
+        st.session_state.pending_job = AnswerJob(user_question, st.session_state.docsearch)
+
+# Stream the in-flight answer (survives reruns from sidebar interactions)
+if st.session_state.pending_job is not None:
+    st.markdown("---")
+    render_pending_answer(st.session_state.pending_job)
 
 # Display chat history (most recent first)
 if st.session_state.chat_history:
@@ -318,9 +390,18 @@ if st.session_state.chat_history:
                 {chat['answer']}
             </div>
         """, unsafe_allow_html=True)
+        if chat.get('path') == PATH_EXTRACTIVE:
+            st.caption("⚡ Quick answer from source passages (the AI model didn't respond in time)")
         
         # Show context in expander
         with st.expander("📚 View Source Context"):
+            if chat.get('sources'):
+                st.caption(" · ".join(chat['sources']))
+            retrieval = chat.get('retrieval')
+            if retrieval and retrieval.get('source') == 'title':
+                st.caption(f"📖 Direct encyclopedia entry match ({retrieval['k']} chunks, no vector search)")
+            elif retrieval:
+                st.caption(f"k={retrieval['k']} · ~{retrieval['tokens_saved']} prompt tokens saved vs k=3")
             st.text(chat['context'])
         
         if i < len(st.session_state.chat_history) - 1:
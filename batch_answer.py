@@ -0,0 +1,68 @@
+"""
+Answer a JSONL file of questions in bulk.
+
+    python batch_answer.py questions.jsonl answers.jsonl --concurrency 4 --rpm 30
+
+Input lines look like {"id": "q1", "question": "What is diabetes?"}. Answers,
+sources and per-stage timings are appended to the output as they complete;
+re-running with the same output file resumes and skips answered questions
+(failed and partly written answers are removed from the file and retried).
+"""
+
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.batch import BatchInputError, answer_questions, read_questions, resume_output
+from src.helper import load_embeddings
+from src.retrieval import connect_vector_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--k", type=int, default=None, help="Fixed top-k (default: score-adaptive)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=int, default=30, help="Groq requests per minute")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    done = resume_output(args.output)
+    if done:
+        print(f"⏩ Resuming: {len(done)} questions already answered")
+
+    with open(args.input) as f:
+        try:
+            items = [item for item in read_questions(f) if item["id"] not in done]
+        except BatchInputError as e:
+            raise SystemExit(f"❌ {args.input} {e}")
+    print(f"📋 {len(items)} questions to answer")
+    if not items:
+        return
+
+    embeddings = load_embeddings()
+    docsearch = connect_vector_store(embeddings)
+
+    start = time.time()
+    count = 0
+    with open(args.output, "a") as out:
+        for result in answer_questions(items, embeddings, docsearch, os.environ.get("GROQ_API_KEY"),
+                                       k=args.k, batch_size=args.batch_size,
+                                       concurrency=args.concurrency, requests_per_minute=args.rpm):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            count += 1
+            if count % 50 == 0:
+                print(f"✅ {count}/{len(items)} answered ({count / (time.time() - start):.1f}/s)")
+
+    print(f"🎉 Answered {count} questions in {time.time() - start:.0f}s → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
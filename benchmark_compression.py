@@ -0,0 +1,78 @@
+"""
+Benchmark compressed vector indexes against the uncompressed (float32) index.
+
+Reports resident memory, per-query latency and recall@k (overlap with the exact
+top-k). Uses the vectors in the chunk store when present, otherwise synthetic
+clustered 384-dim vectors.
+
+    python benchmark_compression.py --n 50000 --queries 200 --k 3
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.vector_index import CompressedVectorIndex, MODES
+
+
+def synthetic_vectors(n, dim, clusters=200, seed=0):
+    """Clustered unit vectors, roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_vectors(n, dim):
+    from src.chunk_store import ChunkStore, DEFAULT_CHUNK_STORE
+    path = os.environ.get("CHUNK_STORE_PATH", DEFAULT_CHUNK_STORE)
+    if os.path.exists(path):
+        ids, vectors = ChunkStore(path).all_vectors()
+        if ids:
+            print(f"📦 Using {len(ids)} vectors from {path}")
+            return ids, vectors
+    print(f"🧪 Using {n} synthetic {dim}-dim vectors")
+    vectors = synthetic_vectors(n, dim)
+    return [str(i) for i in range(n)], vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--oversample", type=int, default=None, help="default: per-mode")
+    parser.add_argument("--pca-dims", type=int, default=128)
+    args = parser.parse_args()
+
+    ids, vectors = load_vectors(args.n, args.dim)
+
+    # Queries: perturbed copies of random corpus vectors
+    rng = np.random.default_rng(1)
+    # A small chunk store may hold fewer vectors than --queries
+    n_queries = min(args.queries, len(ids))
+    picks = rng.choice(len(ids), size=n_queries, replace=False)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(n_queries, vectors.shape[1])).astype(np.float32)
+
+    exact = CompressedVectorIndex.build(ids, vectors, mode="float")
+    truth = [set(i for i, _ in exact.search(q, k=args.k)) for q in queries]
+
+    print()
+    print(f"{'mode':<8} {'resident MB':>12} {'ms/query':>10} {'recall@' + str(args.k):>10}")
+    print("-" * 44)
+    for mode in MODES:
+        index = CompressedVectorIndex.build(ids, vectors, mode=mode,
+                                            pca_dims=args.pca_dims, oversample=args.oversample)
+        start = time.perf_counter()
+        results = [set(i for i, _ in index.search(q, k=args.k)) for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(r & t) / len(t) for r, t in zip(results, truth)])
+        print(f"{mode:<8} {index.memory_bytes() / 1e6:>12.1f} {ms:>10.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
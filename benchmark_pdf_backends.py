@@ -0,0 +1,111 @@
+"""
+Compare PDF extraction backends on throughput and text fidelity.
+
+Fidelity is the word-level F1 against known text: the generated synthetic PDF's
+source text by default, or the --reference backend's output for real PDFs.
+Also shows how fast the parsed-page cache reads back and how big it is.
+
+    python benchmark_pdf_backends.py                          # synthetic PDF
+    python benchmark_pdf_backends.py --data data/ --max-pages 200 --reference pypdf
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from benchmark_stages import write_synthetic_pdf
+from src import pdf_extract
+
+_WORD = re.compile(r"\w+")
+
+
+def word_f1(expected, actual):
+    expected = Counter(_WORD.findall(expected.lower()))
+    actual = Counter(_WORD.findall(actual.lower()))
+    overlap = sum((expected & actual).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(actual.values())
+    recall = overlap / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def extract(paths, backend, max_pages):
+    pages = {}
+    start = time.perf_counter()
+    for path in paths:
+        for number, text in itertools.islice(pdf_extract.iter_pages(path, backend), max_pages):
+            pages[(path, number)] = text
+    return pages, time.perf_counter() - start
+
+
+def timed_cache_read(paths, backend, cache_dir):
+    """(seconds for a cached read, cache bytes, PDF bytes) - first pass fills the cache"""
+    pdf_extract.PAGE_CACHE_DIR = cache_dir
+    for path in paths:
+        for _ in pdf_extract.extract_pages(path, backend, cache=True):
+            pass
+    start = time.perf_counter()
+    for path in paths:
+        for _ in pdf_extract.extract_pages(path, backend, cache=True):
+            pass
+    seconds = time.perf_counter() - start
+    cache_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(cache_dir, f"*-{backend}-*")))
+    return seconds, cache_bytes, sum(os.path.getsize(p) for p in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF extraction backends")
+    parser.add_argument("--data", help="Directory of sample PDFs (default: a generated synthetic PDF)")
+    parser.add_argument("--max-pages", type=int, default=200, help="Pages per PDF")
+    parser.add_argument("--reference", default="pypdf", help="Reference backend for real PDFs")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-pdf-")
+    try:
+        truth = None
+        if args.data:
+            paths = sorted(glob.glob(os.path.join(args.data, "*.pdf")))
+            if not paths:
+                parser.error(f"no PDFs in {args.data}")
+        else:
+            path = os.path.join(workdir, "synthetic.pdf")
+            texts = write_synthetic_pdf(path, pages=50)
+            paths = [path]
+            truth = {(path, number): text for number, text in enumerate(texts)}
+
+        backends = pdf_extract.available_backends()
+        print(f"🔎 Backends installed: {', '.join(backends) or 'none'}")
+        if truth is None:
+            if args.reference not in backends:
+                parser.error(f"reference backend {args.reference} is not installed")
+            truth, _ = extract(paths, args.reference, args.max_pages)
+            print(f"📏 Fidelity measured against {args.reference}")
+        else:
+            print("📏 Fidelity measured against the synthetic PDF's source text")
+
+        print(f"{'backend':<10}{'pages':>7}{'pages/s':>10}{'chars/page':>12}{'word F1':>9}"
+              f"{'cached p/s':>12}{'cache/PDF':>11}")
+        for backend in backends:
+            pages, seconds = extract(paths, backend, args.max_pages)
+            scores = [word_f1(truth[key], text) for key, text in pages.items() if key in truth]
+            chars = sum(len(text) for text in pages.values()) / max(1, len(pages))
+            cache_seconds, cache_bytes, pdf_bytes = timed_cache_read(
+                paths, backend, os.path.join(workdir, "cache"))
+            total_pages = sum(1 for _ in itertools.chain.from_iterable(
+                pdf_extract.extract_pages(p, backend, cache=True) for p in paths))
+            print(f"{backend:<10}{len(pages):>7}{len(pages) / seconds:>10.1f}{chars:>12.0f}"
+                  f"{sum(scores) / max(1, len(scores)):>9.3f}"
+                  f"{total_pages / cache_seconds:>12.0f}{cache_bytes / pdf_bytes:>10.0%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Offline per-stage microbenchmarks with regression baselines.
+
+Times each stage of the chatbot on fixed synthetic inputs: a generated PDF,
+seeded synthetic text, a deterministic hash-based fake embedder, a word-level
+fake tokenizer and a local fake Groq endpoint, so nothing touches Pinecone,
+Groq or HuggingFace.
+
+    python benchmark_stages.py                  # compare against benchmark_baseline.json
+    python benchmark_stages.py --update         # record new baselines
+    python benchmark_stages.py --check          # CI: also fail without a baseline to compare to
+    python benchmark_stages.py --stages split,retrieve --tolerance 0.3
+    python benchmark_stages.py --pdf-dir data   # also time your own sample PDFs
+
+Timings are normalized by a fixed pure-Python calibration loop, so a baseline
+recorded on one machine stays roughly comparable on another. A stage fails
+when its normalized median is more than --tolerance slower than the baseline;
+the exit code is 1 if any stage regressed. With --check (the default when CI
+is set), a missing baseline file, a stage without a baseline entry or a
+skipped stage is an error too, so a regression can't pass unchecked.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASELINE_FILE = "benchmark_baseline.json"
+DIM = 384
+
+_VOCAB = (
+    "patient disease symptom treatment therapy chronic acute infection fever pain blood pressure heart "
+    "lung kidney liver diabetes insulin glucose asthma inflammation antibiotic dose tablet injection "
+    "diagnosis prognosis syndrome disorder tissue cell immune response viral bacterial medication "
+    "clinical trial risk factor lesion tumor benign malignant surgery recovery nutrition vitamin"
+).split()
+_FILLER = "the of and in with is may be for to a by as or".split()
+
+
+def synthetic_text(rng, sentences):
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(_VOCAB if rng.random() < 0.6 else _FILLER) for _ in range(rng.randint(8, 22))]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def write_synthetic_pdf(path, pages=20, seed=0):
+    """Minimal text-only PDF (Helvetica, one content stream per page); returns the page texts"""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    texts = []
+    for _ in range(pages):
+        text = synthetic_text(rng, 40)
+        texts.append(text)
+        lines, line = [], ""
+        for word in text.split():
+            if len(line) + len(word) > 90:
+                lines.append(line)
+                line = ""
+            line = f"{line} {word}".strip()
+        lines.append(line)
+        escaped = [l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for l in lines]
+        stream = "BT /F1 10 Tf 12 TL 40 760 Td " + " ".join(f"({l}) Tj T*" for l in escaped) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(body)
+    return texts
+
+
+class HashEmbeddings:
+    """Deterministic fake embedder: unit vectors seeded from the text's hash"""
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def _vector(self, text):
+        import numpy as np
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class WordTokenizer:
+    """
+    Deterministic stand-in for the MiniLM tokenizer: one token per word or
+    punctuation mark, so the split and ingest stages run offline
+    """
+    _TOKEN = re.compile(r"\w+|[^\w\s]")
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        special = 2 if add_special_tokens else 0  # [CLS] + [SEP]
+        if isinstance(texts, str):
+            offsets = [m.span() for m in self._TOKEN.finditer(texts)]
+            return {"input_ids": list(range(len(offsets) + special)), "offset_mapping": offsets}
+        return {"input_ids": [list(range(len(self._TOKEN.findall(text)) + special)) for text in texts]}
+
+
+class _NullIndex:
+    def upsert(self, vectors, namespace=None):
+        pass
+
+
+class _FakeGroqHandler(BaseHTTPRequestHandler):
+    """OpenAI-style chat endpoint streaming a fixed answer as SSE frames"""
+    tokens = [f"token{i} " for i in range(200)]
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in self.tokens:
+                frame = {"choices": [{"delta": {"content": token}}]}
+                self.wfile.write(f"data: {json.dumps(frame)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            body = json.dumps({"choices": [{"message": {"content": "".join(self.tokens)}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _documents(n, seed=0):
+    from langchain_core.documents import Document
+    rng = random.Random(seed)
+    return [Document(page_content=synthetic_text(rng, 30), metadata={"source": "synthetic.pdf", "page": i})
+            for i in range(n)]
+
+
+# Each setup(workdir, args) returns (run, units): run() is timed, units is the
+# number of items it processes (pages, chunks, queries, ...) for the per-unit figure.
+
+def setup_load_pdf(workdir, args):
+    from src.helper import load_pdf_file
+    pdf_dir = os.path.join(workdir, "pdfs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    write_synthetic_pdf(os.path.join(pdf_dir, "synthetic.pdf"), pages=20)
+    return lambda: load_pdf_file(pdf_dir, cache=False), 20
+
+
+def setup_load_pdf_cached(workdir, args):
+    from src import pdf_extract
+    from src.helper import load_pdf_file
+    pdf_dir = os.path.join(workdir, "pdfs-cached")
+    os.makedirs(pdf_dir, exist_ok=True)
+    write_synthetic_pdf(os.path.join(pdf_dir, "synthetic.pdf"), pages=20)
+    pdf_extract.PAGE_CACHE_DIR = os.path.join(workdir, "page_cache")
+    return lambda: load_pdf_file(pdf_dir, cache=True), 20  # the warm-up run fills the cache
+
+
+def setup_split(workdir, args):
+    from src.helper import get_text_splitter
+    docs = _documents(200)
+    splitter = get_text_splitter(WordTokenizer())
+    return lambda: splitter.split_documents(docs), len(docs)
+
+
+def setup_ingest(workdir, args):
+    from src.chunk_store import ChunkStore
+    from src.pipeline import IngestionPipeline
+    docs = _documents(100)
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        store = ChunkStore(os.path.join(workdir, f"ingest-{counter[0]}.db"))
+        IngestionPipeline(HashEmbeddings(), _NullIndex(), chunk_store=store, tokenizer=WordTokenizer()).run(iter(docs))
+    return run, len(docs)
+
+
+def setup_embed_server(workdir, args):
+    from src.embedding_server import EmbeddingServer, SocketEmbeddings
+    socket_path = os.path.join(workdir, "embed.sock")
+    server = EmbeddingServer(socket_path, HashEmbeddings())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = SocketEmbeddings(socket_path)
+    rng = random.Random(0)
+    texts = [synthetic_text(rng, 3) for _ in range(256)]
+    return lambda: client.embed_documents(texts), len(texts)
+
+
+def setup_retrieve(workdir, args):
+    import numpy as np
+    from src.chunk_store import ChunkStore
+    from src.retrieval import ChunkStoreVectorStore, select_adaptive, RETRIEVAL_MAX_K
+    from src.vector_index import CompressedVectorIndex
+
+    n = 20000
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"chunk-{i}" for i in range(n)]
+    store = ChunkStore(os.path.join(workdir, "retrieve.db"))
+    text_rng = random.Random(0)
+    store.put_many([(i, synthetic_text(text_rng, 4), "synthetic.pdf", 0) for i in ids])
+    index = CompressedVectorIndex.build(ids, vectors, mode="int8")
+    vector_store = ChunkStoreVectorStore(index, HashEmbeddings(), store)
+    queries = [vectors[i] + 0.1 * rng.standard_normal(DIM).astype(np.float32) for i in range(50)]
+
+    def run():
+        for query in queries:
+            select_adaptive(vector_store.similarity_search_by_vector_with_score(query.tolist(), k=RETRIEVAL_MAX_K))
+    return run, len(queries)
+
+
+def setup_prompt(workdir, args):
+    from src.conversation import Conversation
+    from src.prompt import build_messages
+    rng = random.Random(0)
+    questions = [synthetic_text(rng, 1) for _ in range(100)]
+    contexts = [synthetic_text(rng, 20) for _ in range(100)]
+
+    def run():
+        conversation = Conversation()
+        for question, context in zip(questions, contexts):
+            build_messages(context, question, conversation.history_messages())
+            conversation.add_turn(question, context[:400])
+    return run, len(questions)
+
+
+def setup_extractive(workdir, args):
+    from src.answering import extractive_answer
+    docs = _documents(6)
+    rng = random.Random(1)
+    questions = [synthetic_text(rng, 1) for _ in range(100)]
+    return lambda: [extractive_answer(q, docs) for q in questions], len(questions)
+
+
+def setup_llm_client(workdir, args):
+    from src import llm
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGroqHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Point the Groq client at the local fake endpoint for this process only
+    llm.GROQ_CHAT_URL = f"http://127.0.0.1:{server.server_address[1]}/chat"
+    messages = [{"role": "user", "content": "benchmark"}]
+    return lambda: list(llm.stream_groq_chat("fake-key", messages)), len(_FakeGroqHandler.tokens)
+
+
+STAGES = {
+    "load_pdf": setup_load_pdf,
+    "load_pdf_cached": setup_load_pdf_cached,
+    "split": setup_split,
+    "ingest": setup_ingest,
+    "embed_server": setup_embed_server,
+    "retrieve": setup_retrieve,
+    "prompt": setup_prompt,
+    "extractive": setup_extractive,
+    "llm_client": setup_llm_client,
+}
+
+
+def calibrate(repeat=5):
+    """Median ms of a fixed pure-Python workload, to normalize across machines"""
+    def work():
+        total = 0
+        for i in range(300000):
+            total += (i * i) % 7
+        return total
+    return _median_ms(work, repeat)
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_stage(name, workdir, args):
+    run, units = STAGES[name](workdir, args)
+    run()  # warm-up (imports, caches, first connections)
+    ms = _median_ms(run, args.repeat)
+    return {"ms": round(ms, 3), "units": units, "ms_per_unit": round(ms / units, 4)}
+
+
+def _quiet(fn, *a):
+    """Stage code prints progress lines; keep the report readable"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        return fn(*a)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline per-stage microbenchmarks")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", default=bool(os.environ.get("CI")),
+                        help="Fail when there is no baseline to compare against (default when CI is set)")
+    parser.add_argument("--pdf-dir", help="Also time load_pdf_file on these sample PDFs")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+    if args.pdf_dir:
+        from src.helper import load_pdf_file
+        STAGES["load_pdf_samples"] = lambda workdir, a: (lambda: load_pdf_file(a.pdf_dir, cache=False), 1)
+        names.append("load_pdf_samples")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif args.check and not args.update:
+        print(f"❌ No baseline at {args.baseline} - record one with --update and commit it")
+        return 1
+
+    calibration_ms = calibrate()
+    print(f"⏱️ Calibration: {calibration_ms:.1f} ms (baseline: {baseline.get('calibration_ms', '-')})")
+    scale = calibration_ms / baseline["calibration_ms"] if baseline.get("calibration_ms") else 1.0
+
+    results, regressions, unchecked = {}, [], []
+    workdir = tempfile.mkdtemp(prefix="bench-stages-")
+    try:
+        print(f"{'stage':<18}{'median ms':>12}{'ms/unit':>12}{'baseline':>12}{'change':>10}")
+        for name in names:
+            try:
+                result = _quiet(run_stage, name, workdir, args)
+            except ImportError as e:
+                print(f"{name:<18}{'skipped':>12}  (missing dependency: {e.name})")
+                unchecked.append(name)
+                continue
+            except Exception as e:
+                print(f"{name:<18}{'failed':>12}  ({type(e).__name__}: {e})")
+                regressions.append(name)
+                continue
+            results[name] = result
+            base = baseline.get("stages", {}).get(name)
+            if base is None:
+                print(f"{name:<18}{result['ms']:>12.2f}{result['ms_per_unit']:>12.4f}{'-':>12}{'new':>10}")
+                unchecked.append(name)
+                continue
+            change = result["ms"] / (base["ms"] * scale) - 1
+            flag = " ❌" if change > args.tolerance else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<18}{result['ms']:>12.2f}{result['ms_per_unit']:>12.4f}"
+                  f"{base['ms'] * scale:>12.2f}{change:>+9.0%}{flag}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.update:
+        stages = {**baseline.get("stages", {}), **results}
+        with open(args.baseline, "w") as f:
+            json.dump({"calibration_ms": round(calibration_ms, 3), "stages": stages}, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"❌ Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    if args.check and unchecked:
+        print(f"❌ Not compared against the baseline: {', '.join(unchecked)}")
+        return 1
+    print("✅ No stage regressed" if baseline else "ℹ️ No baseline yet - run with --update to record one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
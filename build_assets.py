@@ -0,0 +1,26 @@
+"""
+Bundle the chat UI's front-end assets for self-hosting (see src/assets.py).
+
+    python build_assets.py              # fetch missing vendor files, then fingerprint + compress
+    python build_assets.py --offline    # only fingerprint what is already in static/
+    python build_assets.py --refetch    # re-download vendor files
+"""
+
+import argparse
+
+from src.assets import build_assets, fetch_vendor_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, compressed static assets")
+    parser.add_argument("--offline", action="store_true", help="Do not download vendor files")
+    parser.add_argument("--refetch", action="store_true", help="Re-download vendor files")
+    args = parser.parse_args()
+
+    if not args.offline:
+        fetch_vendor_assets(force=args.refetch)
+    build_assets()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Gunicorn configuration for multi-worker production serving.
+
+The embedding model is loaded once in the master process and workers are
+forked afterwards, so the MiniLM weights are shared copy-on-write instead of
+being loaded again by every worker.
+
+    gunicorn -c gunicorn.conf.py
+    WEB_CONCURRENCY=4 WSGI_APP=app:app gunicorn -c gunicorn.conf.py
+"""
+
+import gc
+import importlib
+import multiprocessing
+import os
+
+wsgi_app = os.environ.get("WSGI_APP", "app_render:app")
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 120
+
+# Import the app (and load the model) in the master before forking
+preload_app = True
+
+
+def torch_threads_per_worker():
+    """Split the CPU cores between workers so torch pools don't oversubscribe"""
+    configured = os.environ.get("TORCH_THREADS_PER_WORKER")
+    if configured:
+        return int(configured)
+    return max(1, multiprocessing.cpu_count() // workers)
+
+
+def memory_usage():
+    """Return (rss_mb, pss_mb) for the current process (Linux only)"""
+    rss = pss = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    rss = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    pss = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return rss, pss
+
+
+def when_ready(server):
+    module = importlib.import_module(wsgi_app.split(":")[0])
+    if hasattr(module, "initialize_embeddings"):
+        module.initialize_embeddings()
+
+    # Move everything loaded so far into the permanent generation so the
+    # cyclic GC in workers never writes to (and un-shares) those pages
+    gc.freeze()
+
+    rss, pss = memory_usage()
+    if rss is not None:
+        server.log.info(f"🧠 Master loaded model: RSS {rss:.0f} MB")
+
+
+def post_fork(server, worker):
+    n_threads = torch_threads_per_worker()
+    os.environ["OMP_NUM_THREADS"] = str(n_threads)
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+    server.log.info(f"⚙️ Worker {worker.pid}: {n_threads} torch thread(s)")
+
+
+def post_worker_init(worker):
+    rss, pss = memory_usage()
+    if rss is not None:
+        worker.log.info(f"🧠 Worker {worker.pid}: RSS {rss:.0f} MB, PSS {pss:.0f} MB")
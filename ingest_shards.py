@@ -0,0 +1,59 @@
+"""
+Sharded ingestion that can run on several machines sharing one directory.
+
+    python ingest_shards.py plan   --manifest /shared/ingest --pages-per-shard 200
+    python ingest_shards.py work   --manifest /shared/ingest      # run on every box
+    python ingest_shards.py status --manifest /shared/ingest
+    python ingest_shards.py merge  --manifest /shared/ingest      # once all shards are done
+
+Workers that crash are detected by their expired lease and their shards are
+picked up again by the remaining workers.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+from src.sharding import ShardWorker, merge_shards, plan_shards, shard_status
+from src.snapshots import new_version, publish, snapshot_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded, checkpointed ingestion")
+    parser.add_argument("command", choices=["plan", "work", "status", "merge"])
+    parser.add_argument("--manifest", required=True, help="Shared manifest directory")
+    parser.add_argument("--data", default="data/")
+    parser.add_argument("--pages-per-shard", type=int, default=200)
+    parser.add_argument("--no-upsert", action="store_true", help="Merge into the chunk store only")
+    parser.add_argument("--no-publish", action="store_true", help="Build the snapshot without making it live")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    if args.command == "plan":
+        plan_shards(args.data, args.manifest, args.pages_per_shard)
+
+    elif args.command == "work":
+        from src.helper import download_hugging_face_embeddings
+        ShardWorker(args.manifest, download_hugging_face_embeddings()).run()
+
+    elif args.command == "status":
+        status = shard_status(args.manifest)
+        print(f"📊 {status['done']}/{status['shards']} done, {status['claimed']} in progress, {status['pending']} pending")
+
+    elif args.command == "merge":
+        index = None
+        if not args.no_upsert:
+            from pinecone import Pinecone
+            index = Pinecone(api_key=os.environ.get("PINECONE_API_KEY")).Index("medical-chatbot")
+        # Merged output becomes a new snapshot (see src/snapshots.py)
+        version = new_version()
+        chunk_store_path = os.path.join(snapshot_path(version), "chunks.db")
+        merge_shards(args.manifest, chunk_store_path, index=index, namespace=version)
+        if not args.no_publish:
+            publish(version)
+
+
+if __name__ == "__main__":
+    main()
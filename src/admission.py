@@ -0,0 +1,157 @@
+"""
+Admission control for the answer endpoint.
+
+A bounded number of requests run at once, a bounded number wait for a slot,
+and everything beyond that is rejected immediately so the caller can retry
+later instead of piling up threads waiting on Groq.
+"""
+
+import hmac
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Request threads per gunicorn worker (same setting gunicorn.conf.py uses)
+WORKER_THREADS = int(os.environ.get("GUNICORN_THREADS", 4))
+# Proxies in front of the app that append to X-Forwarded-For (Render: 1)
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 1))
+
+
+def default_max_concurrent():
+    """
+    One answer slot per worker thread, less one: a slot count at or above the
+    thread count could never be exceeded, so the wait queue and the 503 path
+    would never engage, and /health or /prefetch would have no thread left
+    """
+    return max(1, WORKER_THREADS - 1)
+
+
+def default_max_queue(max_concurrent):
+    """
+    Waiting requests hold a worker thread too, so only the threads beyond the
+    answer slots and the one kept for /health and /metrics can queue. With the
+    default 4 threads that is none: a 4th concurrent answer gets a 503 at once
+    instead of taking the spare thread. Queueing engages with more threads.
+    """
+    return max(0, WORKER_THREADS - 1 - max_concurrent)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=None, max_queue=None, queue_timeout=None):
+        self.max_concurrent = max_concurrent or int(os.environ.get("MAX_CONCURRENT_ANSWERS", default_max_concurrent()))
+        self.max_queue = (max_queue if max_queue is not None else
+                          int(os.environ.get("MAX_QUEUED_ANSWERS", default_max_queue(self.max_concurrent))))
+        self.queue_timeout = queue_timeout or float(os.environ.get("ANSWER_QUEUE_TIMEOUT", 5))
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0, "rate_limited": 0}
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Return True once a slot is held, False if the request should be shed"""
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                return False
+
+            self.waiting += 1
+            try:
+                end = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_concurrent:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected["queue_timeout"] += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def reject_rate_limited(self):
+        with self._cond:
+            self.rejected["rate_limited"] += 1
+
+    def retry_after(self):
+        """Rough seconds until capacity frees up, for the Retry-After header"""
+        with self._cond:
+            backlog = self.waiting + 1
+        return max(1, math.ceil(backlog / self.max_concurrent * self.queue_timeout))
+
+
+class RateLimiter:
+    """Per-client token bucket (rate requests/second, burst capacity)"""
+
+    def __init__(self, rate=None, burst=None, max_clients=10000):
+        self.rate = rate or float(os.environ.get("CLIENT_RATE_PER_MINUTE", 20)) / 60.0
+        self.burst = burst or int(os.environ.get("CLIENT_BURST", 5))
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, client):
+        """Return 0 if allowed, else seconds until the next request would be"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = math.ceil((1 - tokens) / self.rate)
+            self._buckets[client] = (tokens, now)
+            # Forget the least recently seen clients
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def client_id(request):
+    """
+    Client IP as recorded by the trusted proxy (Render runs behind one).
+
+    Only the hop the proxy appended to X-Forwarded-For is used: earlier hops
+    come from the client, so a made-up header can't dodge the rate limit.
+    Set TRUSTED_PROXIES=0 when the app is exposed directly.
+    """
+    hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+    if TRUSTED_PROXIES and len(hops) >= TRUSTED_PROXIES:
+        return hops[-TRUSTED_PROXIES]
+    return request.remote_addr or "unknown"
+
+
+def is_admin(request):
+    """True if the request carries ADMIN_TOKEN (admin routes are off when it is unset)"""
+    token = os.environ.get("ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(supplied, token)
+
+
+def prometheus_metrics(controller):
+    lines = [
+        "# TYPE answer_active gauge",
+        f"answer_active {controller.active}",
+        "# TYPE answer_queue_depth gauge",
+        f"answer_queue_depth {controller.waiting}",
+        "# TYPE answer_admitted_total counter",
+        f"answer_admitted_total {controller.admitted}",
+        "# TYPE answer_rejected_total counter",
+    ]
+    for reason, count in controller.rejected.items():
+        lines.append(f'answer_rejected_total{{reason="{reason}"}} {count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,78 @@
+import os
+import re
+import time
+
+ANSWER_DEADLINE_SECONDS = float(os.environ.get("ANSWER_DEADLINE_SECONDS", 15))
+
+# Don't start an LLM call that can't realistically finish
+MIN_LLM_SECONDS = float(os.environ.get("MIN_LLM_SECONDS", 1.5))
+
+PATH_LLM = "llm"
+PATH_EXTRACTIVE = "extractive"
+PATH_ERROR = "error"
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "how", "why", "when", "which",
+    "of", "for", "to", "in", "on", "and", "or", "do", "does", "can", "i", "my",
+    "about", "explain", "tell", "me", "with", "be"
+}
+
+
+class Deadline:
+    """End-to-end time budget for one request"""
+
+    def __init__(self, seconds=ANSWER_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.start = time.monotonic()
+        self.expires_at = self.start + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def allows_llm(self):
+        return self.remaining() >= MIN_LLM_SECONDS
+
+
+def _terms(text):
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def extractive_answer(question, docs, max_sentences=3):
+    """
+    Build an answer from the retrieved passages alone (no LLM).
+
+    Picks the sentences that share the most terms with the question, keeping
+    their original order within each passage.
+    """
+    if not docs:
+        return None
+
+    question_terms = _terms(question)
+    scored = []
+    for rank, doc in enumerate(docs):
+        for position, sentence in enumerate(_SENTENCE.split(" ".join(doc.page_content.split()))):
+            if len(sentence) < 25:
+                continue
+            overlap = len(question_terms & _terms(sentence))
+            # Ties go to better-ranked passages, then earlier sentences
+            scored.append((-overlap, rank, position, sentence))
+
+    if not scored:
+        return None
+
+    best = sorted(scored)[:max_sentences]
+    best.sort(key=lambda item: (item[1], item[2]))
+    bullets = "\n".join(f"• {sentence}" for _, _, _, sentence in best)
+    return (
+        "Here is what the medical reference says (quick answer from source passages):\n\n"
+        f"{bullets}\n\n"
+        "Please consult a healthcare professional for medical advice."
+    )
@@ -0,0 +1,244 @@
+"""
+Self-hosted, fingerprinted and compressed front-end assets.
+
+`python build_assets.py` downloads the vendor files chat.html used to pull
+from CDNs (Bootstrap, Font Awesome, jQuery, avatars) into static/vendor/, then
+copies everything under static/ into static/dist/ with a content hash in the
+filename, rewrites CSS url() references to the hashed names, and writes .gz
+(and .br, if brotli is installed) next to each text file. Templates call
+asset_url("style.css"), which resolves through static/dist/manifest.json.
+
+Hashed files are served from /assets/ with a one-year immutable
+Cache-Control, picking the pre-compressed variant the browser accepts. HTML
+and other dynamic text responses are compressed on the fly and revalidated
+with an ETag.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = "static"
+ASSET_DIR = os.path.join(STATIC_DIR, "dist")
+ASSET_MAX_AGE = 365 * 24 * 3600
+MIN_COMPRESS_BYTES = 500
+
+_FA = "https://use.fontawesome.com/releases/v5.5.0"
+_AVATAR_BOT = "https://cdn-icons-png.flaticon.com/512/387/387569.png"
+_AVATAR_USER = "https://i.ibb.co/d5b84Xw/Untitled-design.png"
+
+# Logical path (under static/) -> upstream URL. Also the fallback when assets
+# have not been built yet, so a dev checkout still renders.
+VENDOR_ASSETS = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css",
+    "vendor/jquery.min.js": "https://code.jquery.com/jquery-3.6.0.min.js",
+    "vendor/fontawesome/css/all.css": f"{_FA}/css/all.css",
+    "vendor/img/bot.png": _AVATAR_BOT,
+    "vendor/img/user.png": _AVATAR_USER,
+}
+# Every format all.css's @font-face rules name, so none of its url()s dangle
+VENDOR_ASSETS.update({
+    f"vendor/fontawesome/webfonts/{font}.{ext}": f"{_FA}/webfonts/{font}.{ext}"
+    for font in ("fa-solid-900", "fa-regular-400", "fa-brands-400")
+    for ext in ("woff2", "woff", "ttf", "eot", "svg")
+})
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".html", ".txt"}
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def fetch_vendor_assets(static_dir=STATIC_DIR, force=False):
+    """Download VENDOR_ASSETS into static/ (skips files already present)"""
+    fetched = 0
+    for logical, url in VENDOR_ASSETS.items():
+        path = os.path.join(static_dir, logical)
+        if os.path.exists(path) and not force:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            body = resp.read()
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+        fetched += 1
+        print(f"⬇️ {logical} ({len(body) / 1024:.0f} KB)")
+    return fetched
+
+
+def _hashed_name(logical, body):
+    stem, ext = os.path.splitext(os.path.basename(logical))
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+
+
+def _rewrite_css(logical, css, manifest):
+    """Point url() references at hashed files (or back at /static/ if not fingerprinted)"""
+    base = os.path.dirname(logical)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        # Font Awesome uses "font.eot?#iefix" and "font.svg#fontawesome"
+        path, sep, suffix = ref, "", ""
+        split = re.search(r"[?#]", ref)
+        if split:
+            path, sep, suffix = ref[:split.start()], ref[split.start()], ref[split.start() + 1:]
+        target = os.path.normpath(os.path.join(base, path)).replace(os.sep, "/")
+        if target in manifest:
+            return f"url({quote}{manifest[target]}{sep}{suffix}{quote})"
+        print(f"⚠️ {logical} references {target}, which is not in the build")
+        return f"url({quote}/static/{target}{sep}{suffix}{quote})"
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _write_compressed(path, body):
+    written = []
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gz) < len(body):
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+        written.append(len(gz))
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        if len(br) < len(body):
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+            written.append(len(br))
+    return min(written, default=len(body))
+
+
+def build_assets(static_dir=STATIC_DIR, out_dir=ASSET_DIR):
+    """Fingerprint and pre-compress everything under static/; return the manifest"""
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root).startswith(os.path.abspath(out_dir)):
+            continue
+        for name in files:
+            if name.endswith((".gz", ".br", ".tmp")):
+                continue
+            path = os.path.join(root, name)
+            sources.append(os.path.relpath(path, static_dir).replace(os.sep, "/"))
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    raw_bytes = sent_bytes = 0
+    # CSS last: its url() references need the hashed names of fonts and images
+    for logical in sorted(sources, key=lambda p: (p.endswith(".css"), p)):
+        with open(os.path.join(static_dir, logical), "rb") as f:
+            body = f.read()
+        if logical.endswith(".css"):
+            body = _rewrite_css(logical, body.decode("utf-8"), manifest).encode("utf-8")
+        hashed = _hashed_name(logical, body)
+        target = os.path.join(out_dir, hashed)
+        if not os.path.exists(target):
+            with open(target, "wb") as f:
+                f.write(body)
+        raw_bytes += len(body)
+        if os.path.splitext(logical)[1] in COMPRESSIBLE_EXTENSIONS:
+            sent_bytes += _write_compressed(target, body)
+        else:
+            sent_bytes += len(body)
+        manifest[logical] = hashed
+
+    # Old hashed files are left in place for clients still holding old HTML
+    tmp = os.path.join(out_dir, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, "manifest.json"))
+    print(f"📦 Built {len(manifest)} assets: {raw_bytes / 1024:.0f} KB → {sent_bytes / 1024:.0f} KB compressed")
+    return manifest
+
+
+def load_manifest(out_dir=ASSET_DIR):
+    try:
+        with open(os.path.join(out_dir, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _pick_encoding(accept_encodings, available):
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        if ext in available and accept_encodings[encoding]:
+            return encoding, ext
+    return None, ""
+
+
+def _compress_body(body, accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br", brotli.compress(body, quality=5)
+    if accept_encodings["gzip"]:
+        return "gzip", gzip.compress(body, compresslevel=6)
+    return None, body
+
+
+def install_assets(app, out_dir=ASSET_DIR):
+    """asset_url() template helper, /assets/ route and response compression"""
+    from flask import request, send_from_directory, url_for
+
+    out_dir = os.path.join(app.root_path, out_dir)
+    manifest = load_manifest(out_dir)
+    if manifest:
+        print(f"📦 Serving {len(manifest)} fingerprinted assets")
+    else:
+        print("⚠️ No asset manifest (run build_assets.py); falling back to CDN/static URLs")
+
+    @app.template_global()
+    def asset_url(path):
+        hashed = manifest.get(path)
+        if hashed:
+            return url_for("hashed_asset", filename=hashed)
+        if path in VENDOR_ASSETS:
+            return VENDOR_ASSETS[path]
+        return url_for("static", filename=path)
+
+    @app.route("/assets/<path:filename>")
+    def hashed_asset(filename):
+        available = {ext for ext in (".br", ".gz") if os.path.exists(os.path.join(out_dir, filename + ext))}
+        encoding, ext = _pick_encoding(request.accept_encodings, available)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_from_directory(out_dir, filename + ext, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        response.headers.pop("Content-Disposition", None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if available:
+            response.vary.add("Accept-Encoding")
+        # The name changes whenever the content does, so it never needs revalidating
+        response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+        return response
+
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+            return response
+        if not response.mimetype.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if response.mimetype == "text/html" and request.method == "GET":
+            # Pages reference hashed assets, so only the HTML itself is revalidated
+            response.headers.setdefault("Cache-Control", "no-cache")
+            response.add_etag(weak=True)
+            response.make_conditional(request)
+        if response.status_code != 200:
+            return response
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_BYTES:
+            return response
+        encoding, compressed = _compress_body(body, request.accept_encodings)
+        response.vary.add("Accept-Encoding")
+        if encoding:
+            response.set_data(compressed)
+            response.headers["Content-Encoding"] = encoding
+        return response
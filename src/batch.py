@@ -0,0 +1,174 @@
+"""
+Bulk question answering for QA review.
+
+Questions are embedded in vectorized batches, retrieved in parallel and sent
+to Groq through a bounded, rate-limited pool. Results are yielded as soon as
+each answer completes, so callers can stream them out as JSONL.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from src.answering import extractive_answer, PATH_LLM, PATH_EXTRACTIVE, PATH_ERROR
+from src.llm import groq_chat
+from src.prompt import build_messages
+from src.retrieval import RETRIEVAL_BASELINE_K, RETRIEVAL_MAX_K, select_adaptive
+
+
+class Throttle:
+    """Space out call starts to stay under requests_per_minute across threads"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class BatchInputError(ValueError):
+    """A JSONL input line that is not a question object"""
+
+    def __init__(self, line_number, reason):
+        super().__init__(f"line {line_number}: {reason}")
+        self.line_number = line_number
+
+
+def read_questions(lines):
+    """Parse JSONL lines into {"id", "question"} dicts (id defaults to the line number)"""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BatchInputError(number, f"invalid JSON ({e.msg})") from None
+        if not isinstance(item, dict):
+            raise BatchInputError(number, "expected a JSON object")
+        question = item.get("question") or item.get("msg")
+        if not question:
+            continue
+        yield {"id": str(item.get("id", number)), "question": question}
+
+
+def resume_output(path):
+    """
+    IDs already answered in an output file, which is rewritten so each ID has
+    at most one line: errors (retried on resume), repeats and a partial last
+    line from an interrupted run are dropped.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    kept, dropped, rewrite = [], 0, False
+    with open(path) as f:
+        for line in f:
+            # A last line without its newline would swallow the next appended result
+            rewrite = rewrite or not line.endswith("\n")
+            try:
+                result = json.loads(line)
+                result_id = str(result["id"])
+            except (json.JSONDecodeError, TypeError, KeyError):
+                dropped += 1
+                continue
+            if result.get("path") == PATH_ERROR or result_id in done:
+                dropped += 1
+                continue
+            done.add(result_id)
+            kept.append(line if line.endswith("\n") else line + "\n")
+    if dropped or rewrite:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.writelines(kept)
+        os.replace(tmp, path)
+    return done
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _generate(api_key, item, docs_with_scores, retrieval, throttle, timings, max_retries=3):
+    docs = [doc for doc, _ in docs_with_scores]
+    context = "\n".join(doc.page_content for doc in docs)
+    start = time.perf_counter()
+    answer, path = None, PATH_ERROR
+
+    for attempt in range(max_retries):
+        throttle.wait()
+        try:
+            answer = groq_chat(api_key, build_messages(context, item["question"]))
+            path = PATH_LLM
+            break
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 429:
+                break
+            time.sleep(float(e.response.headers.get("Retry-After", 2 ** attempt)))
+        except requests.exceptions.RequestException:
+            break
+
+    if answer is None:
+        answer = extractive_answer(item["question"], docs)
+        path = PATH_EXTRACTIVE if answer else PATH_ERROR
+
+    timings["generate_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": answer,
+        "path": path,
+        "k": retrieval["k"],
+        "tokens_saved": retrieval["tokens_saved"],
+        "sources": [
+            {"source": doc.metadata.get("source"), "page": doc.metadata.get("page"), "score": round(float(score), 4)}
+            for doc, score in docs_with_scores
+        ],
+        "timings_ms": timings,
+    }
+
+
+def answer_questions(items, embeddings, docsearch, api_key, k=None, batch_size=64,
+                     concurrency=4, requests_per_minute=30):
+    """Yield one result dict per question, in completion order (k=None: score-adaptive)"""
+    bounds = {"min_k": k, "max_k": k} if k else {}
+    fetch_k = k or max(RETRIEVAL_MAX_K, RETRIEVAL_BASELINE_K)
+    throttle = Throttle(requests_per_minute)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in _batched(items, batch_size):
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents([item["question"] for item in batch])
+            embed_ms = (time.perf_counter() - start) * 1000 / len(batch)
+
+            start = time.perf_counter()
+            retrieved = list(pool.map(
+                lambda vector: select_adaptive(docsearch.similarity_search_by_vector_with_score(vector, k=fetch_k), **bounds),
+                vectors
+            ))
+            retrieve_ms = (time.perf_counter() - start) * 1000 / len(batch)
+
+            futures = [
+                pool.submit(_generate, api_key, item, docs, retrieval, throttle,
+                            {"embed_ms": round(embed_ms, 1), "retrieve_ms": round(retrieve_ms, 1)})
+                for item, (docs, retrieval) in zip(batch, retrieved)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,226 @@
+"""
+Cost- and latency-aware model cascade for get_medical_answer.
+
+Most questions are short definitions ("What is anemia?") that a small model
+answers as well as the 70B one, several times faster and at a fraction of the
+price. Before generation, route() picks a tier from the question and the
+retrieval signal:
+
+    small  title-index hits, and short, simple questions whose top retrieval
+           score is at least CASCADE_MIN_SCORE
+    large  follow-ups, comparisons / "why" / dosage / pregnancy / children
+           questions, several questions at once, long questions and
+           low-confidence retrieval
+
+With CASCADE_ESCALATE=1 (default) a small-model answer that was cut off at its
+token cap, admits the context doesn't cover the question, or failed with an
+API error is regenerated by the large model, if the deadline still allows it.
+Per-tier calls, latency, tokens and estimated cost are exported on /metrics.
+MODEL_CASCADE=0 sends everything to the large model again.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+import requests
+
+from src.conversation import estimate_tokens
+from src.llm import GROQ_MODEL, groq_completion
+
+MODEL_CASCADE = os.environ.get("MODEL_CASCADE", "1") == "1"
+CASCADE_ESCALATE = os.environ.get("CASCADE_ESCALATE", "1") == "1"
+CASCADE_MIN_SCORE = float(os.environ.get("CASCADE_MIN_SCORE", 0.5))
+CASCADE_MAX_WORDS = int(os.environ.get("CASCADE_MAX_WORDS", 20))
+
+SMALL = "small"
+LARGE = "large"
+TIERS = {
+    SMALL: {"model": os.environ.get("CASCADE_SMALL_MODEL", "llama-3.1-8b-instant"),
+            "max_tokens": int(os.environ.get("CASCADE_SMALL_MAX_TOKENS", 300))},
+    LARGE: {"model": os.environ.get("CASCADE_LARGE_MODEL", GROQ_MODEL),
+            "max_tokens": int(os.environ.get("CASCADE_LARGE_MAX_TOKENS", 500))},
+}
+
+# USD per million (input, output) tokens, Groq list prices; used for the cost estimate only
+PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+_LATENCY_SAMPLES = 1000
+
+_HARD = re.compile(
+    r"\b(compare|comparison|differen(ce|ces|t)|versus|vs|why|how (do|does|can|should)|"
+    r"interact\w*|combin\w*|should i|dos(e|es|age)|pregnan\w*|breastfeed\w*|child(ren)?|infants?|"
+    r"bab(y|ies)|elderly|side effects?|contraindicat\w*|prognosis|risks?)\b",
+    re.IGNORECASE
+)
+_UNSURE = re.compile(
+    r"(i (do not|don't) know|i'?m not sure|not (mentioned|provided|covered|discussed) in the (given |provided )?context|"
+    r"(context|information) (does not|doesn't) (contain|mention|provide|cover)|cannot (answer|determine))",
+    re.IGNORECASE
+)
+
+
+def route(question, retrieval=None, follow_up=False):
+    """(tier, reason) for a question and its retrieval stats (see src/retrieval.py)"""
+    if not MODEL_CASCADE:
+        return LARGE, "cascade_off"
+    if follow_up:
+        return LARGE, "follow_up"
+    if _HARD.search(question):
+        return LARGE, "complex"
+    if question.count("?") > 1:
+        return LARGE, "several_questions"
+    if len(question.split()) > CASCADE_MAX_WORDS:
+        return LARGE, "long"
+    if retrieval is not None and retrieval.get("source") == "title":
+        return SMALL, "title"
+    top_score = retrieval.get("top_score") if retrieval is not None else None
+    if top_score is None or top_score < CASCADE_MIN_SCORE:
+        return LARGE, "low_confidence"
+    return SMALL, "simple"
+
+
+def escalation_reason(result):
+    """Why a small-model answer should be regenerated by the large model, or None"""
+    if result["finish_reason"] == "length":
+        return "truncated"
+    if not result["content"]:
+        return "empty"
+    if _UNSURE.search(result["content"]):
+        return "unsure"
+    return None
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1e6
+
+
+class ModelCascade:
+    """Routes each answer to a model tier and keeps per-tier latency/cost counters"""
+
+    def __init__(self, tiers=None, escalate=CASCADE_ESCALATE):
+        self.tiers = tiers or TIERS
+        self.escalate = escalate
+        self.routed = Counter()       # (tier, reason) -> questions
+        self.escalations = Counter()  # reason -> questions
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.tokens = Counter()       # (tier, "prompt" | "completion") -> tokens
+        self.cost = Counter()
+        self._latencies = {tier: deque(maxlen=_LATENCY_SAMPLES) for tier in self.tiers}
+        self._lock = threading.Lock()
+
+    def _call(self, tier, api_key, messages, timeout):
+        settings = self.tiers[tier]
+        start = time.perf_counter()
+        result = groq_completion(api_key, messages, model=settings["model"],
+                                 max_tokens=settings["max_tokens"], timeout=timeout)
+        seconds = time.perf_counter() - start
+        usage = result["usage"]
+        prompt_tokens = usage.get("prompt_tokens") or estimate_tokens(" ".join(m["content"] for m in messages))
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(result["content"])
+        cost = estimate_cost(settings["model"], prompt_tokens, completion_tokens)
+        with self._lock:
+            self.calls[tier] += 1
+            self.seconds[tier] += seconds
+            self.tokens[(tier, "prompt")] += prompt_tokens
+            self.tokens[(tier, "completion")] += completion_tokens
+            self.cost[tier] += cost
+            self._latencies[tier].append(seconds)
+        return result, seconds, cost
+
+    def answer(self, api_key, messages, question, retrieval=None, follow_up=False, deadline=None):
+        """
+        Generate an answer, escalating from the small tier when needed.
+
+        Returns (answer, info) with the tier/model used, the routing and
+        escalation reasons, LLM milliseconds and estimated cost over all calls.
+        Errors from the large tier (and timeouts from either) propagate, except
+        when an escalation fails: then the small model's answer is returned,
+        with escalated set to "<reason>_failed".
+        """
+        tier, reason = route(question, retrieval, follow_up)
+        with self._lock:
+            self.routed[(tier, reason)] += 1
+        info = {"tier": tier, "route": reason, "escalated": None, "llm_ms": 0.0, "cost_usd": 0.0}
+
+        escalate, error = None, None
+        try:
+            result, seconds, cost = self._call(tier, api_key, messages, deadline.remaining() if deadline else 30)
+            info["llm_ms"] += seconds * 1000
+            info["cost_usd"] += cost
+            if tier == SMALL:
+                escalate = escalation_reason(result)
+        except requests.exceptions.HTTPError as e:
+            if tier != SMALL:
+                raise
+            escalate, error = "error", e
+
+        if escalate and self.escalate and (deadline is None or deadline.allows_llm()):
+            with self._lock:
+                self.escalations[escalate] += 1
+            info["escalated"] = escalate
+            try:
+                large, seconds, cost = self._call(LARGE, api_key, messages, deadline.remaining() if deadline else 30)
+                info["llm_ms"] += seconds * 1000
+                info["cost_usd"] += cost
+                tier, result = LARGE, large
+                info["tier"] = tier
+            except requests.exceptions.RequestException:
+                if error is not None:
+                    raise  # no small answer to fall back on
+                # Keep the small model's answer rather than dropping to the extractive fallback
+                with self._lock:
+                    self.escalations["failed"] += 1
+                info["escalated"] = f"{escalate}_failed"
+        elif error is not None:
+            raise error
+
+        info["model"] = self.tiers[tier]["model"]
+        info["llm_ms"] = round(info["llm_ms"], 1)
+        info["cost_usd"] = round(info["cost_usd"], 6)
+        return result["content"], info
+
+    def summary(self):
+        """Per-tier calls, latency percentiles, tokens and cost"""
+        with self._lock:
+            tiers = {}
+            for tier, settings in self.tiers.items():
+                latencies = sorted(self._latencies[tier])
+                calls = self.calls[tier]
+                tiers[tier] = {
+                    "model": settings["model"],
+                    "calls": calls,
+                    "mean_ms": round(self.seconds[tier] / calls * 1000, 1) if calls else None,
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+                    "prompt_tokens": self.tokens[(tier, "prompt")],
+                    "completion_tokens": self.tokens[(tier, "completion")],
+                    "cost_usd": round(self.cost[tier], 6),
+                }
+            return {"tiers": tiers, "escalations": dict(self.escalations),
+                    "routed": {f"{tier}:{reason}": n for (tier, reason), n in self.routed.items()}}
+
+    def prometheus_lines(self):
+        with self._lock:
+            lines = ["# TYPE llm_routed_total counter"]
+            lines += [f'llm_routed_total{{tier="{tier}",reason="{reason}"}} {n}'
+                      for (tier, reason), n in sorted(self.routed.items())]
+            lines.append("# TYPE llm_escalations_total counter")
+            lines += [f'llm_escalations_total{{reason="{reason}"}} {n}' for reason, n in sorted(self.escalations.items())]
+            lines.append("# TYPE llm_calls_total counter")
+            lines += [f'llm_calls_total{{tier="{tier}"}} {self.calls[tier]}' for tier in self.tiers]
+            lines.append("# TYPE llm_seconds_total counter")
+            lines += [f'llm_seconds_total{{tier="{tier}"}} {self.seconds[tier]:.3f}' for tier in self.tiers]
+            lines.append("# TYPE llm_tokens_total counter")
+            lines += [f'llm_tokens_total{{tier="{tier}",kind="{kind}"}} {self.tokens[(tier, kind)]}'
+                      for tier in self.tiers for kind in ("prompt", "completion")]
+            lines.append("# TYPE llm_cost_usd_total counter")
+            lines += [f'llm_cost_usd_total{{tier="{tier}"}} {self.cost[tier]:.6f}' for tier in self.tiers]
+        return "\n".join(lines) + "\n"
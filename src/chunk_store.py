@@ -0,0 +1,126 @@
+"""
+Local chunk store: chunk ID -> (text, source, page) in a single SQLite file.
+
+The vector index only keeps IDs and vectors; chunk text is fetched from here
+in one bulk query after retrieval.
+"""
+
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+DEFAULT_CHUNK_STORE = os.path.join("chunk_store", "chunks.db")
+
+
+class ChunkStore:
+    def __init__(self, path=DEFAULT_CHUNK_STORE):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, text TEXT NOT NULL, source TEXT, page INTEGER"
+            ") WITHOUT ROWID"
+        )
+        # float32 vectors, kept so a local (compressed) index can be rebuilt
+        # without re-embedding - see src/vector_index.py
+        conn.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+        # Normalized entry title / alias -> first chunk IDs of that entry (src/titles.py)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS titles ("
+            "key TEXT PRIMARY KEY, title TEXT NOT NULL, chunk_ids TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        # Partition -> mean chunk vector and chunk count, for query routing (src/partitions.py)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS partitions ("
+            "name TEXT PRIMARY KEY, centroid BLOB NOT NULL, chunks INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, rows):
+        """Insert or replace (id, text, source, page) rows"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+
+    def put_vectors(self, ids, vectors):
+        rows = [(i, np.asarray(v, dtype="<f4").tobytes()) for i, v in zip(ids, vectors)]
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?)", rows)
+            conn.commit()
+
+    def all_vectors(self):
+        """Return (ids, float32 matrix) for every stored vector"""
+        rows = self._conn().execute("SELECT id, vector FROM vectors ORDER BY id").fetchall()
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        ids = [row[0] for row in rows]
+        return ids, np.stack([np.frombuffer(row[1], dtype="<f4") for row in rows])
+
+    def get_many(self, ids):
+        """Return {id: (text, source, page)} for the IDs that exist"""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        cursor = self._conn().execute(
+            f"SELECT id, text, source, page FROM chunks WHERE id IN ({placeholders})",
+            list(ids)
+        )
+        return {row[0]: row[1:] for row in cursor}
+
+    def put_titles(self, rows):
+        """Insert or replace (key, title, space-separated chunk IDs) rows"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO titles VALUES (?, ?, ?)", rows)
+            conn.commit()
+
+    def get_title(self, key):
+        """Return (title, [chunk IDs]) for a normalized title key, or None"""
+        row = self._conn().execute("SELECT title, chunk_ids FROM titles WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1].split()) if row else None
+
+    def sources(self):
+        """Return {id: source} for every chunk"""
+        return dict(self._conn().execute("SELECT id, source FROM chunks"))
+
+    def put_partitions(self, rows):
+        """Insert or replace (name, mean vector, chunk count) rows"""
+        rows = [(name, np.asarray(mean, dtype="<f4").tobytes(), count) for name, mean, count in rows]
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO partitions VALUES (?, ?, ?)", rows)
+            conn.commit()
+
+    def get_partitions(self):
+        """Return [(name, mean vector, chunk count)]; empty for an unpartitioned store"""
+        rows = self._conn().execute("SELECT name, centroid, chunks FROM partitions ORDER BY name").fetchall()
+        return [(name, np.frombuffer(blob, dtype="<f4"), count) for name, blob, count in rows]
+
+    def checkpoint(self):
+        """Fold the WAL into the main file (before copying/moving the database)"""
+        with self._write_lock:
+            self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
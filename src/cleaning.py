@@ -0,0 +1,183 @@
+"""
+Ingest-time cleanup: strip page furniture and drop near-duplicate chunks.
+
+PDF extraction of the encyclopedia yields running headers/footers, bare page
+numbers and index pages on top of the article text. PageCleaner learns which
+first/last lines repeat across the pages of a file and strips them, and drops
+pages that look like an index. ChunkDeduplicator then removes exact and
+near-duplicate chunks (MinHash signatures + LSH banding), so repeated
+boilerplate doesn't fill the index or take top-k slots.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+
+INGEST_CLEAN = os.environ.get("INGEST_CLEAN", "1") == "1"
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", 0.85))
+
+_WORD = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+# A lone (masked) number, optionally "page N" and framed by dashes, bars or brackets:
+# "12", "- 12 -", "[12]", "Page 12", but not "1,000" or a numbered-list "2."
+_PAGE_NUMBER = re.compile(r"^[\s\-–—|\[\]()]*(page\s*)?#[\s\-–—|\[\]()]*$")
+# Index entries: "Asthma, 345–350" or "Ague see Malaria"
+_INDEX_LINE = re.compile(r"([,\s]\d{1,4}(\s*[-–,]\s*\d{1,4})*\.?\s*$)|(\bsee( also)?\b)", re.IGNORECASE)
+
+_PRIME = 4294967291  # largest prime below 2**32, so signatures fit in uint32
+
+
+def _line_key(line):
+    """Page numbers vary from page to page; compare furniture with digits masked"""
+    return _DIGITS.sub("#", " ".join(line.lower().split()))
+
+
+class PageCleaner:
+    """Strip repeated header/footer lines and drop index pages from a page stream"""
+
+    def __init__(self, edge_lines=3, min_repeats=3, min_fraction=0.2, warmup_pages=30):
+        self.edge_lines = edge_lines
+        self.min_repeats = min_repeats
+        self.min_fraction = min_fraction
+        self.warmup_pages = warmup_pages
+        self._counts = defaultdict(Counter)  # source -> edge line key -> pages seen on
+        self._pages = Counter()              # source -> pages seen
+        self.stats = {"pages_dropped": 0, "lines_stripped": 0, "bytes_stripped": 0}
+
+    def _edges(self, lines):
+        n = self.edge_lines
+        return lines[:n] + lines[max(n, len(lines) - n):]
+
+    def observe(self, page):
+        source = page.metadata.get("source")
+        lines = [line for line in page.page_content.splitlines() if line.strip()]
+        self._pages[source] += 1
+        self._counts[source].update({_line_key(line) for line in self._edges(lines)})
+
+    def _is_furniture(self, source, key):
+        if _PAGE_NUMBER.match(key):
+            return True
+        seen = self._counts[source][key]
+        return seen >= max(self.min_repeats, self.min_fraction * self._pages[source])
+
+    def _is_index_page(self, lines):
+        return len(lines) >= 15 and sum(bool(_INDEX_LINE.search(line)) for line in lines) >= 0.5 * len(lines)
+
+    def clean(self, page):
+        """Cleaned copy of the page, or None if nothing worth indexing is left"""
+        source = page.metadata.get("source")
+        lines = [line for line in page.page_content.splitlines() if line.strip()]
+        if self._is_index_page(lines):
+            self.stats["pages_dropped"] += 1
+            self.stats["bytes_stripped"] += len(page.page_content.encode("utf-8"))
+            return None
+
+        n = self.edge_lines
+        kept = []
+        for i, line in enumerate(lines):
+            at_edge = i < n or i >= len(lines) - n
+            if at_edge and self._is_furniture(source, _line_key(line)):
+                self.stats["lines_stripped"] += 1
+                self.stats["bytes_stripped"] += len(line.encode("utf-8")) + 1
+                continue
+            kept.append(line)
+        if not kept:
+            self.stats["pages_dropped"] += 1
+            return None
+        return Document(page_content="\n".join(kept), metadata=page.metadata)
+
+    def clean_pages(self, pages):
+        """
+        Generator over cleaned pages.
+
+        The first warmup_pages are buffered so there are enough samples to
+        recognise furniture before anything is emitted; after that each page is
+        observed and cleaned as it streams through.
+        """
+        buffered = []
+        for page in pages:
+            self.observe(page)
+            if buffered is not None:
+                buffered.append(page)
+                if len(buffered) < self.warmup_pages:
+                    continue
+                pending, buffered = buffered, None
+            else:
+                pending = [page]
+            for item in pending:
+                cleaned = self.clean(item)
+                if cleaned is not None:
+                    yield cleaned
+        for item in buffered or ():
+            cleaned = self.clean(item)
+            if cleaned is not None:
+                yield cleaned
+
+
+class ChunkDeduplicator:
+    """
+    Exact + near-duplicate detection for chunk text (thread-safe).
+
+    Near duplicates are found with MinHash over word 3-grams: LSH bands narrow
+    the candidates, and a chunk is dropped when its estimated Jaccard
+    similarity to an already kept chunk reaches the threshold.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=64, bands=8, shingle=3, seed=1):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._exact = set()
+        self._signatures = []
+        self._buckets = defaultdict(list)  # (band, band hash) -> signature indexes
+        self._lock = threading.Lock()
+        self.stats = {"exact_duplicates": 0, "near_duplicates": 0, "duplicate_bytes": 0}
+
+    def signature(self, words):
+        n = self.shingle
+        shingles = [" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))]
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a*x + b) mod p stays below 2**64 because a, b, x are all < 2**32
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def is_duplicate(self, text):
+        """True if text (or something nearly identical) was already seen; otherwise remember it"""
+        words = _WORD.findall(text.lower())
+        exact = hashlib.sha1(" ".join(words).encode("utf-8")).digest()
+        signature = self.signature(words)
+        band_keys = [(band, hash(signature[band * self.rows:(band + 1) * self.rows].tobytes()))
+                     for band in range(self.bands)]
+
+        with self._lock:
+            if exact in self._exact:
+                self.stats["exact_duplicates"] += 1
+                self.stats["duplicate_bytes"] += len(text.encode("utf-8"))
+                return True
+            candidates = {i for key in band_keys for i in self._buckets.get(key, ())}
+            for i in candidates:
+                if np.mean(self._signatures[i] == signature) >= self.threshold:
+                    self.stats["near_duplicates"] += 1
+                    self.stats["duplicate_bytes"] += len(text.encode("utf-8"))
+                    return True
+            self._exact.add(exact)
+            self._signatures.append(signature)
+            for key in band_keys:
+                self._buckets[key].append(len(self._signatures) - 1)
+        return False
+
+
+def cleaning_summary(stats):
+    return (f"🧹 Cleanup: stripped {stats.get('lines_stripped', 0)} furniture lines, "
+            f"dropped {stats.get('pages_dropped', 0)} pages, removed "
+            f"{stats.get('exact_duplicates', 0)} exact + {stats.get('near_duplicates', 0)} near-duplicate chunks "
+            f"({(stats.get('bytes_stripped', 0) + stats.get('duplicate_bytes', 0)) / 1024:.0f} KB)")
@@ -0,0 +1,148 @@
+"""
+Server-side conversation state for the /get route.
+
+Follow-up questions ("what about its treatment?") reuse the previous turn's
+retrieved chunks instead of running a fresh, unrelated vector search. Prompt
+size stays bounded: recent turns are kept verbatim within a token budget and
+older turns are folded into a short extractive summary.
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 600))
+SUMMARY_TOKEN_BUDGET = int(os.environ.get("SUMMARY_TOKEN_BUDGET", 150))
+CONVERSATION_TTL_SECONDS = int(os.environ.get("CONVERSATION_TTL_SECONDS", 1800))
+MAX_CONVERSATIONS = int(os.environ.get("MAX_CONVERSATIONS", 5000))
+
+_WORD = re.compile(r"[a-z0-9']+")
+_ANAPHORA = {"it", "its", "it's", "this", "that", "these", "those", "they", "them", "their", "he", "she", "his", "her"}
+_CONNECTIVES = ("what about", "how about", "and ", "also", "what else", "why", "how so", "tell me more", "more on")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "what", "how", "why", "when", "which", "who",
+    "of", "for", "to", "in", "on", "and", "or", "do", "does", "did", "can", "could", "should",
+    "i", "my", "me", "about", "explain", "tell", "with", "be", "there", "any", "more", "else",
+    "also", "so", "you", "please"
+} | _ANAPHORA
+
+
+def estimate_tokens(text):
+    """~4 characters per token is close enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+_SUFFIXES = ("ments", "ment", "ing", "ed", "es", "s")
+
+
+def _stem(word):
+    """Crude suffix strip, so "treated" and "treatment" give the same term"""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _terms(text):
+    return {_stem(w) for w in _WORD.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def _first_sentence(text, max_chars=160):
+    sentence = re.split(r"(?<=[.!?])\s+", " ".join(text.split()), maxsplit=1)[0]
+    return sentence[:max_chars]
+
+
+class Conversation:
+    def __init__(self):
+        self.turns = []          # recent (question, answer) pairs, oldest first
+        self.summary = ""        # compressed older turns
+        self.last_docs = []
+        self.last_terms = set()  # terms of the last searched question + its chunks
+        self.last_topic = set()  # terms of the last searched question alone
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def is_follow_up(self, question):
+        """
+        Cheap check: does this question lean on the previous turn's topic?
+
+        It has to point back ("what about its treatment?", "and the symptoms?")
+        and either add no content terms beyond the last question and its
+        chunks, or share a term with the last question itself. "What is
+        diabetes and how is it treated?" after an asthma turn names a new
+        topic, so it gets a fresh search.
+        """
+        if not self.last_docs:
+            return False
+        lowered = question.lower().strip()
+        words = set(_WORD.findall(lowered))
+        if not (words & _ANAPHORA or lowered.startswith(_CONNECTIVES)):
+            return False
+        terms = _terms(question)
+        return not (terms - self.last_terms) or bool(terms & self.last_topic)
+
+    def remember_retrieval(self, question, docs):
+        self.last_docs = docs
+        self.last_topic = _terms(question)
+        self.last_terms = set(self.last_topic)
+        for doc in docs:
+            self.last_terms |= _terms(doc.page_content)
+
+    def add_turn(self, question, answer):
+        self.turns.append((question, answer))
+        self.updated = time.monotonic()
+        # Fold the oldest turns into the summary until the rest fits the budget
+        while len(self.turns) > 1 and self._history_tokens() > HISTORY_TOKEN_BUDGET:
+            old_question, old_answer = self.turns.pop(0)
+            self.summary = f"{self.summary} Q: {old_question} A: {_first_sentence(old_answer)}".strip()
+        # Keep only the newest part of the summary
+        max_chars = SUMMARY_TOKEN_BUDGET * 4
+        if len(self.summary) > max_chars:
+            self.summary = "…" + self.summary[-max_chars:]
+
+    def _history_tokens(self):
+        return sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns)
+
+    def history_messages(self):
+        """Chat messages for the summary + recent turns (to go before the new question)"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of earlier conversation: {self.summary}"})
+        for question, answer in self.turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+
+class ConversationStore:
+    """Bounded, expiring map of conversation ID -> Conversation"""
+
+    def __init__(self, max_conversations=MAX_CONVERSATIONS, ttl=CONVERSATION_TTL_SECONDS):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        """Return (conversation_id, Conversation), starting a new one if needed"""
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._conversations.pop(conversation_id, None) if conversation_id else None
+            if conversation is None or now - conversation.updated > self.ttl:
+                conversation_id = uuid.uuid4().hex
+                conversation = Conversation()
+            self._conversations[conversation_id] = conversation
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+        return conversation_id, conversation
+
+    def invalidate_retrieval(self):
+        """Forget cached chunks (e.g. after an index snapshot swap)"""
+        with self._lock:
+            for conversation in self._conversations.values():
+                conversation.last_docs = []
+                conversation.last_terms = set()
+                conversation.last_topic = set()
@@ -0,0 +1,166 @@
+"""
+Length-bucketed batch embedding for ingestion.
+
+The encoder pads every batch to its longest member. sentence-transformers
+sorts by length only within one embed_documents call, so small calls (the
+pipeline used to send 64 chunks) still mix lengths in each batch of 32.
+BucketedEmbedder wraps any Embeddings object and, for each window of texts:
+
+1. counts tokens with the embedding model's tokenizer (one batch call)
+2. sorts the window by length, so neighbours in a batch have similar lengths
+3. packs batches up to a padded-token budget, so short chunks go in large
+   batches and long ones in small batches
+4. puts the vectors back in the caller's order
+
+The budget (EMBED_BATCH_TOKENS) defaults to a size derived from the CPU cores
+available to this process, capped by a share of the free memory.
+"""
+
+import os
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+EMBED_WINDOW = int(os.environ.get("EMBED_WINDOW", 512))
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", 256))
+EMBED_BATCH_TOKENS = int(os.environ.get("EMBED_BATCH_TOKENS", 0))  # 0 = size from cores/memory
+EMBED_MAX_SEQ = 256  # all-MiniLM-L6-v2 max_seq_length; longer input is truncated
+
+TOKENS_PER_CORE = 2048
+BYTES_PER_TOKEN = 48 * 1024  # rough activation footprint per padded token at full length
+MEMORY_SHARE = 0.25
+# How the pipeline embedded before bucketing, for the padding comparison: embed_documents
+# calls of 64 chunks in document order, which sentence-transformers' encode() sorts by
+# length and runs in batches of its default 32
+BASELINE_CALL = 64
+BASELINE_BATCH = 32
+
+
+def _cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _available_memory():
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def batch_token_budget():
+    """Padded tokens per encoder call for this machine"""
+    if EMBED_BATCH_TOKENS:
+        return EMBED_BATCH_TOKENS
+    budget = _cores() * TOKENS_PER_CORE
+    memory = _available_memory()
+    if memory:
+        budget = min(budget, int(memory * MEMORY_SHARE / BYTES_PER_TOKEN))
+    return max(EMBED_MAX_SEQ, budget)
+
+
+def padded_tokens(lengths, batches):
+    """Tokens the encoder actually processes when each batch is padded to its longest member"""
+    return sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+
+def baseline_batches(lengths, call_size=BASELINE_CALL, batch_size=BASELINE_BATCH):
+    """Index batches as the pre-bucketing pipeline ran them: length-sorted within each call only"""
+    batches = []
+    for start in range(0, len(lengths), call_size):
+        call = sorted(range(start, min(start + call_size, len(lengths))), key=lambda i: -lengths[i])
+        batches.extend(call[i:i + batch_size] for i in range(0, len(call), batch_size))
+    return batches
+
+
+class BucketedEmbedder(Embeddings):
+    """Embeddings wrapper that sorts by token length and sizes batches by a token budget"""
+
+    def __init__(self, embeddings, tokenizer=None, token_budget=None, max_batch=EMBED_MAX_BATCH):
+        self.embeddings = embeddings
+        self._tokenizer = tokenizer
+        self.token_budget = token_budget or batch_token_budget()
+        self.max_batch = max_batch
+        self.stats = {"chunks": 0, "batches": 0, "seconds": 0.0,
+                      "tokens": 0, "padded_tokens": 0, "baseline_padded_tokens": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            from src.helper import EMBEDDING_MODEL
+            self._tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+        return self._tokenizer
+
+    def token_lengths(self, texts):
+        """Encoder sequence lengths: word pieces plus [CLS]/[SEP], truncated like the model does"""
+        with self._lock:
+            encoded = self.tokenizer(list(texts), add_special_tokens=True)["input_ids"]
+        return [min(len(ids), EMBED_MAX_SEQ) for ids in encoded]
+
+    def batches(self, lengths):
+        """Index batches over the texts sorted by length, each within the token budget"""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches, current = [], []
+        for i in order:
+            # Sorted ascending, so the newest member is always the one the batch pads to
+            if current and (len(current) >= self.max_batch or (len(current) + 1) * lengths[i] > self.token_budget):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        lengths = self.token_lengths(texts)
+        batches = self.batches(lengths)
+
+        start = time.perf_counter()
+        vectors = [None] * len(texts)
+        for batch in batches:
+            for i, vector in zip(batch, self.embeddings.embed_documents([texts[i] for i in batch])):
+                vectors[i] = vector
+        seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["batches"] += len(batches)
+            self.stats["seconds"] += seconds
+            self.stats["tokens"] += sum(lengths)
+            self.stats["padded_tokens"] += padded_tokens(lengths, batches)
+            self.stats["baseline_padded_tokens"] += padded_tokens(lengths, baseline_batches(lengths))
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def summary(self):
+        """Throughput and padding figures for everything embedded so far"""
+        with self._lock:
+            s = dict(self.stats)
+        return {
+            "chunks": s["chunks"],
+            "batches": s["batches"],
+            "token_budget": self.token_budget,
+            "seconds": round(s["seconds"], 2),
+            "chunks_per_second": round(s["chunks"] / s["seconds"], 1) if s["seconds"] else None,
+            "padding_ratio": round(1 - s["tokens"] / s["padded_tokens"], 3) if s["padded_tokens"] else 0.0,
+            "baseline_padding_ratio": (round(1 - s["tokens"] / s["baseline_padded_tokens"], 3)
+                                       if s["baseline_padded_tokens"] else 0.0),
+        }
+
+    def report(self):
+        s = self.summary()
+        if not s["chunks"]:
+            return "🧮 Embedding: no chunks"
+        return (f"🧮 Embedding: {s['chunks']} chunks in {s['seconds']}s ({s['chunks_per_second']} chunks/s), "
+                f"{s['batches']} batches within {s['token_budget']} tokens, padding {s['padding_ratio']:.1%} "
+                f"(previous {BASELINE_CALL}-chunk calls: {s['baseline_padding_ratio']:.1%})")
@@ -0,0 +1,247 @@
+"""
+Local embedding service over a Unix domain socket.
+
+One process owns all-MiniLM-L6-v2; the Flask and Streamlit apps talk to it
+through SocketEmbeddings instead of loading their own copy of the model.
+Requests from every client are collected into shared batches before encoding.
+Each client thread keeps one connection open and sends all its requests over
+it, so a burst of requests doesn't queue up new connections on the listen
+backlog.
+
+    python -m src.embedding_server --socket /tmp/medical-embeddings.sock
+
+Wire format (little-endian):
+    request:  uint32 count, then per text: uint32 byte length + utf-8 bytes
+    response: uint8 status (0 = ok), uint32 count, uint32 dim, float32[count * dim]
+              on error: uint8 status (1), uint32 length, utf-8 message
+"""
+
+import argparse
+import errno
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_SOCKET = "/tmp/medical-embeddings.sock"
+LISTEN_BACKLOG = 128
+
+_U32 = struct.Struct("<I")
+_HEADER = struct.Struct("<BII")
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Embedding socket closed mid-message")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _encode_texts(texts):
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _read_texts(sock):
+    (count,) = _U32.unpack(_recv_exact(sock, 4))
+    texts = []
+    for _ in range(count):
+        (size,) = _U32.unpack(_recv_exact(sock, 4))
+        texts.append(_recv_exact(sock, size).decode("utf-8"))
+    return texts
+
+
+class _Pending:
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingBatcher:
+    """Merge concurrent requests into one encode call (up to max_batch texts)"""
+
+    def __init__(self, embeddings, max_batch=64, max_wait=0.005):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def embed(self, texts):
+        pending = _Pending(texts)
+        self.requests.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _loop(self):
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0].texts)
+            # Give concurrent clients a few ms to join the batch
+            while size < self.max_batch:
+                try:
+                    pending = self.requests.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                size += len(pending.texts)
+
+            texts = [text for pending in batch for text in pending.texts]
+            try:
+                vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+                start = 0
+                for pending in batch:
+                    pending.vectors = vectors[start:start + len(pending.texts)]
+                    start += len(pending.texts)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+
+class _EmbeddingHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection carries any number of requests, until the client closes it
+        while True:
+            try:
+                texts = _read_texts(self.request)
+                vectors = self.server.batcher.embed(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+                dim = vectors.shape[1] if vectors.ndim == 2 else 0
+                self.request.sendall(_HEADER.pack(0, len(texts), dim) + vectors.astype("<f4").tobytes())
+            except ConnectionError:
+                return
+            except Exception as e:
+                # The stream may be out of step after a bad request: report it and close
+                message = str(e).encode("utf-8")
+                self.request.sendall(struct.pack("<BI", 1, len(message)) + message)
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, socket_path, embeddings, max_batch=64, max_wait=0.005):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _EmbeddingHandler)
+        self.batcher = EmbeddingBatcher(embeddings, max_batch=max_batch, max_wait=max_wait)
+
+
+class SocketEmbeddings(Embeddings):
+    """Drop-in replacement for HuggingFaceEmbeddings backed by the embedding server"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        """New connection; retries while the backlog is full or the server is (re)starting"""
+        deadline = time.monotonic() + self.timeout
+        delay = 0.005
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except OSError as e:
+                sock.close()
+                # With a timeout set, connect() fails with EAGAIN instead of waiting for the backlog
+                if e.errno not in (errno.EAGAIN, errno.ECONNREFUSED) or time.monotonic() + delay > deadline:
+                    raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def _connection(self):
+        """This thread's connection (not inherited across a fork)"""
+        sock = getattr(self._local, "sock", None)
+        if sock is None or self._local.pid != os.getpid():
+            sock = self._local.sock = self._connect()
+            self._local.pid = os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _exchange(self, sock, payload):
+        sock.sendall(payload)
+        (status,) = struct.unpack("<B", _recv_exact(sock, 1))
+        if status != 0:
+            (size,) = _U32.unpack(_recv_exact(sock, 4))
+            raise RuntimeError(f"Embedding server error: {_recv_exact(sock, size).decode('utf-8')}")
+        count, dim = struct.unpack("<II", _recv_exact(sock, 8))
+        data = _recv_exact(sock, count * dim * 4)
+        return np.frombuffer(data, dtype="<f4").reshape(count, dim)
+
+    def _request(self, texts):
+        payload = _encode_texts(texts)
+        reused = getattr(self._local, "sock", None) is not None
+        try:
+            return self._exchange(self._connection(), payload)
+        except ConnectionError:
+            self._close()
+            if not reused:
+                raise
+            # The kept connection went stale (e.g. the server restarted): retry once on a new one
+        except Exception:
+            self._close()
+            raise
+        try:
+            return self._exchange(self._connection(), payload)
+        except Exception:
+            self._close()
+            raise
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._request(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self._request([text])[0].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the embedding model over a Unix socket")
+    parser.add_argument("--socket", default=os.environ.get("EMBEDDING_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from src.helper import download_hugging_face_embeddings
+    embeddings = download_hugging_face_embeddings()
+
+    server = EmbeddingServer(args.socket, embeddings, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    print(f"🔌 Embedding server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,81 @@
 # CORRECT IMPORTS FOR YOUR VERSION:
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter  # CHANGED
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document  # CHANGED
+from src.embed_batching import EMBED_MAX_BATCH
+from src.pdf_extract import extract_pages
 from typing import List
+import glob
+import os
 
 print("✅ Using LangChain 1.0.8 compatible imports")
 
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
 # Your functions remain the same...
-def load_pdf_file(data):
-    loader = DirectoryLoader(
-        data,
-        glob="*.pdf",
-        loader_cls=PyPDFLoader
-    )
-    documents = loader.load()
+def load_pdf_file(data, backend=None, cache=None):
+    """All PDF pages in data/ (see src/pdf_extract.py for backends and the page cache)"""
+    documents = list(load_pdf_pages(data, backend, cache))
     print(f"📚 Loaded {len(documents)} documents from PDFs")
     return documents
 
+def load_pdf_pages(data, backend=None, cache=None):
+    """Yield PDF pages one at a time instead of loading the whole corpus"""
+    for path in sorted(glob.glob(os.path.join(data, "*.pdf"))):
+        for number, text in extract_pages(path, backend, cache):
+            yield Document(page_content=text, metadata={"source": path, "page": number})
+
+def to_minimal_doc(doc: Document) -> Document:
+    return Document(
+        page_content=doc.page_content,
+        metadata={"source": doc.metadata.get("source"), "page": doc.metadata.get("page")}
+    )
+
 def filter_to_minimal_docs(docs: List[Document]) -> List[Document]:
-    minimal_docs: List[Document] = []
-    for doc in docs:
-        src = doc.metadata.get("source")
-        minimal_docs.append(
-            Document(
-                page_content=doc.page_content,
-                metadata={"source": src}
-            )
-        )
+    minimal_docs: List[Document] = [to_minimal_doc(doc) for doc in docs]
     print(f"🔧 Filtered {len(minimal_docs)} documents")
     return minimal_docs
 
+def get_text_splitter(tokenizer=None):
+    """
+    Token-sized chunks from the embedder's tokenizer (src/splitter.py), or the
+    old 500-character splitter with TEXT_SPLITTER=chars
+    """
+    if os.environ.get("TEXT_SPLITTER", "tokens") == "chars":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=500, 
+            chunk_overlap=20
+        )
+    from src.splitter import TokenTextSplitter
+    return TokenTextSplitter(tokenizer=tokenizer)
+
 def text_split(extracted_data):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500, 
-        chunk_overlap=20
-    )
+    text_splitter = get_text_splitter()
     text_chunks = text_splitter.split_documents(extracted_data)
     print(f"✂️ Split into {len(text_chunks)} text chunks")
+    if hasattr(text_splitter, "report"):
+        print(text_splitter.report())
     return text_chunks
 
 def download_hugging_face_embeddings():
     embeddings = HuggingFaceEmbeddings(
-        model_name='sentence-transformers/all-MiniLM-L6-v2'
+        model_name=EMBEDDING_MODEL,
+        # Batches are already sized by BucketedEmbedder; don't re-split them into 32s
+        encode_kwargs={"batch_size": EMBED_MAX_BATCH}
     )
     print("🔤 HuggingFace embeddings loaded")
-    return embeddings
\ No newline at end of file
+    return embeddings
+
+def load_embeddings():
+    """
+    Return the embedder the apps should use.
+
+    If EMBEDDING_SOCKET is set, vectors come from the shared embedding server
+    (src/embedding_server.py) instead of loading the model in this process.
+    """
+    socket_path = os.environ.get("EMBEDDING_SOCKET")
+    if socket_path:
+        from src.embedding_server import SocketEmbeddings
+        print(f"🔌 Using embedding server at {socket_path}")
+        return SocketEmbeddings(socket_path)
+    return download_hugging_face_embeddings()
@@ -0,0 +1,83 @@
+import json
+import requests
+
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+
+def stream_groq_chat(api_key, messages, model=GROQ_MODEL, temperature=0.3, max_tokens=500, timeout=30, deadline=None):
+    """
+    Yield answer tokens from Groq as they are generated (server-sent events).
+
+    With a deadline, the stream simply stops once it expires; the caller can
+    tell from what it received whether the answer was cut short.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True
+    }
+
+    with requests.post(
+        GROQ_CHAT_URL,
+        headers=headers,
+        json=payload,
+        timeout=timeout,
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            # SSE frames look like "data: {...}", with "data: [DONE]" at the end
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            if deadline is not None and deadline.expired():
+                break
+            delta = json.loads(data)["choices"][0].get("delta", {})
+            token = delta.get("content")
+            if token:
+                yield token
+
+
+def groq_chat(api_key, messages, model=GROQ_MODEL, temperature=0.3, max_tokens=500, timeout=30):
+    """Return the full Groq answer (raises requests exceptions on failure)"""
+    return groq_completion(api_key, messages, model, temperature, max_tokens, timeout)["content"]
+
+
+def groq_completion(api_key, messages, model=GROQ_MODEL, temperature=0.3, max_tokens=500, timeout=30):
+    """Full Groq answer as {"content", "finish_reason", "usage"} (raises requests exceptions on failure)"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+    response = requests.post(
+        GROQ_CHAT_URL,
+        headers=headers,
+        json=payload,
+        timeout=timeout
+    )
+    response.raise_for_status()
+    body = response.json()
+    choice = body['choices'][0]
+    return {
+        "content": choice['message']['content'].strip(),
+        "finish_reason": choice.get("finish_reason"),
+        "usage": body.get("usage") or {},
+    }
@@ -0,0 +1,152 @@
+"""
+Topic partitions: route each query to the few parts of the corpus it is about.
+
+With INGEST_PARTITIONS=1, ingestion assigns every chunk to a partition by its
+source PDF and upserts it into that partition's own Pinecone namespace
+("<snapshot>.<partition>"). The partition is the file name's stem
+("gale-encyclopedia-of-medicine"), or the first matching PARTITION_RULES entry:
+
+    PARTITION_RULES="*pharmacolog*=pharmacology,*pediatric*=pediatrics"
+
+The mean embedding of each partition is stored in the chunk store's partitions
+table. At query time PartitionRouter compares the query vector with those
+centroids and picks the best PARTITION_SEARCH partitions (dropping any that
+score more than PARTITION_MARGIN below the best); PartitionedVectorStore
+queries them concurrently (inline when only one is routed) and merges the
+hits by score. Per-query work grows with the partitions searched, not with the
+whole corpus.
+"""
+
+import fnmatch
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.retrieval import ChunkStoreVectorStore
+
+INGEST_PARTITIONS = os.environ.get("INGEST_PARTITIONS", "0") == "1"
+PARTITION_RULES = os.environ.get("PARTITION_RULES", "")
+PARTITION_SEARCH = int(os.environ.get("PARTITION_SEARCH", 2))
+PARTITION_MARGIN = float(os.environ.get("PARTITION_MARGIN", 0.1))
+# Queries searching partitions at once, one per request thread by default
+PARTITION_CONCURRENCY = int(os.environ.get("PARTITION_CONCURRENCY", os.environ.get("GUNICORN_THREADS", 4)))
+
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def _rules(spec=None):
+    spec = PARTITION_RULES if spec is None else spec
+    rules = []
+    for item in spec.split(","):
+        if "=" in item:
+            pattern, name = item.split("=", 1)
+            rules.append((pattern.strip().lower(), name.strip()))
+    return rules
+
+
+def partition_for(source, rules=None):
+    """Partition name for a chunk's source file"""
+    name = os.path.basename(source or "").lower()
+    for pattern, partition in _rules(rules):
+        if fnmatch.fnmatch(name, pattern):
+            return partition
+    return _SLUG.sub("-", os.path.splitext(name)[0]).strip("-") or "default"
+
+
+def partition_namespace(namespace, partition):
+    return f"{namespace}.{partition}" if namespace else partition
+
+
+def _normalize(vector):
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class CentroidBuilder:
+    """Running per-partition vector sums during ingestion (thread-safe)"""
+
+    def __init__(self):
+        self._sums = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, partition, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        with self._lock:
+            if partition in self._sums:
+                self._sums[partition] += vectors.sum(axis=0)
+            else:
+                self._sums[partition] = vectors.sum(axis=0)
+            self._counts[partition] = self._counts.get(partition, 0) + len(vectors)
+
+    def rows(self):
+        """[(partition, mean vector, chunk count)] for ChunkStore.put_partitions"""
+        return [(name, self._sums[name] / self._counts[name], self._counts[name]) for name in sorted(self._sums)]
+
+
+class PartitionRouter:
+    def __init__(self, partitions, max_partitions=PARTITION_SEARCH, margin=PARTITION_MARGIN):
+        """partitions: [(name, mean vector, chunk count)] as stored in the chunk store"""
+        self.names = [name for name, _, _ in partitions]
+        self.counts = {name: count for name, _, count in partitions}
+        self.centroids = np.stack([_normalize(np.asarray(mean, dtype=np.float32)) for _, mean, _ in partitions])
+        self.max_partitions = max_partitions
+        self.margin = margin
+
+    def route(self, vector):
+        """[(partition, centroid similarity)] to search, best first"""
+        scores = self.centroids @ _normalize(np.asarray(vector, dtype=np.float32))
+        order = np.argsort(-scores)[:max(1, self.max_partitions)]
+        best = float(scores[order[0]])
+        return [(self.names[i], float(scores[i])) for i in order if float(scores[i]) >= best - self.margin]
+
+
+class PartitionedVectorStore(ChunkStoreVectorStore):
+    """
+    ChunkStoreVectorStore over partitioned indexes: route, search the chosen
+    partitions in parallel, merge by score.
+
+    indexes maps partition -> (index, namespace); partitions without an entry
+    are skipped by the router.
+    """
+
+    def __init__(self, indexes, embeddings, chunk_store, router, concurrency=PARTITION_CONCURRENCY):
+        super().__init__(None, embeddings, chunk_store)
+        self.indexes = indexes
+        self.router = router
+        # Every request thread may fan out to all routed partitions at once
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrency * router.max_partitions),
+                                        thread_name_prefix="partition-search")
+        self._closed = False
+
+    def close(self):
+        """Stop the search threads (called when a snapshot swap replaces this store)"""
+        self._closed = True
+        self._pool.shutdown(wait=False)
+
+    def _query(self, partition, vector, k):
+        index, namespace = self.indexes[partition]
+        kwargs = {"namespace": namespace} if namespace else {}
+        result = index.query(vector=vector, top_k=k, include_metadata=False, **kwargs)
+        return [(match["id"], match["score"], partition) for match in result["matches"]]
+
+    def route(self, vector):
+        return [(name, score) for name, score in self.router.route(vector) if name in self.indexes]
+
+    def _search(self, routes, vector, k):
+        if len(routes) > 1 and not self._closed:
+            try:
+                futures = [self._pool.submit(self._query, name, vector, k) for name, _ in routes]
+                return [match for future in futures for match in future.result()]
+            except RuntimeError:
+                pass  # swapped out and closed mid-request: finish this one inline
+        return [match for name, _ in routes for match in self._query(name, vector, k)]
+
+    def _matches(self, vector, k):
+        merged = self._search(self.route(vector), vector, k)
+        merged.sort(key=lambda match: match[1], reverse=True)
+        return merged[:k]
@@ -0,0 +1,133 @@
+"""
+Pluggable PDF text extraction with an on-disk parsed-page cache.
+
+Backends (PDF_BACKEND, default pypdf - the same text PyPDFLoader produced):
+    pypdf     pure Python, always available
+    pymupdf   MuPDF bindings (pip install pymupdf), much faster
+    pdfium    pypdfium2 (pip install pypdfium2), fast and permissively licensed
+
+Parsed pages are cached in PAGE_CACHE_DIR as one gzip'd JSON-lines file per
+(file content hash, backend), so re-running ingestion or chunking experiments
+on unchanged PDFs skips parsing entirely. Set PAGE_CACHE=0 to bypass it.
+
+Compare backends with `python benchmark_pdf_backends.py`.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+PDF_BACKEND = os.environ.get("PDF_BACKEND", "pypdf")
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "page_cache")
+PAGE_CACHE = os.environ.get("PAGE_CACHE", "1") == "1"
+_CACHE_FORMAT = 1
+
+
+def _pypdf_pages(path, start=0, end=None):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    for number in range(start, end if end is not None else len(reader.pages)):
+        yield number, reader.pages[number].extract_text() or ""
+
+
+def _pymupdf_pages(path, start=0, end=None):
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz  # PyMuPDF < 1.24
+    with fitz.open(path) as doc:
+        for number in range(start, end if end is not None else doc.page_count):
+            yield number, doc[number].get_text()
+
+
+def _pdfium_pages(path, start=0, end=None):
+    import pypdfium2 as pdfium
+    doc = pdfium.PdfDocument(path)
+    try:
+        for number in range(start, end if end is not None else len(doc)):
+            page = doc[number]
+            textpage = page.get_textpage()
+            try:
+                yield number, textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        doc.close()
+
+
+BACKENDS = {
+    "pypdf": _pypdf_pages,
+    "pymupdf": _pymupdf_pages,
+    "pdfium": _pdfium_pages,
+}
+
+
+def available_backends():
+    """Backends whose library is installed"""
+    modules = {"pypdf": ("pypdf",), "pymupdf": ("pymupdf", "fitz"), "pdfium": ("pypdfium2",)}
+    found = []
+    for name, candidates in modules.items():
+        for module in candidates:
+            try:
+                __import__(module)
+                found.append(name)
+                break
+            except ImportError:
+                pass
+    return found
+
+
+def iter_pages(path, backend=None, start=0, end=None):
+    """Yield (page number, text) for pages [start, end) with the chosen backend"""
+    backend = backend or PDF_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ Unknown PDF backend {backend!r} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[backend](path, start, end)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(path, backend):
+    return os.path.join(PAGE_CACHE_DIR, f"{file_hash(path)[:32]}-{backend}-v{_CACHE_FORMAT}.jsonl.gz")
+
+
+def extract_pages(path, backend=None, cache=None):
+    """
+    Yield (page number, text) for a whole PDF, from the cache when possible.
+
+    A cache miss parses the file and writes the cache as it goes; the file is
+    only renamed into place once every page was written.
+    """
+    backend = backend or PDF_BACKEND
+    cache = PAGE_CACHE if cache is None else cache
+    if not cache:
+        yield from iter_pages(path, backend)
+        return
+
+    cached = _cache_path(path, backend)
+    if os.path.exists(cached):
+        with gzip.open(cached, "rt", encoding="utf-8") as f:
+            for line in f:
+                number, text = json.loads(line)
+                yield number, text
+        return
+
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    tmp = f"{cached}.tmp-{os.getpid()}"
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            for number, text in iter_pages(path, backend):
+                f.write(json.dumps([number, text], ensure_ascii=False) + "\n")
+                yield number, text
+        os.replace(tmp, cached)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
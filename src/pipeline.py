@@ -0,0 +1,235 @@
+"""
+Streaming ingestion: load page -> filter -> split -> embed batch -> upsert.
+
+Stages run in their own threads and are connected by bounded queues, so only a
+few pages/batches are in memory at any time and PDF parsing overlaps with
+embedding and the network upload.
+
+With a ChunkStore, chunk text/source/page are written locally and Pinecone
+only receives IDs and vectors.
+
+With clean=True (the default, INGEST_CLEAN=0 turns it off), page furniture is
+stripped before splitting and duplicate chunks are dropped before embedding
+(see src/cleaning.py).
+
+With a ChunkStore, encyclopedia entry titles found along the way are written
+to its titles table for the title lookup fast path (see src/titles.py).
+
+Chunks reach the embedder in windows of embed_window (EMBED_WINDOW, 0 turns
+it off); each window is length-sorted and embedded in token-budgeted batches
+(see src/embed_batching.py), then upserted in batches of batch_size.
+
+With partitioned=True (INGEST_PARTITIONS=1, needs a ChunkStore) each chunk
+goes to its source's partition namespace and per-partition centroids are
+stored for query routing (see src/partitions.py).
+"""
+
+import hashlib
+import queue
+import threading
+import time
+
+from src.cleaning import INGEST_CLEAN, ChunkDeduplicator, PageCleaner, cleaning_summary
+from src.embed_batching import EMBED_WINDOW, BucketedEmbedder
+from src.helper import get_text_splitter, to_minimal_doc
+from src.partitions import INGEST_PARTITIONS, CentroidBuilder, partition_for, partition_namespace
+from src.titles import TitleIndexBuilder
+
+_DONE = object()
+
+
+def chunk_id(source, page, position):
+    """Deterministic vector ID, so re-running ingestion overwrites instead of duplicating"""
+    return hashlib.sha1(f"{source}|{page}|{position}".encode("utf-8")).hexdigest()
+
+
+class IngestionPipeline:
+    def __init__(self, embeddings, index, batch_size=64, queue_size=8,
+                 split_workers=2, embed_workers=1, upsert_workers=2, chunk_store=None, namespace=None,
+                 clean=INGEST_CLEAN, embed_window=EMBED_WINDOW, partitioned=INGEST_PARTITIONS, tokenizer=None):
+        if partitioned and chunk_store is None:
+            raise ValueError("❌ Partitioned ingestion needs a chunk store to keep the partition centroids")
+        # tokenizer replaces the embedding model's (e.g. offline benchmarks); the splitter and
+        # the embedder share it without a common lock, so it must be thread-safe
+        self.embeddings = BucketedEmbedder(embeddings, tokenizer=tokenizer) if embed_window else embeddings
+        self.embed_window = embed_window or batch_size
+        self.index = index
+        self.chunk_store = chunk_store
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.split_workers = split_workers
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.text_splitter = get_text_splitter(tokenizer)
+        self.page_cleaner = PageCleaner() if clean else None
+        self.deduplicator = ChunkDeduplicator() if clean else None
+        self.titles = TitleIndexBuilder() if chunk_store is not None else None
+        self.centroids = CentroidBuilder() if partitioned else None
+        self.stats = {"pages": 0, "chunks": 0, "vectors": 0}
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _run_stage(self, fn, inbox, outbox, workers):
+        """Start `workers` threads applying fn (item -> iterable of outputs)"""
+        remaining = [workers]
+
+        def worker():
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    # Let sibling workers see the end marker too
+                    inbox.put(_DONE)
+                    break
+                if self.errors:
+                    continue  # drain without work so upstream never blocks
+                try:
+                    for out in fn(item):
+                        if outbox is not None:
+                            outbox.put(out)
+                except Exception as e:
+                    self.errors.append(e)
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and outbox is not None:
+                outbox.put(_DONE)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _split(self, page):
+        self._count("pages")
+        source = page.metadata.get("source")
+        page_number = page.metadata.get("page")
+        chunks = self.text_splitter.split_documents([to_minimal_doc(page)])
+        kept = [
+            (position, chunk_id(source, page_number, position), chunk)
+            for position, chunk in enumerate(chunks)
+            if self.deduplicator is None or not self.deduplicator.is_duplicate(chunk.page_content)
+        ]
+        if self.titles is not None:
+            self.titles.observe(source, page_number, page.page_content,
+                                [(position, cid, chunk.page_content) for position, cid, chunk in kept])
+        for _, cid, chunk in kept:
+            yield cid, chunk
+
+    def _batch(self, inbox, outbox):
+        batch = []
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            batch.append(item)
+            if len(batch) >= self.embed_window:
+                outbox.put(batch)
+                batch = []
+        if batch:
+            outbox.put(batch)
+        outbox.put(_DONE)
+
+    def _embed(self, window):
+        texts = [chunk.page_content for _, chunk in window]
+        vectors = self.embeddings.embed_documents(texts)
+        self._count("chunks", len(window))
+        for i in range(0, len(window), self.batch_size):
+            yield window[i:i + self.batch_size], vectors[i:i + self.batch_size]
+
+    def _upsert(self, item):
+        batch, vectors = item
+        if self.chunk_store is not None:
+            # Text goes to the local store first, so no vector ever points at a missing chunk
+            self.chunk_store.put_many([
+                (vector_id, chunk.page_content, chunk.metadata.get("source"), chunk.metadata.get("page"))
+                for vector_id, chunk in batch
+            ])
+            self.chunk_store.put_vectors([vector_id for vector_id, _ in batch], vectors)
+            records = [(vector_id, vector) for (vector_id, _), vector in zip(batch, vectors)]
+        else:
+            records = [
+                (vector_id, vector, {"text": chunk.page_content, "source": chunk.metadata.get("source")})
+                for (vector_id, chunk), vector in zip(batch, vectors)
+            ]
+
+        if self.centroids is not None:
+            groups = {}
+            for (_, chunk), record in zip(batch, records):
+                groups.setdefault(partition_for(chunk.metadata.get("source")), []).append(record)
+            for partition, group in groups.items():
+                self.centroids.add(partition, [record[1] for record in group])
+                self.index.upsert(vectors=group, namespace=partition_namespace(self.namespace, partition))
+        elif self.namespace:
+            self.index.upsert(vectors=records, namespace=self.namespace)
+        else:
+            self.index.upsert(vectors=records)
+        self._count("vectors", len(records))
+        return ()
+
+    def run(self, pages):
+        """Consume a page iterator (e.g. load_pdf_pages) and return stage counts"""
+        start = time.time()
+        q_pages = queue.Queue(maxsize=self.queue_size)
+        q_chunks = queue.Queue(maxsize=self.queue_size * self.batch_size)
+        q_batches = queue.Queue(maxsize=max(1, self.queue_size * self.batch_size // self.embed_window))
+        q_vectors = queue.Queue(maxsize=self.queue_size)
+
+        threads = []
+        threads += self._run_stage(self._split, q_pages, q_chunks, self.split_workers)
+        batcher = threading.Thread(target=self._batch, args=(q_chunks, q_batches), daemon=True)
+        batcher.start()
+        threads.append(batcher)
+        threads += self._run_stage(self._embed, q_batches, q_vectors, self.embed_workers)
+        threads += self._run_stage(self._upsert, q_vectors, None, self.upsert_workers)
+
+        if self.page_cleaner is not None:
+            pages = self.page_cleaner.clean_pages(pages)
+
+        try:
+            for page in pages:
+                if self.errors:
+                    break
+                q_pages.put(page)
+        finally:
+            q_pages.put(_DONE)
+
+        for t in threads:
+            t.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        if self.titles is not None:
+            rows = self.titles.rows()
+            self.chunk_store.put_titles(rows)
+            self.stats["titles"] = len(rows)
+            print(f"🔖 Title index: {len(rows)} titles and aliases")
+
+        if self.centroids is not None:
+            rows = self.centroids.rows()
+            self.chunk_store.put_partitions(rows)
+            self.stats["partitions"] = {name: count for name, _, count in rows}
+            print(f"🧭 Partitions: {', '.join(f'{name} ({count})' for name, _, count in rows)}")
+
+        if hasattr(self.text_splitter, "stats"):
+            self.stats["chunk_tokens"] = self.text_splitter.stats()
+            print(self.text_splitter.report())
+
+        if isinstance(self.embeddings, BucketedEmbedder):
+            self.stats["embedding"] = self.embeddings.summary()
+            print(self.embeddings.report())
+
+        if self.page_cleaner is not None:
+            self.stats.update(self.page_cleaner.stats)
+            self.stats.update(self.deduplicator.stats)
+            print(cleaning_summary(self.stats))
+
+        self.stats["seconds"] = round(time.time() - start, 2)
+        print(f"🚰 Pipeline: {self.stats['pages']} pages → {self.stats['chunks']} chunks → "
+              f"{self.stats['vectors']} vectors in {self.stats['seconds']}s")
+        return self.stats
@@ -0,0 +1,160 @@
+"""
+Speculative retrieval while the user is typing.
+
+chat.html posts the partial question to /prefetch after a short pause in
+typing. The server runs retrieval for it and keeps the result here, keyed by
+client and snapshot version. When the real question arrives and matches (or
+nearly matches) a prefetched text, get_medical_answer reuses those chunks and
+skips the embedding and vector search.
+
+gunicorn sends the /prefetch and the /get that follows to whichever worker is
+free, so the cache is a small SQLite file (PREFETCH_DB) shared by all workers
+on the host, with hit/miss counts kept there too.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from difflib import SequenceMatcher
+
+from langchain_core.documents import Document
+
+PREFETCH_DB = os.environ.get("PREFETCH_DB", os.path.join("chunk_store", "prefetch.db"))
+PREFETCH_TTL_SECONDS = float(os.environ.get("PREFETCH_TTL_SECONDS", 120))
+PREFETCH_MIN_CHARS = int(os.environ.get("PREFETCH_MIN_CHARS", 12))
+PREFETCH_MIN_SIMILARITY = float(os.environ.get("PREFETCH_MIN_SIMILARITY", 0.9))
+# Prefetch searches running at once per worker, so a burst can't take /get's threads
+PREFETCH_MAX_CONCURRENT = int(os.environ.get("PREFETCH_MAX_CONCURRENT", 1))
+PREFETCH_PER_CLIENT = 3
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text.lower()).strip(" ?!.")
+
+
+def _dump_docs(docs):
+    return json.dumps([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs], default=str)
+
+
+def _version(version):
+    return None if version is None else str(version)
+
+
+def _load_docs(payload):
+    return [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in json.loads(payload)]
+
+
+class PrefetchCache:
+    """Last few prefetched retrievals per client, shared by every worker process"""
+
+    def __init__(self, path=PREFETCH_DB, ttl=PREFETCH_TTL_SECONDS, min_similarity=PREFETCH_MIN_SIMILARITY):
+        self.path = path
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Schema only: connections are opened lazily, in the worker that uses them
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prefetch ("
+            "client TEXT NOT NULL, text TEXT NOT NULL, version TEXT, docs TEXT NOT NULL, "
+            "stats TEXT NOT NULL, stored_at REAL NOT NULL, PRIMARY KEY (client, text))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS prefetch_stored_at ON prefetch (stored_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS prefetch_counts (outcome TEXT PRIMARY KEY, n INTEGER NOT NULL)")
+        conn.commit()
+        conn.close()
+
+    def _conn(self):
+        # sqlite3 connections are per thread and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, conn, outcome):
+        conn.execute("INSERT INTO prefetch_counts VALUES (?, 1) "
+                     "ON CONFLICT (outcome) DO UPDATE SET n = n + 1", (outcome,))
+
+    @property
+    def counts(self):
+        counts = {"stored": 0, "hit": 0, "miss": 0}
+        counts.update(self._conn().execute("SELECT outcome, n FROM prefetch_counts").fetchall())
+        return counts
+
+    # The cache is best effort: a busy database counts as a miss, never as a failed request
+
+    def has(self, client, version, text):
+        try:
+            row = self._conn().execute(
+                "SELECT 1 FROM prefetch WHERE client = ? AND text = ? AND version IS ? AND stored_at >= ?",
+                (client, normalize(text), _version(version), time.time() - self.ttl)).fetchone()
+        except sqlite3.OperationalError:
+            return False
+        return row is not None
+
+    def put(self, client, version, text, docs, stats):
+        try:
+            self._put(client, _version(version), normalize(text), _dump_docs(docs), json.dumps(stats, default=str))
+        except sqlite3.OperationalError:
+            pass
+
+    def _put(self, client, version, text, docs, stats):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO prefetch VALUES (?, ?, ?, ?, ?, ?)",
+                         (client, text, version, docs, stats, now))
+            # Keep the newest few per client, and nothing past the TTL
+            conn.execute("DELETE FROM prefetch WHERE client = ? AND text NOT IN "
+                         "(SELECT text FROM prefetch WHERE client = ? ORDER BY stored_at DESC LIMIT ?)",
+                         (client, client, PREFETCH_PER_CLIENT))
+            conn.execute("DELETE FROM prefetch WHERE stored_at < ?", (now - self.ttl,))
+            self._count(conn, "stored")
+
+    def lookup(self, client, version, question):
+        """(docs, stats) prefetched for this question on this snapshot, or None"""
+        try:
+            return self._lookup(client, _version(version), normalize(question))
+        except sqlite3.OperationalError:
+            return None
+
+    def _lookup(self, client, version, question):
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT text, docs, stats FROM prefetch WHERE client = ? AND version IS ? AND stored_at >= ?",
+            (client, version, time.time() - self.ttl)).fetchall()
+        best, best_ratio = None, 0.0
+        for text, docs, stats in rows:
+            ratio = 1.0 if text == question else SequenceMatcher(None, text, question).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = (docs, stats), ratio
+        hit = best is not None and best_ratio >= self.min_similarity
+        try:
+            with conn:
+                self._count(conn, "hit" if hit else "miss")
+        except sqlite3.OperationalError:
+            pass  # a lost count must not cost the hit
+        if hit:
+            return _load_docs(best[0]), json.loads(best[1])
+        return None
+
+    def clear(self, keep_version=None):
+        """Drop entries of other snapshot versions (e.g. after an index snapshot swap)"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM prefetch WHERE version IS NOT ?", (_version(keep_version),))
+
+    def prometheus_lines(self):
+        lines = ["# TYPE prefetch_total counter"]
+        for outcome, count in self.counts.items():
+            lines.append(f'prefetch_total{{outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,227 @@
+"""
+Opt-in sampling profiler for live requests.
+
+A background thread samples the request thread's Python stack every few
+milliseconds (sys._current_frames), so the cost is a GIL hop per sample rather
+than a hook on every function call. Stacks are written in the "collapsed"
+format that flamegraph.pl, speedscope and inferno read directly:
+
+    app_render.py:chat;app_render.py:get_medical_answer;...;torch/nn/...:forward 42
+
+Requests are profiled when profiling is enabled and a random draw falls under
+the sample rate, or when an admin sends `X-Profile: 1` with X-Admin-Token.
+
+Each gunicorn worker has its own Profiler. /admin/profiling reaches only one of
+them, so changes go through configure(), which also writes them to a small
+settings file (PROFILE_SETTINGS). Every worker polls that file and applies new
+settings, dumps and resets to its own traces within about a second.
+"""
+
+import functools
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_SETTINGS = os.environ.get("PROFILE_SETTINGS", os.path.join(PROFILE_DIR, "settings.json"))
+PROFILE_POLL_SECONDS = 1.0
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _Sampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class Profiler:
+    def __init__(self, settings_path=PROFILE_SETTINGS):
+        self.enabled = os.environ.get("PROFILE_ENABLED", "0") == "1"
+        self.sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.01))
+        self.interval = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+        self.slowest_n = int(os.environ.get("PROFILE_SLOWEST_N", 10))
+        self.aggregate = Counter()
+        self.profiled = 0
+        self._slowest = []  # min-heap of (seconds, request_id, stacks)
+        self._lock = threading.Lock()
+        self.settings_path = settings_path
+        self._applied = None  # last shared settings seen, so each dump/reset runs once
+        self._settings_lock = threading.Lock()  # keeps the poller out of an admin change
+        self._watcher_pid = None
+
+    def settings(self):
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "slowest_n": self.slowest_n,
+            "profiled_requests": self.profiled,
+        }
+
+    def configure(self, enabled=None, sample_rate=None, action=None):
+        """Apply admin changes here and publish them to the other workers; return local dump paths"""
+        self._ensure_watcher()
+        with self._settings_lock:
+            shared = self._read_shared() or self._defaults()
+            if enabled is not None:
+                shared["enabled"] = bool(enabled)
+            if sample_rate is not None:
+                shared["sample_rate"] = min(1.0, max(0.0, float(sample_rate)))
+            if action in ("dump", "reset"):
+                shared[action] += 1
+            _write_json(self.settings_path, shared)
+            self._applied = shared
+        self.enabled = shared["enabled"]
+        self.sample_rate = shared["sample_rate"]
+        if action == "reset":
+            self.reset()
+        return self.dump() if action == "dump" else []
+
+    def refresh(self):
+        """Apply the shared settings if another worker changed them; return dump paths written"""
+        with self._settings_lock:
+            shared = self._read_shared()
+            if shared is None:
+                # No admin change yet: the first one to appear is new to this worker too
+                self._applied = self._applied or self._defaults()
+                return []
+            previous, self._applied = self._applied, shared
+        return self._apply(shared, previous)
+
+    def _defaults(self):
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "dump": 0, "reset": 0}
+
+    def _read_shared(self):
+        try:
+            with open(self.settings_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _apply(self, shared, previous):
+        self.enabled = shared["enabled"]
+        self.sample_rate = shared["sample_rate"]
+        if previous is None:
+            return []  # a new worker adopts the settings but not earlier dumps/resets
+        paths = []
+        if shared["dump"] != previous["dump"]:
+            paths = self.dump()
+        if shared["reset"] != previous["reset"]:
+            self.reset()
+        return paths
+
+    def _watch(self):
+        while True:
+            self.refresh()
+            time.sleep(PROFILE_POLL_SECONDS)
+
+    def _ensure_watcher(self):
+        # Started lazily: threads don't survive the fork from the gunicorn master
+        if self._watcher_pid != os.getpid():
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def should_profile(self, forced=False):
+        self._ensure_watcher()
+        return forced or (self.enabled and random.random() < self.sample_rate)
+
+    def record(self, request_id, seconds, stacks):
+        with self._lock:
+            self.profiled += 1
+            self.aggregate.update(stacks)
+            entry = (seconds, request_id, stacks)
+            if len(self._slowest) < self.slowest_n:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def profile(self, forced=False):
+        """Decorator: sample the wrapped call's thread when this request is picked"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                is_forced = forced() if callable(forced) else forced
+                if not self.should_profile(is_forced):
+                    return fn(*args, **kwargs)
+                sampler = _Sampler(threading.get_ident(), self.interval)
+                start = time.perf_counter()
+                sampler.start()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    stacks = sampler.stop()
+                    self.record(uuid.uuid4().hex[:12], time.perf_counter() - start, stacks)
+            return wrapper
+        return decorator
+
+    def dump(self, directory=PROFILE_DIR):
+        """Write the aggregate and slowest-N traces as collapsed stacks; return file paths"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        with self._lock:
+            aggregate = Counter(self.aggregate)
+            slowest = sorted(self._slowest, reverse=True)
+
+        # The pid keeps the workers' files apart when they dump together
+        stamp = f"{stamp}-{os.getpid()}"
+        paths = [_write_collapsed(os.path.join(directory, f"{stamp}-aggregate.collapsed"), aggregate)]
+        for rank, (seconds, request_id, stacks) in enumerate(slowest, start=1):
+            name = f"{stamp}-slow{rank:02d}-{seconds * 1000:.0f}ms-{request_id}.collapsed"
+            paths.append(_write_collapsed(os.path.join(directory, name), stacks))
+        return paths
+
+    def reset(self):
+        with self._lock:
+            self.aggregate.clear()
+            self._slowest = []
+            self.profiled = 0
+
+
+def _write_json(path, payload):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _write_collapsed(path, stacks):
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
@@ -6,4 +6,18 @@ system_prompt = (
     "answer concise."
     "\n\n"
     "{context}"
-)
\ No newline at end of file
+)
+
+medical_system_prompt = (
+    "You are a helpful medical assistant. Use the provided medical context to "
+    "answer questions accurately. Always remind users to consult healthcare "
+    "professionals for medical advice."
+)
+
+
+def build_messages(context, question, history=()):
+    return [
+        {"role": "system", "content": medical_system_prompt},
+        *history,
+        {"role": "user", "content": f"Medical Context:\n{context}\n\nQuestion: {question}"}
+    ]
@@ -0,0 +1,192 @@
+"""
+Structured, non-blocking request logging.
+
+Request threads only put records on an in-memory queue; a QueueListener thread
+does the JSON formatting and the write to stdout. Each request produces one
+JSON line with its request ID, status and per-stage timings. Verbose fields
+(question / answer text) are only kept for a sampled fraction of requests.
+
+    LOG_LEVEL=INFO  LOG_TEXT_SAMPLE_RATE=0.01
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager, nullcontext
+
+LOG_TEXT_SAMPLE_RATE = float(os.environ.get("LOG_TEXT_SAMPLE_RATE", 0.01))
+
+logger = logging.getLogger("medical_chatbot")
+
+_current = contextvars.ContextVar("request_log", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _CheapQueueHandler(logging.handlers.QueueHandler):
+    """Skip formatting on the request thread; only render the traceback text"""
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        # Never block a request on logging: drop the record if the queue is full
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+_listener = None
+
+
+def _start_listener(handler, stream):
+    """Fresh queue + listener thread for this process"""
+    global _listener
+    log_queue = queue.Queue(maxsize=10000)
+    handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    if logger.handlers:
+        return logger
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    handler = _CheapQueueHandler(None)
+    _start_listener(handler, stream)
+    atexit.register(_stop_listener)
+    # Threads don't survive fork: with gunicorn's preload_app the app is imported
+    # in the master, so every forked worker needs its own listener (and queue)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: _start_listener(handler, stream))
+
+    logger.addHandler(handler)
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    logger.propagate = False
+    return logger
+
+
+class RequestLog:
+    def __init__(self, route, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex[:16]
+        self.route = route
+        self.start = time.perf_counter()
+        self.timings = {}
+        self.fields = {}
+        self.sampled = random.random() < LOG_TEXT_SAMPLE_RATE
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def verbose(self, **fields):
+        """Large text fields: kept only for sampled requests, otherwise just their length"""
+        for key, value in fields.items():
+            if self.sampled:
+                self.fields[key] = value
+            else:
+                self.fields[f"{key}_chars"] = len(value or "")
+
+    def finish(self, status):
+        self.timings["total_ms"] = round((time.perf_counter() - self.start) * 1000, 1)
+        logger.info("request", extra={"fields": {
+            "request_id": self.request_id,
+            "route": self.route,
+            "status": status,
+            "timings": self.timings,
+            **self.fields,
+        }})
+
+
+def current_log():
+    return _current.get()
+
+
+def stage(name):
+    """Time a block against the current request (no-op outside a request)"""
+    log = _current.get()
+    return log.stage(name) if log is not None else nullcontext()
+
+
+def set_fields(**fields):
+    log = _current.get()
+    if log is not None:
+        log.set(**fields)
+
+
+def set_verbose_fields(**fields):
+    log = _current.get()
+    if log is not None:
+        log.verbose(**fields)
+
+
+def log_event(message, level=logging.INFO, exc_info=False, **fields):
+    log = _current.get()
+    if log is not None:
+        fields["request_id"] = log.request_id
+    logger.log(level, message, exc_info=exc_info, extra={"fields": fields})
+
+
+def install_request_logging(app):
+    """Flask hooks: one RequestLog per request, X-Request-ID on every response"""
+    from flask import g, request
+
+    configure_logging()
+
+    @app.before_request
+    def _start_request_log():
+        g.request_log = RequestLog(request.path, request.headers.get("X-Request-ID"))
+        g.request_log_token = _current.set(g.request_log)
+
+    @app.after_request
+    def _finish_request_log(response):
+        log = g.get("request_log")
+        if log is not None:
+            response.headers["X-Request-ID"] = log.request_id
+            log.finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _clear_request_log(exc):
+        token = g.pop("request_log_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,228 @@
+import os
+
+from langchain_core.documents import Document
+
+from src.chunk_store import ChunkStore, DEFAULT_CHUNK_STORE
+from src.conversation import estimate_tokens
+from src.titles import lookup_keys
+
+INDEX_NAME = "medical-chatbot"
+
+# Score-adaptive top-k: fetch up to MAX_K, keep results until the first one
+# below MIN_SCORE or the first drop in score larger than MAX_GAP
+RETRIEVAL_MIN_K = int(os.environ.get("RETRIEVAL_MIN_K", 1))
+RETRIEVAL_MAX_K = int(os.environ.get("RETRIEVAL_MAX_K", 6))
+RETRIEVAL_MIN_SCORE = float(os.environ.get("RETRIEVAL_MIN_SCORE", 0.3))
+RETRIEVAL_MAX_GAP = float(os.environ.get("RETRIEVAL_MAX_GAP", 0.1))
+# The old fixed k, used to report how many prompt tokens adaptive k saved
+RETRIEVAL_BASELINE_K = 3
+
+
+class ChunkStoreVectorStore:
+    """
+    Vector search over an ID-only Pinecone index, with chunk text from a ChunkStore.
+
+    Exposes the same similarity_search / similarity_search_with_score calls the
+    apps already use on PineconeVectorStore.
+    """
+
+    def __init__(self, index, embeddings, chunk_store, namespace=None):
+        self.index = index
+        self.embeddings = embeddings
+        self.chunk_store = chunk_store
+        self.namespace = namespace
+
+    def _matches(self, vector, k):
+        """[(chunk ID, score, partition)] from the index, best first"""
+        kwargs = {"namespace": self.namespace} if self.namespace else {}
+        result = self.index.query(vector=vector, top_k=k, include_metadata=False, **kwargs)
+        return [(match["id"], match["score"], None) for match in result["matches"]]
+
+    def similarity_search_by_vector_with_score(self, vector, k=4):
+        matches = self._matches(vector, k)
+        chunks = self.chunk_store.get_many([chunk_id for chunk_id, _, _ in matches])
+
+        docs = []
+        for chunk_id, score, partition in matches:
+            if chunk_id not in chunks:
+                continue
+            text, source, page = chunks[chunk_id]
+            metadata = {"id": chunk_id, "source": source, "page": page}
+            if partition is not None:
+                metadata["partition"] = partition
+            docs.append((Document(page_content=text, metadata=metadata), score))
+        return docs
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k)
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def lookup_title(self, question):
+        """First chunks of the encyclopedia entry the question names, or None"""
+        for key in lookup_keys(question):
+            entry = self.chunk_store.get_title(key)
+            if entry is None:
+                continue
+            title, chunk_ids = entry
+            chunks = self.chunk_store.get_many(chunk_ids)
+            docs = [
+                Document(page_content=chunks[cid][0],
+                         metadata={"id": cid, "source": chunks[cid][1], "page": chunks[cid][2], "title": title})
+                for cid in chunk_ids if cid in chunks
+            ]
+            if docs:
+                return docs
+        return None
+
+
+def choose_k(scores, min_k=None, max_k=None, min_score=None, max_gap=None):
+    """How many of the (descending cosine) scores to keep"""
+    min_k = RETRIEVAL_MIN_K if min_k is None else min_k
+    max_k = RETRIEVAL_MAX_K if max_k is None else max_k
+    min_score = RETRIEVAL_MIN_SCORE if min_score is None else min_score
+    max_gap = RETRIEVAL_MAX_GAP if max_gap is None else max_gap
+
+    limit = min(max_k, len(scores))
+    k = min(min_k, limit)
+    while k < limit:
+        if scores[k] < min_score or scores[k - 1] - scores[k] > max_gap:
+            break
+        k += 1
+    return k
+
+
+def _context_tokens(docs_with_scores):
+    return estimate_tokens("\n".join(doc.page_content for doc, _ in docs_with_scores)) if docs_with_scores else 0
+
+
+def select_adaptive(docs_with_scores, **bounds):
+    """
+    Trim a max-k result list to the adaptive k.
+
+    Returns (docs_with_scores, stats); stats holds k, the top score and the
+    prompt tokens saved against the old fixed k=3 (negative when a broad
+    question needed more context).
+    """
+    docs_with_scores = sorted(docs_with_scores, key=lambda pair: pair[1], reverse=True)
+    k = choose_k([float(score) for _, score in docs_with_scores], **bounds)
+    kept = docs_with_scores[:k]
+    context_tokens = _context_tokens(kept)
+    stats = {
+        "source": "search",
+        "k": k,
+        "top_score": round(float(docs_with_scores[0][1]), 4) if docs_with_scores else None,
+        "context_tokens": context_tokens,
+        "tokens_saved": _context_tokens(docs_with_scores[:RETRIEVAL_BASELINE_K]) - context_tokens,
+    }
+    return kept, stats
+
+
+def adaptive_search(docsearch, query, **bounds):
+    """similarity_search with k picked from the scores; returns (docs, stats)"""
+    max_k = bounds.get("max_k") or RETRIEVAL_MAX_K
+    results = docsearch.similarity_search_with_score(query, k=max(max_k, RETRIEVAL_BASELINE_K))
+    kept, stats = select_adaptive(results, **bounds)
+    return [doc for doc, _ in kept], stats
+
+
+def title_lookup(docsearch, question):
+    """(docs, stats) from the title index, or None on a miss (or without one)"""
+    lookup = getattr(docsearch, "lookup_title", None)
+    docs = lookup(question) if lookup is not None else None
+    if not docs:
+        return None
+    stats = {
+        "source": "title",
+        "k": len(docs),
+        "top_score": None,
+        "context_tokens": _context_tokens([(doc, None) for doc in docs]),
+        "tokens_saved": None,
+    }
+    return docs, stats
+
+
+def retrieve(docsearch, query):
+    """Title lookup first, then score-adaptive vector search; returns (docs, stats)"""
+    return title_lookup(docsearch, query) or adaptive_search(docsearch, query)
+
+
+def connect_vector_store(embeddings, index_name=INDEX_NAME, version=None):
+    """
+    Connect to the serving index.
+
+    With a snapshot version (see src/snapshots.py), the chunk store, optional
+    local index and Pinecone namespace all come from that snapshot.
+
+    Otherwise uses the local chunk store when it exists (ID-only index), or
+    falls back to an index built the old way, with chunk text in Pinecone
+    metadata. Setting LOCAL_VECTOR_INDEX searches a local compressed index
+    instead of Pinecone.
+
+    A chunk store with partition centroids (INGEST_PARTITIONS=1 at ingestion)
+    gets a PartitionedVectorStore that routes each query to its closest
+    partitions (see src/partitions.py).
+    """
+    namespace = None
+    chunk_store_path = os.environ.get("CHUNK_STORE_PATH", DEFAULT_CHUNK_STORE)
+    local_index_path = os.environ.get("LOCAL_VECTOR_INDEX")
+    if version is not None:
+        from src.snapshots import snapshot_path
+        namespace = version
+        chunk_store_path = os.path.join(snapshot_path(version), "chunks.db")
+        snapshot_index = os.path.join(snapshot_path(version), "vector_index")
+        local_index_path = snapshot_index if os.path.exists(snapshot_index) else None
+
+    partitions = ChunkStore(chunk_store_path).get_partitions() if os.path.exists(chunk_store_path) else []
+    if partitions:
+        return _connect_partitioned(embeddings, index_name, namespace, chunk_store_path, local_index_path, partitions)
+
+    if local_index_path and os.path.exists(chunk_store_path):
+        from src.vector_index import CompressedVectorIndex
+        index = CompressedVectorIndex.load(local_index_path)
+        print(f"🗜️ Using local {index.mode} vector index: {local_index_path}")
+        return ChunkStoreVectorStore(index, embeddings, ChunkStore(chunk_store_path))
+
+    if os.path.exists(chunk_store_path):
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+        print(f"🗃️ Using local chunk store: {chunk_store_path}")
+        return ChunkStoreVectorStore(pc.Index(index_name), embeddings, ChunkStore(chunk_store_path), namespace=namespace)
+
+    from langchain_pinecone import PineconeVectorStore
+    return PineconeVectorStore.from_existing_index(
+        index_name=index_name,
+        embedding=embeddings
+    )
+
+
+def _connect_partitioned(embeddings, index_name, namespace, chunk_store_path, local_index_path, partitions):
+    """Routed store over one Pinecone namespace (or local index directory) per partition"""
+    from src.partitions import PartitionRouter, PartitionedVectorStore, partition_namespace
+
+    if local_index_path:
+        from src.vector_index import CompressedVectorIndex
+        indexes = {
+            name: (CompressedVectorIndex.load(os.path.join(local_index_path, name)), None)
+            for name, _, _ in partitions if os.path.exists(os.path.join(local_index_path, name))
+        }
+        if not indexes:
+            raise ValueError(f"❌ {local_index_path} has no partition indexes - build it with "
+                             f"`python -m src.vector_index --partitioned`")
+        print(f"🗜️ Using local partitioned vector index: {local_index_path}")
+    else:
+        from pinecone import Pinecone
+        index = Pinecone(api_key=os.environ.get("PINECONE_API_KEY")).Index(index_name)
+        indexes = {name: (index, partition_namespace(namespace, name)) for name, _, _ in partitions}
+        print(f"🗃️ Using local chunk store: {chunk_store_path}")
+
+    partitions = [partition for partition in partitions if partition[0] in indexes]
+    print(f"🧭 Routing queries over {len(partitions)} partitions: {', '.join(name for name, _, _ in partitions)}")
+    return PartitionedVectorStore(indexes, embeddings, ChunkStore(chunk_store_path), PartitionRouter(partitions))
+
+
+def connect_live_vector_store(embeddings, index_name=INDEX_NAME):
+    """Vector store that follows the published snapshot and hot-swaps on change"""
+    from src.snapshots import SnapshotManager
+    return SnapshotManager(lambda version: connect_vector_store(embeddings, index_name, version=version))
@@ -0,0 +1,302 @@
+"""
+Sharded, checkpointed ingestion.
+
+The corpus is split into deterministic shards (file + page range) recorded in
+a work manifest on shared storage. Any number of workers, on one machine or
+many, claim shards through lock files, write one SQLite output per shard
+(chunks + vectors) and mark it done. A worker that dies stops refreshing its
+lock, and the shard is reclaimed once the lease expires. `merge_shards` then
+folds every shard output into one chunk store and upserts the vectors.
+
+Layout of the manifest directory:
+    manifest.json          shard plan
+    claims/<shard>.lock    held by a worker (mtime = last heartbeat)
+    done/<shard>.json      stats, written after the output is in place
+    outputs/<shard>.db     chunk store with chunks + vectors for that shard
+"""
+
+import glob
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from langchain_core.documents import Document
+
+from src.chunk_store import ChunkStore
+from src.partitions import partition_for, partition_namespace
+from src.pdf_extract import iter_pages
+from src.pipeline import IngestionPipeline
+from src.titles import normalize_title, resolve_titles
+
+LEASE_SECONDS = int(os.environ.get("SHARD_LEASE_SECONDS", 300))
+
+
+def shard_id(path, start, end):
+    name = os.path.basename(path)
+    digest = hashlib.sha1(f"{name}|{start}|{end}".encode("utf-8")).hexdigest()[:10]
+    return f"{os.path.splitext(name)[0]}-{start:05d}-{end:05d}-{digest}"
+
+
+def plan_shards(data, manifest_dir, pages_per_shard=200):
+    """Write manifest.json; the same corpus always yields the same shards"""
+    from pypdf import PdfReader
+
+    shards = []
+    for path in sorted(glob.glob(os.path.join(data, "*.pdf"))):
+        n_pages = len(PdfReader(path).pages)
+        for start in range(0, n_pages, pages_per_shard):
+            end = min(start + pages_per_shard, n_pages)
+            shards.append({"id": shard_id(path, start, end), "file": path, "start": start, "end": end})
+
+    for sub in ("claims", "done", "outputs"):
+        os.makedirs(os.path.join(manifest_dir, sub), exist_ok=True)
+    tmp = os.path.join(manifest_dir, f"manifest.json.{uuid.uuid4().hex}")
+    with open(tmp, "w") as f:
+        json.dump({"pages_per_shard": pages_per_shard, "shards": shards}, f, indent=1)
+    os.replace(tmp, os.path.join(manifest_dir, "manifest.json"))
+    print(f"🗺️ Planned {len(shards)} shards over {len(set(s['file'] for s in shards))} PDFs")
+    return shards
+
+
+def load_manifest(manifest_dir):
+    with open(os.path.join(manifest_dir, "manifest.json")) as f:
+        return json.load(f)["shards"]
+
+
+def load_page_range(path, start, end):
+    """Yield pages [start, end) of one PDF without parsing the rest (PDF_BACKEND applies)"""
+    for number, text in iter_pages(path, start=start, end=end):
+        yield Document(page_content=text, metadata={"source": path, "page": number})
+
+
+class _NoIndex:
+    """Shard workers only write local outputs; vectors are upserted at merge time"""
+
+    def upsert(self, vectors, namespace=None):
+        pass
+
+
+class ShardWorker:
+    def __init__(self, manifest_dir, embeddings, lease_seconds=LEASE_SECONDS, batch_size=64):
+        self.manifest_dir = manifest_dir
+        self.embeddings = embeddings
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def _path(self, *parts):
+        return os.path.join(self.manifest_dir, *parts)
+
+    def _is_done(self, shard):
+        return os.path.exists(self._path("done", f"{shard['id']}.json"))
+
+    def _try_claim(self, shard):
+        lock = self._path("claims", f"{shard['id']}.lock")
+        try:
+            seen = os.stat(lock)
+            age = time.time() - seen.st_mtime
+            if age < self.lease_seconds:
+                return False
+            if not self._take_stale(lock, seen):
+                return False
+            print(f"♻️ Reclaiming shard {shard['id']} (lease expired {age:.0f}s ago)")
+        except FileNotFoundError:
+            pass
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(self.worker_id)
+        # Another worker may have finished the shard since run() checked
+        if self._is_done(shard):
+            self._release(shard)
+            return False
+        return True
+
+    def _take_stale(self, lock, seen):
+        """
+        Remove the stale lock seen earlier so the claim can be retried.
+
+        Takeovers are serialized by an O_EXCL "<lock>.takeover" file, and the
+        lock is checked again under it: a worker that saw the same stale lock
+        but comes second finds the winner's fresh lock and backs off.
+        """
+        takeover = f"{lock}.takeover"
+        try:
+            fd = os.open(takeover, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                # Left behind by a worker that died mid-takeover
+                if time.time() - os.path.getmtime(takeover) > self.lease_seconds:
+                    os.remove(takeover)
+            except FileNotFoundError:
+                pass
+            return False
+        os.close(fd)
+        try:
+            current = os.stat(lock)
+            if (current.st_ino, current.st_mtime_ns) != (seen.st_ino, seen.st_mtime_ns):
+                return False  # reclaimed or refreshed since we looked
+            os.remove(lock)
+            return True
+        except FileNotFoundError:
+            return True
+        finally:
+            os.remove(takeover)
+
+    def _owns(self, lock):
+        """Whether the lock file still records this worker (another may have reclaimed it)"""
+        try:
+            with open(lock) as f:
+                return f.read() == self.worker_id
+        except FileNotFoundError:
+            return False
+
+    def _heartbeat(self, shard, stop):
+        lock = self._path("claims", f"{shard['id']}.lock")
+        while not stop.wait(self.lease_seconds / 3):
+            if not self._owns(lock):
+                return
+            try:
+                os.utime(lock)
+            except FileNotFoundError:
+                return
+
+    def _release(self, shard):
+        lock = self._path("claims", f"{shard['id']}.lock")
+        if self._owns(lock):
+            try:
+                os.remove(lock)
+            except FileNotFoundError:
+                pass
+
+    def process(self, shard):
+        final = self._path("outputs", f"{shard['id']}.db")
+        tmp = f"{final}.tmp-{self.worker_id}"
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(shard, stop), daemon=True)
+        beat.start()
+        try:
+            store = ChunkStore(tmp)
+            pipeline = IngestionPipeline(
+                embeddings=self.embeddings,
+                index=_NoIndex(),
+                batch_size=self.batch_size,
+                chunk_store=store
+            )
+            stats = pipeline.run(load_page_range(shard["file"], shard["start"], shard["end"]))
+            store.checkpoint()
+            # Output first, then the done marker: a crash in between just redoes the shard
+            os.replace(tmp, final)
+            with open(self._path("done", f"{shard['id']}.json"), "w") as f:
+                json.dump({**stats, "worker": self.worker_id}, f)
+        finally:
+            stop.set()
+            for leftover in glob.glob(f"{tmp}*"):
+                os.remove(leftover)
+            # After a stall past the lease, the lock may belong to the worker that reclaimed the shard
+            self._release(shard)
+
+    def run(self):
+        """Claim and process shards until none are left"""
+        processed = 0
+        while True:
+            claimed = None
+            for shard in load_manifest(self.manifest_dir):
+                if not self._is_done(shard) and self._try_claim(shard):
+                    claimed = shard
+                    break
+            if claimed is None:
+                break
+            print(f"🧩 [{self.worker_id}] Processing {claimed['id']}")
+            self.process(claimed)
+            processed += 1
+        print(f"✅ [{self.worker_id}] No shards left ({processed} processed)")
+        return processed
+
+
+def shard_status(manifest_dir):
+    shards = load_manifest(manifest_dir)
+    done = sum(os.path.exists(os.path.join(manifest_dir, "done", f"{s['id']}.json")) for s in shards)
+    claimed = len(glob.glob(os.path.join(manifest_dir, "claims", "*.lock")))
+    return {"shards": len(shards), "done": done, "claimed": claimed, "pending": len(shards) - done - claimed}
+
+
+def merge_shards(manifest_dir, chunk_store_path, index=None, namespace=None, batch_size=100):
+    """Fold every finished shard into one chunk store and upsert its vectors"""
+    shards = load_manifest(manifest_dir)
+    status = shard_status(manifest_dir)
+    if status["done"] < status["shards"]:
+        raise RuntimeError(f"❌ Only {status['done']}/{status['shards']} shards are done")
+
+    ChunkStore(chunk_store_path)  # make sure the target schema exists
+    conn = sqlite3.connect(chunk_store_path)
+    total = 0
+    partitions = {}  # name -> (vector sum, chunk count)
+    spans = {}  # (title, chunk IDs) of every shard's entries, in shard order
+    for shard in shards:
+        output = os.path.join(manifest_dir, "outputs", f"{shard['id']}.db")
+        conn.execute("ATTACH DATABASE ? AS shard", (output,))
+        conn.execute("INSERT OR REPLACE INTO chunks SELECT * FROM shard.chunks")
+        conn.execute("INSERT OR REPLACE INTO vectors SELECT * FROM shard.vectors")
+        # Shard outputs written before the title index existed have no titles table
+        if conn.execute("SELECT 1 FROM shard.sqlite_master WHERE name = 'titles'").fetchone():
+            rows = conn.execute("SELECT key, title, chunk_ids FROM shard.titles").fetchall()
+            # Entries that kept their exact title in the shard go first, so they keep it here too
+            rows.sort(key=lambda row: normalize_title(row[1]) != row[0])
+            for _, title, chunk_ids in rows:
+                spans.setdefault((title, chunk_ids), None)
+        conn.commit()
+        shard_partitions = []
+        if conn.execute("SELECT 1 FROM shard.sqlite_master WHERE name = 'partitions'").fetchone():
+            shard_partitions = conn.execute("SELECT name, centroid, chunks FROM shard.partitions").fetchall()
+        for name, blob, count in shard_partitions:
+            _add_partition(partitions, name, blob, count)
+
+        if index is not None:
+            cursor = conn.execute("SELECT v.id, v.vector, c.source FROM shard.vectors v JOIN shard.chunks c USING (id)")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if shard_partitions:
+                    groups = {}
+                    for row in rows:
+                        groups.setdefault(partition_for(row[2]), []).append((row[0], _decode(row[1])))
+                    for partition, records in groups.items():
+                        index.upsert(vectors=records, namespace=partition_namespace(namespace, partition))
+                elif namespace:
+                    index.upsert(vectors=[(row[0], _decode(row[1])) for row in rows], namespace=namespace)
+                else:
+                    index.upsert(vectors=[(row[0], _decode(row[1])) for row in rows])
+                total += len(rows)
+        conn.execute("DETACH DATABASE shard")
+    # Titles are resolved across all shards at once, like a single-run ingestion:
+    # exact titles win over aliases, and aliases claimed by several titles are dropped
+    conn.executemany("INSERT OR REPLACE INTO titles VALUES (?, ?, ?)",
+                     resolve_titles([(title, chunk_ids.split()) for title, chunk_ids in spans]))
+    conn.commit()
+    conn.close()
+    if partitions:
+        # Shards of one partition are folded together as count-weighted means
+        ChunkStore(chunk_store_path).put_partitions(
+            [(name, total_sum / count, count) for name, (total_sum, count) in sorted(partitions.items())])
+    print(f"🔗 Merged {len(shards)} shards into {chunk_store_path} ({total} vectors upserted)")
+
+
+def _add_partition(partitions, name, blob, count):
+    import numpy as np
+    mean = np.frombuffer(blob, dtype="<f4").astype(np.float64)
+    total_sum, total_count = partitions.get(name, (0.0, 0))
+    partitions[name] = (total_sum + mean * count, total_count + count)
+
+
+def _decode(blob):
+    import numpy as np
+    return np.frombuffer(blob, dtype="<f4").tolist()
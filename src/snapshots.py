@@ -0,0 +1,109 @@
+"""
+Versioned, immutable index snapshots with hot swapping.
+
+Every ingestion run writes a new snapshot: snapshots/<version>/chunks.db (plus
+an optional vector_index/) and a Pinecone namespace named after the version.
+Publishing it only rewrites snapshots/CURRENT, atomically. Running apps watch
+that pointer, load the new snapshot in the background and swap it in between
+requests; the live snapshot is never written to while users query it.
+"""
+
+import os
+import threading
+import time
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_POLL_SECONDS = float(os.environ.get("SNAPSHOT_POLL_SECONDS", 30))
+
+
+def new_version():
+    return time.strftime("v%Y%m%d-%H%M%S", time.gmtime())
+
+
+def snapshot_path(version):
+    return os.path.join(SNAPSHOT_DIR, version)
+
+
+def current_version():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(version):
+    """Point CURRENT at a finished snapshot (atomic rename)"""
+    if not os.path.isdir(snapshot_path(version)):
+        raise ValueError(f"❌ Snapshot {version} does not exist")
+    tmp = os.path.join(SNAPSHOT_DIR, f"CURRENT.{os.getpid()}")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(SNAPSHOT_DIR, "CURRENT"))
+    print(f"📌 Published snapshot {version}")
+
+
+class SnapshotManager:
+    """
+    Holds the live vector store and swaps it when CURRENT changes.
+
+    Acts as the app's docsearch: each call goes to whichever snapshot is live
+    at that moment. Callbacks registered with on_swap(fn) are called with the
+    new version so caches keyed to the old one can be dropped.
+    """
+
+    def __init__(self, loader, poll_seconds=SNAPSHOT_POLL_SECONDS):
+        self.loader = loader
+        self.poll_seconds = poll_seconds
+        self.version = current_version()
+        self.store = loader(self.version)
+        self._callbacks = []
+        self._lock = threading.Lock()
+        if self.version:
+            print(f"📦 Serving snapshot {self.version}")
+        if poll_seconds > 0:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def on_swap(self, callback):
+        self._callbacks.append(callback)
+
+    def current(self):
+        """(version, store) pair, read together so a request sees one snapshot"""
+        with self._lock:
+            return self.version, self.store
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            version = current_version()
+            if version is None or version == self.version:
+                continue
+            try:
+                # Load (and warm) the new snapshot before anyone can see it
+                store = self.loader(version)
+            except Exception as e:
+                print(f"❌ Could not load snapshot {version}: {e}")
+                continue
+            with self._lock:
+                old, old_store = self.version, self.store
+                self.version, self.store = version, store
+            print(f"🔀 Swapped snapshot {old} → {version}")
+            for callback in self._callbacks:
+                callback(version)
+            # Release the replaced store's resources (e.g. its partition search threads)
+            close = getattr(old_store, "close", None)
+            if close is not None:
+                close()
+
+    def similarity_search(self, query, k=4):
+        return self.current()[1].similarity_search(query, k=k)
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.current()[1].similarity_search_with_score(query, k=k)
+
+    def similarity_search_by_vector_with_score(self, vector, k=4):
+        return self.current()[1].similarity_search_by_vector_with_score(vector, k=k)
+
+    def lookup_title(self, question):
+        lookup = getattr(self.current()[1], "lookup_title", None)
+        return lookup(question) if lookup is not None else None
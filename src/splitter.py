@@ -0,0 +1,174 @@
+"""
+Token-aware text splitter sized by the embedding model's own tokenizer.
+
+MiniLM truncates anything past 256 word pieces, so a 500-character chunk can
+silently lose its tail while a short one wastes most of the window.
+TokenTextSplitter works in one linear pass per page:
+
+1. re-join PDF line wraps (and "treat-\\nment" hyphenation) into paragraphs,
+   treating short unpunctuated lines as section headings
+2. split paragraphs into sentences and tokenize them all in one batch call
+3. greedily pack whole sentences up to chunk_tokens, starting a new chunk at
+   each heading once the current chunk has some content; a single sentence
+   longer than the limit is cut at token offsets
+
+WordPiece counts are additive across whitespace, so a chunk's token count is
+the sum of its sentences' counts and never needs re-tokenizing. Token-length
+statistics for every chunk produced are kept in .stats().
+"""
+
+import os
+import re
+import statistics
+import threading
+
+from langchain_core.documents import Document
+
+EMBEDDING_MAX_TOKENS = 256  # all-MiniLM-L6-v2 max_seq_length, including [CLS] and [SEP]
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", 200))
+MIN_SECTION_TOKENS = int(os.environ.get("MIN_SECTION_TOKENS", 40))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_TERMINAL = (".", "!", "?", ":", ";", ",", "-")
+_PARAGRAPH_END = (".", "!", "?", ":", ".\"", ".)")
+
+
+def _is_heading(line):
+    return len(line) <= 60 and len(line.split()) <= 6 and not line.endswith(_TERMINAL) and line[0].isalpha()
+
+
+def segments(text):
+    """
+    [(segment, starts_section)] - headings and sentences in reading order.
+
+    A short unpunctuated line only counts as a heading when the running
+    paragraph already ended with a full stop (or there is none) and the line
+    is set off by a blank line or followed by a capitalised line; a wrapped
+    line in narrow-column text ("...chest tightness and") is not a heading.
+    """
+    out = []
+    paragraph = ""
+
+    def flush():
+        nonlocal paragraph
+        sentences = [s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip()]
+        out.extend((sentence, False) for sentence in sentences)
+        paragraph = ""
+
+    lines = [raw.strip() for raw in text.splitlines()]
+    for i, line in enumerate(lines):
+        if not line:
+            flush()
+            continue
+        following = lines[i + 1] if i + 1 < len(lines) else ""
+        terminated = not paragraph or paragraph.endswith(_PARAGRAPH_END)
+        set_off = i == 0 or not lines[i - 1] or not following or following[0].isupper()
+        if _is_heading(line) and terminated and set_off:
+            flush()
+            out.append((line, True))
+        elif paragraph.endswith("-") and line[0].islower():
+            paragraph = paragraph[:-1] + line  # hyphenated line break
+        else:
+            paragraph = f"{paragraph} {line}" if paragraph else line
+    flush()
+    return out
+
+
+class TokenTextSplitter:
+    def __init__(self, tokenizer=None, chunk_tokens=CHUNK_TOKENS, min_section_tokens=MIN_SECTION_TOKENS,
+                 max_tokens=EMBEDDING_MAX_TOKENS - 2):
+        if chunk_tokens > max_tokens:
+            raise ValueError(f"❌ chunk_tokens={chunk_tokens} exceeds the model window ({max_tokens} tokens)")
+        self._tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.min_section_tokens = min_section_tokens
+        self.max_tokens = max_tokens
+        self._lengths = []
+        # Fast tokenizers are not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            from src.helper import EMBEDDING_MODEL
+            self._tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+        return self._tokenizer
+
+    def _token_counts(self, texts):
+        if not texts:
+            return []
+        with self._lock:
+            encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _cut(self, sentence):
+        """Token windows of a sentence too long for one chunk, as (text, tokens)"""
+        with self._lock:
+            offsets = self.tokenizer(sentence, add_special_tokens=False,
+                                     return_offsets_mapping=True)["offset_mapping"]
+        pieces = []
+        for start in range(0, len(offsets), self.chunk_tokens):
+            window = offsets[start:start + self.chunk_tokens]
+            pieces.append((sentence[window[0][0]:window[-1][1]], len(window)))
+        return pieces
+
+    def _pack(self, text):
+        segs = segments(text)
+        counts = self._token_counts([segment for segment, _ in segs])
+        chunks, current, current_tokens = [], [], 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append((" ".join(current), current_tokens))
+            current, current_tokens = [], 0
+
+        for (segment, starts_section), tokens in zip(segs, counts):
+            if tokens > self.chunk_tokens:
+                flush()
+                chunks.extend(self._cut(segment))
+                continue
+            if current_tokens + tokens > self.chunk_tokens or (
+                    starts_section and current_tokens >= self.min_section_tokens):
+                flush()
+            current.append(segment)
+            current_tokens += tokens
+        flush()
+
+        with self._lock:
+            self._lengths.extend(tokens for _, tokens in chunks)
+        return [chunk for chunk, _ in chunks]
+
+    def split_text(self, text):
+        return self._pack(text)
+
+    def split_documents(self, documents):
+        return [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in self._pack(doc.page_content)
+        ]
+
+    def stats(self):
+        """Token-length distribution of every chunk produced so far"""
+        with self._lock:
+            lengths = sorted(self._lengths)
+        if not lengths:
+            return {"chunks": 0}
+        return {
+            "chunks": len(lengths),
+            "mean": round(statistics.fmean(lengths), 1),
+            "p5": lengths[int(0.05 * (len(lengths) - 1))],
+            "p50": lengths[int(0.5 * (len(lengths) - 1))],
+            "p95": lengths[int(0.95 * (len(lengths) - 1))],
+            "max": lengths[-1],
+            "over_window": sum(n > self.max_tokens for n in lengths),
+        }
+
+    def report(self):
+        s = self.stats()
+        if not s["chunks"]:
+            return "📐 Chunk tokens: no chunks"
+        return (f"📐 Chunk tokens: mean {s['mean']}, p5 {s['p5']}, p50 {s['p50']}, p95 {s['p95']}, "
+                f"max {s['max']} (limit {self.chunk_tokens}, {s['over_window']} over the model window)")
@@ -0,0 +1,150 @@
+"""
+Encyclopedia title index: answer "What is diabetes?" without a vector search.
+
+Entries in the GALE encyclopedia start with the entry title on its own line,
+directly followed by a "Definition" (or "Description") heading. During
+ingestion TitleIndexBuilder spots those titles, notes which chunk each entry
+starts in, and stores normalized titles plus simple aliases ("Cold, common" →
+"common cold", "... syndrome (AIDS)" → "aids") in the chunk store's titles
+table, each pointing at the first chunks of the entry.
+
+At query time, questions of the form "what is X" / "explain X" / "define X"
+are reduced to X and looked up by key; anything else falls through to vector
+retrieval.
+"""
+
+import os
+import re
+import threading
+
+TITLE_LOOKUP_CHUNKS = int(os.environ.get("TITLE_LOOKUP_CHUNKS", 3))
+
+_SECTION_HEADINGS = ("Definition", "Description")
+_PAREN = re.compile(r"\s*\(([^)]*)\)\s*")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_ARTICLE = re.compile(r"^(a|an|the)\s+")
+_QUESTION = re.compile(
+    r"^(?:(?:what|who)\s+(?:is|are|was|were)|what'?s|explain|define|describe|"
+    r"tell\s+me\s+about|what\s+do\s+you\s+know\s+about|what\s+does|information\s+(?:on|about))\s+"
+    r"(.+?)(?:\s+mean)?\s*[?.!]*$",
+    re.IGNORECASE
+)
+
+
+def normalize_title(text):
+    key = _NON_WORD.sub(" ", text.lower()).strip()
+    return _ARTICLE.sub("", key)
+
+
+def title_aliases(title):
+    """Keys a question might use for this title, the exact title first"""
+    keys = [normalize_title(title)]
+    inner = _PAREN.findall(title)
+    base = _PAREN.sub(" ", title).strip()
+    keys.append(normalize_title(base))
+    keys.extend(normalize_title(alias) for alias in inner)
+    if base.count(",") == 1:
+        head, qualifier = (part.strip() for part in base.split(","))
+        keys.append(normalize_title(f"{qualifier} {head}"))
+    seen = []
+    for key in keys:
+        if key and key not in seen:
+            seen.append(key)
+    return seen
+
+
+def extract_titles(text):
+    """Entry titles on a page: a short line directly followed by a section heading"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    titles = []
+    for line, following in zip(lines, lines[1:]):
+        if following not in _SECTION_HEADINGS:
+            continue
+        if len(line) > 80 or line.endswith((".", ":")) or len(line.split()) > 8 or not line[0].isalpha():
+            continue
+        titles.append(line)
+    return titles
+
+
+def question_topic(question):
+    """The X in "what is X?", or the whole question if it is just a short term"""
+    question = " ".join(question.split())
+    match = _QUESTION.match(question)
+    if match:
+        return match.group(1)
+    if len(question.split()) <= 4:
+        return question.rstrip("?.! ")
+    return None
+
+
+def lookup_keys(question):
+    topic = question_topic(question)
+    if not topic:
+        return []
+    key = normalize_title(topic)
+    keys = [key]
+    if key.endswith("s") and len(key) > 3:
+        keys.append(key[:-1])
+    return keys
+
+
+class TitleIndexBuilder:
+    """Collects title positions during ingestion (thread-safe); rows() resolves spans"""
+
+    def __init__(self, max_chunks=TITLE_LOOKUP_CHUNKS):
+        self.max_chunks = max_chunks
+        self._chunks = []   # (source, page, position, chunk ID)
+        self._starts = {}   # (source, page, position) -> title
+        self._lock = threading.Lock()
+
+    def observe(self, source, page, page_text, chunks):
+        """chunks: [(position, chunk ID, text)] kept for this page, in order"""
+        starts = {}
+        for title in extract_titles(page_text):
+            for position, _, text in chunks:
+                if title in text and (source, page, position) not in starts:
+                    starts[(source, page, position)] = title
+                    break
+        with self._lock:
+            self._chunks.extend((source, page if page is not None else -1, position, cid)
+                                for position, cid, _ in chunks)
+            self._starts.update({(s, p if p is not None else -1, pos): t for (s, p, pos), t in starts.items()})
+
+    def rows(self):
+        """[(key, title, chunk IDs)] with ambiguous aliases dropped"""
+        spans = []
+        current, current_source = None, None
+        for source, page, position, cid in sorted(self._chunks, key=lambda c: (str(c[0]), c[1], c[2])):
+            title = self._starts.get((source, page, position))
+            if title is not None:
+                current, current_source = (title, []), source
+                spans.append(current)
+            elif source != current_source:
+                current = None  # an entry never continues into another file
+            if current is not None and len(current[1]) < self.max_chunks:
+                current[1].append(cid)
+
+        return resolve_titles(spans)
+
+
+def resolve_titles(spans):
+    """
+    [(key, title, chunk IDs)] for [(title, [chunk IDs])] entry spans in corpus
+    order: the first entry with an exact title wins its key, and an alias
+    shared by several titles is dropped
+    """
+    exact = {}
+    aliases = {}
+    for title, ids in spans:
+        keys = title_aliases(title)
+        exact.setdefault(keys[0], (title, ids))
+        for key in keys[1:]:
+            aliases.setdefault(key, set()).add((title, tuple(ids)))
+
+    rows = {key: (title, ids) for key, (title, ids) in exact.items()}
+    for key, entries in aliases.items():
+        # "hepatitis" from several entries would be a guess - only exact titles win there
+        if key not in rows and len({title for title, _ in entries}) == 1:
+            title, ids = next(iter(entries))
+            rows[key] = (title, list(ids))
+    return [(key, title, " ".join(ids)) for key, (title, ids) in rows.items()]
@@ -0,0 +1,177 @@
+"""
+Local vector index with compressed codes and two-stage search.
+
+A compact code (int8, 1-bit binary or PCA-truncated floats) is scanned to find
+a shortlist, then the shortlist is rescored with the exact float32 vectors.
+The float vectors are memory-mapped from disk, so only the codes need to sit
+in RAM.
+
+    python -m src.vector_index --mode int8      # build from the chunk store
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+MODES = ("float", "int8", "binary", "pca")
+DEFAULT_VECTOR_INDEX = os.path.join("chunk_store", "vector_index")
+
+# popcount for every byte value, used for Hamming distance on packed bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_BLOCK = 16384
+
+# Shortlist size = k * oversample; coarser codes need a longer shortlist
+DEFAULT_OVERSAMPLE = {"float": 1, "int8": 4, "binary": 16, "pca": 8}
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CompressedVectorIndex:
+    def __init__(self, ids, floats, mode="int8", codes=None, params=None, oversample=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown compression mode: {mode} (expected one of {MODES})")
+        self.ids = list(ids)
+        self.floats = floats
+        self.mode = mode
+        self.codes = codes
+        self.params = params or {}
+        self.oversample = oversample or DEFAULT_OVERSAMPLE[mode]
+
+    @classmethod
+    def build(cls, ids, vectors, mode="int8", pca_dims=128, oversample=None):
+        floats = _normalize(np.asarray(vectors, dtype=np.float32))
+        params = {}
+        codes = None
+
+        if mode == "int8":
+            low = floats.min(axis=0)
+            scale = np.maximum(floats.max(axis=0) - low, 1e-12) / 255.0
+            codes = (np.round((floats - low) / scale) - 128).astype(np.int8)
+            params = {"low": low, "scale": scale}
+        elif mode == "binary":
+            mean = floats.mean(axis=0)
+            codes = np.packbits(floats > mean, axis=1)
+            params = {"mean": mean}
+        elif mode == "pca":
+            mean = floats.mean(axis=0)
+            # Rows of vt are the principal directions, strongest first
+            _, _, vt = np.linalg.svd(floats - mean, full_matrices=False)
+            components = vt[:pca_dims].astype(np.float32)
+            codes = ((floats - mean) @ components.T).astype(np.float32)
+            params = {"mean": mean, "components": components}
+
+        return cls(ids, floats, mode=mode, codes=codes, params=params, oversample=oversample)
+
+    def _first_pass_scores(self, query, rows):
+        """Approximate similarity (higher is better) for a block of rows"""
+        codes = self.codes[rows]
+        if self.mode == "int8":
+            # q·x ≈ q·(low + (code + 128) * scale)
+            weights = query * self.params["scale"]
+            offset = float(query @ self.params["low"]) + 128.0 * float(weights.sum())
+            return codes @ weights + offset
+        if self.mode == "binary":
+            query_code = np.packbits(query > self.params["mean"])
+            return -_POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.int32)
+        # pca
+        projected = (query - self.params["mean"]) @ self.params["components"].T
+        return codes @ projected
+
+    def search(self, vector, k=4):
+        """Return [(id, cosine score)] for the top k vectors"""
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        n = len(self.ids)
+        k = min(k, n)
+        if k == 0:
+            return []
+
+        if self.mode == "float":
+            candidates = np.arange(n)
+        else:
+            shortlist = min(n, k * self.oversample)
+            scores = np.empty(n, dtype=np.float32)
+            # Blocked scan keeps temporaries small even for large indexes
+            for start in range(0, n, _BLOCK):
+                rows = slice(start, min(start + _BLOCK, n))
+                scores[rows] = self._first_pass_scores(query, rows)
+            candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+            candidates.sort()  # sequential reads from the memory-mapped floats
+
+        exact = np.asarray(self.floats[candidates]) @ query
+        top = np.argsort(-exact)[:k]
+        return [(self.ids[candidates[i]], float(exact[i])) for i in top]
+
+    def query(self, vector, top_k=4, include_metadata=False, namespace=None):
+        """Pinecone-style query, so this can stand in for the remote index"""
+        return {"matches": [{"id": i, "score": s} for i, s in self.search(vector, k=top_k)]}
+
+    def memory_bytes(self):
+        """Bytes that must stay resident for the first pass"""
+        code_bytes = self.codes.nbytes if self.codes is not None else self.floats.nbytes
+        return code_bytes + sum(np.asarray(v).nbytes for v in self.params.values())
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "floats.npy"), np.asarray(self.floats))
+        if self.codes is not None:
+            np.save(os.path.join(path, "codes.npy"), self.codes)
+        np.savez(os.path.join(path, "params.npz"), **self.params)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"mode": self.mode, "oversample": self.oversample, "ids": self.ids}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        floats = np.load(os.path.join(path, "floats.npy"), mmap_mode="r")
+        codes_path = os.path.join(path, "codes.npy")
+        codes = np.load(codes_path) if os.path.exists(codes_path) else None
+        with np.load(os.path.join(path, "params.npz")) as data:
+            params = {key: data[key] for key in data.files}
+        return cls(meta["ids"], floats, mode=meta["mode"], codes=codes,
+                   params=params, oversample=meta["oversample"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compressed local vector index from the chunk store")
+    parser.add_argument("--mode", choices=MODES, default="int8")
+    parser.add_argument("--pca-dims", type=int, default=128)
+    parser.add_argument("--oversample", type=int, default=None)
+    parser.add_argument("--partitioned", action="store_true", help="One index per partition (INGEST_PARTITIONS=1 stores)")
+    parser.add_argument("--out", default=os.environ.get("LOCAL_VECTOR_INDEX", DEFAULT_VECTOR_INDEX))
+    args = parser.parse_args()
+
+    from src.chunk_store import ChunkStore, DEFAULT_CHUNK_STORE
+    store = ChunkStore(os.environ.get("CHUNK_STORE_PATH", DEFAULT_CHUNK_STORE))
+    ids, vectors = store.all_vectors()
+    if not ids:
+        raise SystemExit("❌ No vectors in the chunk store - run store_index.py first")
+
+    if args.partitioned:
+        # One index per partition, in <out>/<partition>/, searched by PartitionedVectorStore
+        from src.partitions import partition_for
+        sources = store.sources()
+        groups = {}
+        for row, vector_id in enumerate(ids):
+            groups.setdefault(partition_for(sources.get(vector_id)), []).append(row)
+        parts = [(os.path.join(args.out, name), [ids[i] for i in rows], vectors[rows])
+                 for name, rows in sorted(groups.items())]
+    else:
+        parts = [(args.out, ids, vectors)]
+
+    for out, part_ids, part_vectors in parts:
+        index = CompressedVectorIndex.build(part_ids, part_vectors, mode=args.mode,
+                                            pca_dims=args.pca_dims, oversample=args.oversample)
+        index.save(out)
+        print(f"🗜️ Built {args.mode} index with {len(part_ids)} vectors "
+              f"({index.memory_bytes() / 1e6:.1f} MB resident) → {out}")
+
+
+if __name__ == "__main__":
+    main()
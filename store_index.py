@@ -1,8 +1,10 @@
 from dotenv import load_dotenv
 import os
-from src.helper import load_pdf_file, filter_to_minimal_docs, text_split, download_hugging_face_embeddings
+from src.helper import load_pdf_pages, download_hugging_face_embeddings
+from src.pipeline import IngestionPipeline
+from src.chunk_store import ChunkStore
+from src.snapshots import new_version, snapshot_path, publish
 from pinecone import Pinecone, ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
 import time
 
 load_dotenv()
@@ -16,14 +18,7 @@ if not PINECONE_API_KEY:
 
 os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 
-# 2. Load and process data
-print("📚 Loading PDF files...")
-extracted_data = load_pdf_file(data='data/')
-filter_data = filter_to_minimal_docs(extracted_data)
-text_chunks = text_split(filter_data)
-print(f"📄 Processed {len(text_chunks)} text chunks")
-
-# 3. Get embeddings
+# 2. Get embeddings
 print("🔤 Loading embeddings...")
 embeddings = download_hugging_face_embeddings()
 
@@ -31,13 +26,13 @@ embeddings = download_hugging_face_embeddings()
 test_embed = embeddings.embed_query("medical test")
 print(f"📏 Embedding dimension: {len(test_embed)}")
 
-# 4. Initialize Pinecone
+# 3. Initialize Pinecone
 print("🌲 Connecting to Pinecone...")
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
 index_name = "medical-chatbot"
 
-# 5. Create or connect to index
+# 4. Create or connect to index
 existing_indexes = [index.name for index in pc.list_indexes()]
 if index_name in existing_indexes:
     print(f"✅ Using existing index: {index_name}")
@@ -52,12 +47,25 @@ else:
     print("⏳ Waiting for index to initialize...")
     time.sleep(30)
 
-# 6. Create vector store
-print("🗂️ Creating vector store...")
-docsearch = PineconeVectorStore.from_documents(
-    documents=text_chunks,
-    embedding=embeddings,
-    index_name=index_name
+# 5. Stream pages through filter → split → embed → upsert
+# Pages are parsed lazily and flow through bounded queues, so memory stays
+# roughly constant no matter how large data/ is.
+# Each run builds a new immutable snapshot (local chunk store + its own
+# Pinecone namespace) instead of writing into the index users are querying.
+version = new_version()
+chunk_store_path = os.path.join(snapshot_path(version), "chunks.db")
+print(f"📚 Streaming PDF files into snapshot {version}...")
+pipeline = IngestionPipeline(
+    embeddings=embeddings,
+    index=pc.Index(index_name),
+    batch_size=int(os.environ.get("INGEST_BATCH_SIZE", 64)),
+    chunk_store=ChunkStore(chunk_store_path),
+    namespace=version
 )
+stats = pipeline.run(load_pdf_pages('data/'))
+print(f"📄 Processed {stats['chunks']} text chunks")
+
+# 6. Make the new snapshot live - running apps pick it up and swap in the background
+publish(version)
 
 print("🎉 Medical chatbot setup completed successfully!")
\ No newline at end of file
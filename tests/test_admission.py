@@ -0,0 +1,72 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from src import admission
+from src.admission import AdmissionController, RateLimiter, client_id
+
+
+def make_request(forwarded=None, remote_addr="10.0.0.1"):
+    headers = {"X-Forwarded-For": forwarded} if forwarded is not None else {}
+    return SimpleNamespace(headers=headers, remote_addr=remote_addr)
+
+
+def test_client_id_uses_the_hop_added_by_the_proxy():
+    assert client_id(make_request("1.2.3.4")) == "1.2.3.4"
+    # A client-supplied header can't pick its own rate-limit key
+    assert client_id(make_request("6.6.6.6, 1.2.3.4")) == "1.2.3.4"
+    assert client_id(make_request("random-1, 1.2.3.4")) == client_id(make_request("random-2, 1.2.3.4"))
+
+
+def test_client_id_without_proxy_header_uses_remote_addr(monkeypatch):
+    assert client_id(make_request()) == "10.0.0.1"
+    monkeypatch.setattr(admission, "TRUSTED_PROXIES", 0)
+    assert client_id(make_request("6.6.6.6")) == "10.0.0.1"
+
+
+def test_rate_limiter_allows_burst_then_asks_to_wait():
+    limiter = RateLimiter(rate=1 / 60.0, burst=3)
+    assert [limiter.allow("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.allow("a") > 0
+    assert limiter.allow("b") == 0  # buckets are per client
+
+
+def test_default_concurrency_leaves_a_worker_thread_free(monkeypatch):
+    monkeypatch.delenv("MAX_CONCURRENT_ANSWERS", raising=False)
+    monkeypatch.setattr(admission, "WORKER_THREADS", 4)
+    assert AdmissionController().max_concurrent == 3
+    monkeypatch.setattr(admission, "WORKER_THREADS", 1)
+    assert AdmissionController().max_concurrent == 1
+
+
+def test_default_queue_fits_the_spare_threads(monkeypatch):
+    monkeypatch.delenv("MAX_CONCURRENT_ANSWERS", raising=False)
+    monkeypatch.delenv("MAX_QUEUED_ANSWERS", raising=False)
+    monkeypatch.setattr(admission, "WORKER_THREADS", 4)
+    assert AdmissionController().max_queue == 0
+    monkeypatch.setattr(admission, "WORKER_THREADS", 16)
+    assert AdmissionController(max_concurrent=4).max_queue == 11
+
+
+def test_admission_queues_then_sheds():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=0.05)
+    assert controller.acquire()
+    assert not controller.acquire()
+    assert controller.rejected["queue_full"] == 1
+    controller.release()
+    assert controller.acquire()
+
+
+def test_waiting_request_gets_the_released_slot():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=2)
+    assert controller.acquire()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(controller.acquire()))
+    waiter.start()
+    deadline = time.monotonic() + 2
+    while controller.waiting != 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert controller.waiting == 1
+    controller.release()
+    waiter.join(2)
+    assert result == [True]
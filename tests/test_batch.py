@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from src.answering import PATH_ERROR, PATH_LLM
+from src.batch import BatchInputError, read_questions, resume_output
+
+
+def test_read_questions_defaults_ids_and_skips_blanks():
+    lines = ['{"id": "q1", "question": "What is asthma?"}', "", '{"msg": "What is anemia?"}', '{"id": "q4"}']
+    assert list(read_questions(lines)) == [{"id": "q1", "question": "What is asthma?"},
+                                           {"id": "3", "question": "What is anemia?"}]
+
+
+@pytest.mark.parametrize("bad", ['{"id": "q2", "question": "What is', '["What is anemia?"]'])
+def test_read_questions_names_the_bad_line(bad):
+    lines = ['{"id": "q1", "question": "What is asthma?"}', bad]
+    with pytest.raises(BatchInputError) as error:
+        list(read_questions(lines))
+    assert error.value.line_number == 2
+    assert str(error.value).startswith("line 2:")
+
+
+def result(result_id, path=PATH_LLM):
+    return json.dumps({"id": result_id, "answer": "...", "path": path}) + "\n"
+
+
+def test_resume_keeps_one_line_per_answered_id(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text(result("q1") + result("q2", PATH_ERROR) + result("q1") + result("q3")[:20])
+    assert resume_output(str(output)) == {"q1"}
+    assert output.read_text() == result("q1")
+
+    # The next run appends cleanly after the kept lines
+    with open(output, "a") as f:
+        f.write(result("q2"))
+    assert resume_output(str(output)) == {"q1", "q2"}
+
+
+def test_resume_adds_a_missing_final_newline(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text(result("q1").rstrip("\n"))
+    assert resume_output(str(output)) == {"q1"}
+    assert output.read_text() == result("q1")
+
+
+def test_resume_without_output(tmp_path):
+    assert resume_output(str(tmp_path / "missing.jsonl")) == set()
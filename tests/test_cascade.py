@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+from src import cascade
+from src.cascade import LARGE, SMALL, ModelCascade, escalation_reason, route
+
+CONFIDENT = {"source": "search", "top_score": 0.72}
+
+
+@pytest.mark.parametrize("question, retrieval, expected", [
+    ("What is anemia?", {"source": "title", "top_score": None}, (SMALL, "title")),
+    ("Symptoms of gout", CONFIDENT, (SMALL, "simple")),
+    ("Symptoms of gout", {"source": "search", "top_score": 0.31}, (LARGE, "low_confidence")),
+    ("What is the difference between type 1 and type 2 diabetes?", CONFIDENT, (LARGE, "complex")),
+    ("Why does asthma get worse at night?", CONFIDENT, (LARGE, "complex")),
+    ("Is ibuprofen safe during pregnancy?", CONFIDENT, (LARGE, "complex")),
+    ("What is gout? What causes it?", CONFIDENT, (LARGE, "several_questions")),
+    (" ".join(["word"] * 25), CONFIDENT, (LARGE, "long")),
+])
+def test_route(question, retrieval, expected):
+    assert route(question, retrieval) == expected
+
+
+def test_follow_ups_go_to_the_large_model():
+    assert route("What is anemia?", {"source": "title"}, follow_up=True) == (LARGE, "follow_up")
+
+
+def test_escalation_reasons():
+    assert escalation_reason({"content": "Gout is arthritis.", "finish_reason": "length"}) == "truncated"
+    assert escalation_reason({"content": "", "finish_reason": "stop"}) == "empty"
+    assert escalation_reason({"content": "The context does not mention gout.", "finish_reason": "stop"}) == "unsure"
+    assert escalation_reason({"content": "Gout is a form of arthritis.", "finish_reason": "stop"}) is None
+
+
+def fake_groq(answers):
+    """groq_completion stand-in: answers maps model -> content or an exception to raise"""
+    def completion(api_key, messages, model, max_tokens, timeout):
+        answer = answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return {"content": answer, "finish_reason": "stop", "usage": {"prompt_tokens": 100, "completion_tokens": 20}}
+    return completion
+
+
+def ask(monkeypatch, answers, question="Symptoms of gout"):
+    monkeypatch.setattr(cascade, "groq_completion", fake_groq(answers))
+    model_cascade = ModelCascade()
+    return model_cascade, model_cascade.answer("key", [{"role": "user", "content": question}], question, CONFIDENT)
+
+
+def test_unsure_small_answer_is_escalated(monkeypatch):
+    small, large = cascade.TIERS[SMALL]["model"], cascade.TIERS[LARGE]["model"]
+    model_cascade, (answer, info) = ask(monkeypatch, {small: "I'm not sure.", large: "Gout causes joint pain."})
+    assert answer == "Gout causes joint pain."
+    assert (info["tier"], info["escalated"], info["model"]) == (LARGE, "unsure", large)
+    assert model_cascade.calls == {SMALL: 1, LARGE: 1}
+
+
+def test_failed_escalation_keeps_the_small_answer(monkeypatch):
+    small, large = cascade.TIERS[SMALL]["model"], cascade.TIERS[LARGE]["model"]
+    _, (answer, info) = ask(monkeypatch, {small: "I'm not sure.", large: requests.exceptions.Timeout()})
+    assert answer == "I'm not sure."
+    assert (info["tier"], info["escalated"], info["model"]) == (SMALL, "unsure_failed", small)
+
+
+def test_small_model_error_escalates(monkeypatch):
+    small, large = cascade.TIERS[SMALL]["model"], cascade.TIERS[LARGE]["model"]
+    _, (answer, info) = ask(monkeypatch, {small: requests.exceptions.HTTPError(), large: "Gout causes joint pain."})
+    assert (answer, info["escalated"]) == ("Gout causes joint pain.", "error")
+
+
+def test_both_tiers_failing_raises(monkeypatch):
+    small, large = cascade.TIERS[SMALL]["model"], cascade.TIERS[LARGE]["model"]
+    with pytest.raises(requests.exceptions.RequestException):
+        ask(monkeypatch, {small: requests.exceptions.HTTPError(), large: requests.exceptions.Timeout()})
@@ -0,0 +1,69 @@
+import random
+
+from langchain_core.documents import Document
+
+from src.cleaning import ChunkDeduplicator, PageCleaner
+
+WORDS = ["asthma", "airway", "inflammation", "wheezing", "inhaler", "steroid", "allergen", "attack",
+         "breathing", "chest", "cough", "trigger", "treatment", "symptom", "patient", "lung"]
+
+
+def text(rng, n=120):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def test_exact_duplicate_ignores_case_and_spacing():
+    dedup = ChunkDeduplicator()
+    chunk = text(random.Random(1))
+    assert not dedup.is_duplicate(chunk)
+    assert dedup.is_duplicate("  " + chunk.upper().replace(" ", "\n"))
+    assert dedup.stats["exact_duplicates"] == 1
+
+
+def test_near_duplicate_with_one_word_changed():
+    dedup = ChunkDeduplicator()
+    words = text(random.Random(2), 300).split()
+    assert not dedup.is_duplicate(" ".join(words))
+    words[150] = "bronchodilator"
+    assert dedup.is_duplicate(" ".join(words))
+    assert dedup.stats["near_duplicates"] == 1
+
+
+def test_distinct_chunks_are_kept():
+    dedup = ChunkDeduplicator()
+    rng = random.Random(3)
+    chunks = [text(rng) for _ in range(20)]
+    assert not any(dedup.is_duplicate(chunk) for chunk in chunks)
+    assert dedup.stats["duplicate_bytes"] == 0
+
+
+def page(lines, number):
+    return Document(page_content="\n".join(lines), metadata={"source": "gale.pdf", "page": number})
+
+
+def test_page_cleaner_strips_running_header_and_page_number():
+    rng = random.Random(4)
+    pages = [page(["GALE ENCYCLOPEDIA OF MEDICINE", text(rng, 20), text(rng, 20), str(100 + i)], i)
+             for i in range(10)]
+    cleaned = list(PageCleaner(warmup_pages=5).clean_pages(pages))
+    assert len(cleaned) == 10
+    for original, result in zip(pages, cleaned):
+        lines = result.page_content.splitlines()
+        assert lines == original.page_content.splitlines()[1:3]
+
+
+def test_page_cleaner_strips_only_lone_page_numbers():
+    rng = random.Random(5)
+    for line in ["12", "- 12 -", "[12]", "Page 12"]:
+        body = text(rng, 20)
+        cleaned = PageCleaner().clean(page([line, body], 1))
+        assert cleaned.page_content.splitlines() == [body]
+    for line in ["1,000", "2.", "3.5", "12 / 14"]:
+        body = text(rng, 20)
+        cleaned = PageCleaner().clean(page([line, body], 1))
+        assert cleaned.page_content.splitlines() == [line, body]
+
+
+def test_page_cleaner_drops_index_pages():
+    index = page([f"{word.title()}, {10 * i}–{10 * i + 4}" for i, word in enumerate(WORDS)], 1)
+    assert PageCleaner().clean(index) is None
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from src.conversation import Conversation
+
+ASTHMA_CHUNK = SimpleNamespace(page_content=(
+    "Asthma is a chronic inflammation of the airways. Symptoms include wheezing, coughing and "
+    "chest tightness. Treatment uses inhaled corticosteroids and bronchodilators."
+))
+
+
+def asthma_conversation():
+    conversation = Conversation()
+    conversation.remember_retrieval("What is asthma?", [ASTHMA_CHUNK])
+    return conversation
+
+
+def test_no_previous_retrieval_is_never_a_follow_up():
+    assert not Conversation().is_follow_up("How is it treated?")
+
+
+def test_pronoun_without_new_terms_reuses_context():
+    assert asthma_conversation().is_follow_up("How is it treated?")
+    assert asthma_conversation().is_follow_up("What are its symptoms?")
+
+
+def test_new_topic_with_pronoun_is_not_a_follow_up():
+    assert not asthma_conversation().is_follow_up("What is diabetes and how is it treated?")
+
+
+def test_new_term_without_overlap_is_not_a_follow_up():
+    assert not asthma_conversation().is_follow_up("Is it contagious?")
+
+
+def test_new_terms_overlapping_the_last_topic_reuse_context():
+    assert asthma_conversation().is_follow_up("Does it make asthma worse at night?")
+
+
+def test_connective_naming_a_new_topic_is_not_a_follow_up():
+    assert not asthma_conversation().is_follow_up("What about migraine?")
+
+
+def test_question_without_reference_back_is_not_a_follow_up():
+    assert not asthma_conversation().is_follow_up("Symptoms of asthma")
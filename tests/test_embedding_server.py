@@ -0,0 +1,68 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+from src.embedding_server import EmbeddingServer, SocketEmbeddings
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def server():
+    # AF_UNIX paths are limited to ~100 bytes, so keep it short
+    directory = tempfile.mkdtemp(prefix="emb-")
+    path = os.path.join(directory, "s.sock")
+    server = EmbeddingServer(path, FakeEmbeddings())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+    os.rmdir(directory)
+
+
+def test_many_concurrent_clients(server):
+    _, path = server
+    client = SocketEmbeddings(path, timeout=10)
+    errors, results = [], []
+    start = threading.Barrier(24)
+
+    def worker(i):
+        start.wait()
+        try:
+            for j in range(20):
+                text = "x" * (i + j)
+                results.append(client.embed_query(text) == [float(len(text)), 1.0])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(24)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(results) == 24 * 20 and all(results)
+
+
+def test_connection_is_reused_and_reopened(server):
+    _, path = server
+    client = SocketEmbeddings(path, timeout=10)
+    assert client.embed_documents(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    sock = client._local.sock
+    assert client.embed_query("ccc") == [3.0, 1.0]
+    assert client._local.sock is sock
+
+    # The server sees EOF and drops the connection, like after a restart
+    sock.shutdown(socket.SHUT_WR)
+    time.sleep(0.05)
+    assert client.embed_query("dddd") == [4.0, 1.0]
+    assert client._local.sock is not sock
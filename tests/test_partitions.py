@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+
+from src.partitions import PartitionRouter, PartitionedVectorStore, partition_for, partition_namespace
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+PARTITIONS = [
+    ("cardiology", unit(1, 0, 0), 10),
+    ("pediatrics", unit(0, 1, 0), 10),
+    ("pharmacology", unit(0.9, 0.2, 0), 10),
+]
+
+
+class FakeIndex:
+    def __init__(self, matches):
+        self.matches = matches
+        self.threads = set()
+
+    def query(self, vector, top_k, include_metadata=False, namespace=None):
+        self.threads.add(threading.current_thread().name)
+        return {"matches": [{"id": i, "score": s} for i, s in self.matches[:top_k]]}
+
+
+class FakeChunkStore:
+    def get_many(self, ids):
+        return {i: (f"text {i}", "source.pdf", 1) for i in ids}
+
+
+def test_partition_for_uses_rules_then_file_stem():
+    rules = "*pharmacolog*=pharmacology,*pediatric*=pediatrics"
+    assert partition_for("data/Clinical Pharmacology 3rd ed.pdf", rules) == "pharmacology"
+    assert partition_for("data/Gale Encyclopedia of Medicine.pdf", rules) == "gale-encyclopedia-of-medicine"
+    assert partition_namespace("v1", "pediatrics") == "v1.pediatrics"
+
+
+def test_router_picks_top_partitions_within_margin():
+    router = PartitionRouter(PARTITIONS, max_partitions=2, margin=0.1)
+    assert [name for name, _ in router.route(unit(1, 0, 0))] == ["cardiology", "pharmacology"]
+    # Pediatrics is the clear best match; the runner-up is too far behind to search
+    assert [name for name, _ in router.route(unit(0, 1, 0))] == ["pediatrics"]
+
+
+def test_store_merges_partitions_by_score():
+    indexes = {
+        "cardiology": (FakeIndex([("c1", 0.9), ("c2", 0.5)]), "v1.cardiology"),
+        "pharmacology": (FakeIndex([("p1", 0.8), ("p2", 0.7)]), "v1.pharmacology"),
+        "pediatrics": (FakeIndex([("k1", 0.99)]), "v1.pediatrics"),
+    }
+    store = PartitionedVectorStore(indexes, None, FakeChunkStore(), PartitionRouter(PARTITIONS, max_partitions=2))
+    docs = store.similarity_search_by_vector_with_score(unit(1, 0, 0), k=3)
+    assert [(doc.metadata["id"], doc.metadata["partition"]) for doc, _ in docs] == [
+        ("c1", "cardiology"), ("p1", "pharmacology"), ("p2", "pharmacology")]
+    store.close()
+
+
+def test_single_route_is_queried_inline_and_closed_store_still_answers():
+    pediatrics = FakeIndex([("k1", 0.99)])
+    indexes = {"cardiology": (FakeIndex([]), None), "pediatrics": (pediatrics, None),
+               "pharmacology": (FakeIndex([]), None)}
+    store = PartitionedVectorStore(indexes, None, FakeChunkStore(), PartitionRouter(PARTITIONS))
+    assert store.similarity_search_by_vector_with_score(unit(0, 1, 0), k=2)[0][0].metadata["id"] == "k1"
+    assert pediatrics.threads == {threading.current_thread().name}
+
+    store.close()
+    docs = store.similarity_search_by_vector_with_score(unit(1, 0, 0), k=2)
+    assert docs == []  # both routed partitions are empty, but no error after close
+
+
+def test_search_pool_fans_out_per_concurrent_query():
+    router = PartitionRouter(PARTITIONS, max_partitions=2)
+    store = PartitionedVectorStore({}, None, FakeChunkStore(), router, concurrency=3)
+    assert store._pool._max_workers == 6
+    store.close()
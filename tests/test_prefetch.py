@@ -0,0 +1,52 @@
+import multiprocessing
+
+from langchain_core.documents import Document
+
+from src.prefetch import PrefetchCache
+
+DOCS = [Document(page_content="Asthma is a chronic disease of the airways.", metadata={"id": "c1", "page": 3})]
+STATS = {"source": "search", "k": 1, "top_score": 0.81}
+
+
+def _prefetch_in_other_worker(path):
+    PrefetchCache(path).put("browser-1", "v1", "what is asthma", DOCS, STATS)
+
+
+def test_prefetch_from_another_worker_is_a_hit(tmp_path):
+    path = str(tmp_path / "prefetch.db")
+    worker = multiprocessing.get_context("fork").Process(target=_prefetch_in_other_worker, args=(path,))
+    worker.start()
+    worker.join(10)
+
+    cache = PrefetchCache(path)
+    docs, stats = cache.lookup("browser-1", "v1", "What is asthma?")
+    assert docs[0].page_content == DOCS[0].page_content and docs[0].metadata == DOCS[0].metadata
+    assert stats == STATS
+    assert cache.counts == {"stored": 1, "hit": 1, "miss": 0}
+
+
+def test_lookup_is_per_client_and_version(tmp_path):
+    cache = PrefetchCache(str(tmp_path / "prefetch.db"))
+    cache.put("browser-1", "v1", "what is asthma", DOCS, STATS)
+    assert cache.has("browser-1", "v1", "What is asthma?")
+    assert cache.lookup("browser-2", "v1", "what is asthma") is None
+    assert cache.lookup("browser-1", "v2", "what is asthma") is None
+    assert cache.lookup("browser-1", "v1", "what is diabetes") is None
+    assert cache.counts["miss"] == 3
+
+
+def test_swap_keeps_only_the_new_version(tmp_path):
+    cache = PrefetchCache(str(tmp_path / "prefetch.db"))
+    cache.put("browser-1", "v1", "what is asthma", DOCS, STATS)
+    cache.put("browser-1", "v2", "what is anemia", DOCS, STATS)
+    cache.clear(keep_version="v2")
+    assert not cache.has("browser-1", "v1", "what is asthma")
+    assert cache.has("browser-1", "v2", "what is anemia")
+
+
+def test_keeps_the_newest_entries_per_client(tmp_path):
+    cache = PrefetchCache(str(tmp_path / "prefetch.db"))
+    for text in ("what is asthma", "what is anemia", "what is angina", "what is anorexia"):
+        cache.put("browser-1", "v1", text, DOCS, STATS)
+    assert not cache.has("browser-1", "v1", "what is asthma")
+    assert cache.has("browser-1", "v1", "what is anorexia")
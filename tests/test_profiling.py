@@ -0,0 +1,44 @@
+import os
+from collections import Counter
+
+from src.profiling import Profiler
+
+
+def worker(tmp_path):
+    return Profiler(settings_path=str(tmp_path / "settings.json"))
+
+
+def test_settings_reach_the_other_workers(tmp_path):
+    handling, other = worker(tmp_path), worker(tmp_path)
+    other.refresh()
+    handling.configure(enabled=True, sample_rate=3)
+    assert other.enabled is False
+    other.refresh()
+    assert other.enabled is True and other.sample_rate == 1.0
+    assert handling.settings()["pid"] == os.getpid()
+
+
+def test_dump_and_reset_run_once_per_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    handling, other = worker(tmp_path), worker(tmp_path)
+    other.refresh()
+    other.record("r1", 0.2, Counter({"a;b": 3}))
+
+    files = handling.configure(action="dump")
+    assert len(files) == 1 and f"-{os.getpid()}-aggregate" in files[0]
+    dumped = other.refresh()
+    assert len(dumped) == 2
+    assert other.refresh() == []
+
+    handling.configure(action="reset")
+    other.refresh()
+    assert other.profiled == 0 and not other.aggregate
+
+
+def test_new_worker_adopts_settings_but_not_old_actions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    worker(tmp_path).configure(enabled=True, action="dump")
+    late = worker(tmp_path)
+    late.record("r1", 0.1, Counter({"a": 1}))
+    assert late.refresh() == []
+    assert late.enabled is True and late.profiled == 1
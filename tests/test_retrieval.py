@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from src.retrieval import choose_k, select_adaptive
+
+BOUNDS = {"min_k": 1, "max_k": 6, "min_score": 0.3, "max_gap": 0.1}
+
+
+def doc(text):
+    return SimpleNamespace(page_content=text, metadata={})
+
+
+def test_single_clear_hit_keeps_one():
+    assert choose_k([0.82, 0.55, 0.52], **BOUNDS) == 1
+
+
+def test_close_scores_keep_growing_until_a_gap():
+    assert choose_k([0.71, 0.69, 0.66, 0.64, 0.45, 0.44], **BOUNDS) == 4
+
+
+def test_stops_below_min_score():
+    assert choose_k([0.40, 0.36, 0.31, 0.29, 0.28], **BOUNDS) == 3
+
+
+def test_respects_max_k_and_result_count():
+    assert choose_k([0.9] * 10, **BOUNDS) == 6
+    assert choose_k([0.9, 0.9], **BOUNDS) == 2
+    assert choose_k([], **BOUNDS) == 0
+
+
+def test_min_k_is_kept_even_for_weak_scores():
+    assert choose_k([0.2, 0.1, 0.05], **{**BOUNDS, "min_k": 2}) == 2
+
+
+def test_select_adaptive_sorts_and_reports_savings():
+    results = [(doc("b" * 400), 0.5), (doc("a" * 400), 0.8), (doc("c" * 400), 0.48)]
+    kept, stats = select_adaptive(results, **BOUNDS)
+    assert [d.page_content[0] for d, _ in kept] == ["a"]
+    assert stats["k"] == 1
+    assert stats["top_score"] == 0.8
+    assert stats["tokens_saved"] > 0
+
+
+def test_select_adaptive_empty():
+    kept, stats = select_adaptive([], **BOUNDS)
+    assert kept == [] and stats["k"] == 0 and stats["top_score"] is None
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+
+from src.chunk_store import ChunkStore
+from src.sharding import ShardWorker, merge_shards
+
+
+def write_shards(manifest_dir, shard_titles):
+    """One done shard per [(key, title, chunk IDs)] list, in manifest order"""
+    shards = [{"id": f"s{i}", "file": "gale.pdf", "start": i, "end": i + 1} for i in range(len(shard_titles))]
+    for sub in ("claims", "done", "outputs"):
+        os.makedirs(os.path.join(manifest_dir, sub), exist_ok=True)
+    with open(os.path.join(manifest_dir, "manifest.json"), "w") as f:
+        json.dump({"shards": shards}, f)
+    for shard, rows in zip(shards, shard_titles):
+        ChunkStore(os.path.join(manifest_dir, "outputs", f"{shard['id']}.db")).put_titles(rows)
+        with open(os.path.join(manifest_dir, "done", f"{shard['id']}.json"), "w") as f:
+            json.dump({}, f)
+
+
+def test_merge_keeps_exact_title_over_later_alias(tmp_path):
+    write_shards(str(tmp_path), [
+        [("aids", "AIDS", "a1")],
+        [("acquired immune deficiency syndrome aids", "Acquired immune deficiency syndrome (AIDS)", "b1"),
+         ("acquired immune deficiency syndrome", "Acquired immune deficiency syndrome (AIDS)", "b1"),
+         ("aids", "Acquired immune deficiency syndrome (AIDS)", "b1")],
+    ])
+    store = ChunkStore(str(tmp_path / "merged.db"))
+    merge_shards(str(tmp_path), store.path)
+    assert store.get_title("aids")[0] == "AIDS"
+    assert store.get_title("acquired immune deficiency syndrome")[0] == "Acquired immune deficiency syndrome (AIDS)"
+
+
+def test_merge_drops_alias_shared_across_shards(tmp_path):
+    write_shards(str(tmp_path), [
+        [("multiple sclerosis ms", "Multiple sclerosis (MS)", "a1"),
+         ("multiple sclerosis", "Multiple sclerosis (MS)", "a1"),
+         ("ms", "Multiple sclerosis (MS)", "a1")],
+        [("mitral stenosis ms", "Mitral stenosis (MS)", "b1"),
+         ("mitral stenosis", "Mitral stenosis (MS)", "b1"),
+         ("ms", "Mitral stenosis (MS)", "b1")],
+    ])
+    store = ChunkStore(str(tmp_path / "merged.db"))
+    merge_shards(str(tmp_path), store.path)
+    assert store.get_title("ms") is None
+    assert store.get_title("multiple sclerosis")[0] == "Multiple sclerosis (MS)"
+    assert store.get_title("mitral stenosis")[0] == "Mitral stenosis (MS)"
+
+
+def test_release_keeps_a_reclaimed_lock(tmp_path):
+    os.makedirs(tmp_path / "claims")
+    worker = ShardWorker(str(tmp_path), embeddings=None)
+    shard = {"id": "s0"}
+    lock = tmp_path / "claims" / "s0.lock"
+
+    assert worker._try_claim(shard)
+    lock.write_text("other-worker")  # our lease expired and another worker reclaimed the shard
+    worker._release(shard)
+    assert lock.read_text() == "other-worker"
+
+    lock.unlink()
+    assert worker._try_claim(shard)
+    worker._release(shard)
+    assert not lock.exists()
+
+
+def expired_lock(tmp_path, owner="dead-worker"):
+    os.makedirs(tmp_path / "claims", exist_ok=True)
+    os.makedirs(tmp_path / "done", exist_ok=True)
+    lock = tmp_path / "claims" / "s0.lock"
+    lock.write_text(owner)
+    old = time.time() - 3600
+    os.utime(lock, (old, old))
+    return lock
+
+
+def test_only_one_worker_takes_an_expired_lease(tmp_path):
+    lock = expired_lock(tmp_path)
+    a, b = ShardWorker(str(tmp_path), embeddings=None), ShardWorker(str(tmp_path), embeddings=None)
+    seen = os.stat(lock)  # b sees the stale lock ...
+    assert a._try_claim({"id": "s0"})  # ... but a reclaims it first
+    assert not b._take_stale(str(lock), seen)
+    assert lock.read_text() == a.worker_id
+    assert not b._try_claim({"id": "s0"})
+    assert lock.read_text() == a.worker_id
+
+
+def test_concurrent_reclaims_have_one_winner(tmp_path):
+    for attempt in range(20):
+        expired_lock(tmp_path)
+        workers = [ShardWorker(str(tmp_path), embeddings=None) for _ in range(8)]
+        start = threading.Barrier(len(workers))
+        won = []
+
+        def claim(worker):
+            start.wait()
+            if worker._try_claim({"id": "s0"}):
+                won.append(worker.worker_id)
+
+        threads = [threading.Thread(target=claim, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(won) == 1
+        assert (tmp_path / "claims" / "s0.lock").read_text() == won[0]
+
+
+def test_claim_backs_off_when_the_shard_finished_meanwhile(tmp_path):
+    lock = expired_lock(tmp_path)
+    (tmp_path / "done" / "s0.json").write_text("{}")
+    assert not ShardWorker(str(tmp_path), embeddings=None)._try_claim({"id": "s0"})
+    assert not lock.exists()
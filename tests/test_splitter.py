@@ -0,0 +1,69 @@
+import re
+import textwrap
+
+from src.splitter import TokenTextSplitter, segments
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class WordTokenizer:
+    """Stand-in for the HuggingFace tokenizer: one token per word or punctuation mark"""
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        if isinstance(texts, str):
+            offsets = [m.span() for m in _TOKEN.finditer(texts)]
+            return {"input_ids": list(range(len(offsets))), "offset_mapping": offsets}
+        return {"input_ids": [_TOKEN.findall(text) for text in texts]}
+
+
+ASTHMA = (
+    "Asthma is a chronic disease of the airways that causes episodes of wheezing, coughing "
+    "and chest tightness. Attacks are often triggered by allergens, cold air or exercise. "
+    "Inhaled corticosteroids reduce the inflammation of the airways over time. Quick relief "
+    "inhalers open the airways during an attack and should be carried at all times. Patients "
+    "are taught to recognise early warning signs and to follow a written action plan."
+)
+
+
+def splitter(**kwargs):
+    return TokenTextSplitter(tokenizer=WordTokenizer(), **kwargs)
+
+
+def test_narrow_column_lines_are_not_headings():
+    column = "\n".join(textwrap.wrap(ASTHMA, width=40))
+    assert any(len(line.split()) <= 6 and not line.endswith(".") for line in column.splitlines())
+    assert not [segment for segment, heading in segments(column) if heading]
+
+
+def test_narrow_column_chunks_end_on_sentence_boundaries():
+    column = "\n".join(textwrap.wrap(ASTHMA, width=40))
+    chunks = splitter(chunk_tokens=40, min_section_tokens=5).split_text(column)
+    assert len(chunks) > 1
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_entry_title_and_section_headings_are_detected():
+    text = "Asthma\nDefinition\n" + ASTHMA + "\n\nCauses and symptoms\nAllergens trigger most attacks."
+    headings = [segment for segment, heading in segments(text) if heading]
+    assert headings == ["Asthma", "Definition", "Causes and symptoms"]
+
+
+def test_hyphenated_line_breaks_are_joined():
+    text = "Patients need long-term treat-\nment of the airways."
+    assert segments(text) == [("Patients need long-term treatment of the airways.", False)]
+
+
+def test_chunks_respect_token_limit_and_cut_long_sentences():
+    long_sentence = " ".join(["word"] * 95) + "."
+    s = splitter(chunk_tokens=30, min_section_tokens=5)
+    chunks = s.split_text(ASTHMA + " " + long_sentence)
+    assert max(s.stats()["max"], 0) <= 30
+    assert sum(chunk.count("word") for chunk in chunks) == 95
+
+
+def test_chunk_tokens_above_model_window_is_rejected():
+    try:
+        splitter(chunk_tokens=300)
+    except ValueError:
+        return
+    raise AssertionError("chunk_tokens beyond the model window was accepted")
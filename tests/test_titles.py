@@ -0,0 +1,49 @@
+from src.titles import TitleIndexBuilder, extract_titles, lookup_keys, question_topic, title_aliases
+
+
+def test_aliases_cover_parentheses_and_inverted_titles():
+    assert title_aliases("Acquired immune deficiency syndrome (AIDS)") == [
+        "acquired immune deficiency syndrome aids", "acquired immune deficiency syndrome", "aids"]
+    assert title_aliases("Cold, common") == ["cold common", "common cold"]
+    assert title_aliases("Asthma") == ["asthma"]
+
+
+def test_extract_titles_needs_a_section_heading_next():
+    page = "Asthma\nDefinition\nAsthma is a chronic disease.\nSee also Allergies.\nDescription\nAtaxia\nDescription\n..."
+    assert extract_titles(page) == ["Asthma", "Ataxia"]
+
+
+def test_question_topic():
+    assert question_topic("What is diabetes?") == "diabetes"
+    assert question_topic("Explain the common cold") == "the common cold"
+    assert question_topic("migraine") == "migraine"
+    assert question_topic("How does stress affect blood pressure over many years?") is None
+
+
+def test_lookup_keys_try_the_singular():
+    assert lookup_keys("What are gallstones?") == ["gallstones", "gallstone"]
+    assert lookup_keys("What is the common cold?") == ["common cold"]
+
+
+def test_rows_keep_exact_titles_and_drop_ambiguous_aliases():
+    builder = TitleIndexBuilder(max_chunks=2)
+    builder.observe("gale.pdf", 1, "Multiple sclerosis (MS)\nDefinition\n...",
+                    [(0, "a0", "Multiple sclerosis (MS)\nDefinition"), (1, "a1", "..."), (2, "a2", "...")])
+    builder.observe("gale.pdf", 2, "Mitral stenosis (MS)\nDefinition\n...",
+                    [(0, "b0", "Mitral stenosis (MS)\nDefinition")])
+    builder.observe("gale.pdf", 3, "MS\nDefinition\n...", [(0, "c0", "MS\nDefinition")])
+    rows = {key: (title, ids) for key, title, ids in builder.rows()}
+    assert rows["multiple sclerosis"] == ("Multiple sclerosis (MS)", "a0 a1")
+    assert rows["mitral stenosis"] == ("Mitral stenosis (MS)", "b0")
+    assert rows["ms"] == ("MS", "c0")
+
+
+def test_rows_drop_alias_shared_by_two_titles():
+    builder = TitleIndexBuilder()
+    builder.observe("gale.pdf", 1, "Multiple sclerosis (MS)\nDefinition",
+                    [(0, "a0", "Multiple sclerosis (MS)\nDefinition")])
+    builder.observe("gale.pdf", 2, "Mitral stenosis (MS)\nDefinition",
+                    [(0, "b0", "Mitral stenosis (MS)\nDefinition")])
+    keys = {key for key, _, _ in builder.rows()}
+    assert "ms" not in keys
+    assert {"multiple sclerosis", "mitral stenosis"} <= keys